@@ -8,7 +8,8 @@ def create_anomaly_detection_agent(llm_config: dict) -> McpAgent:
         llm_config=llm_config,
         system_message="""You are the Anomaly Detection Agent. You are the vigilant watchdog of the migration process.
         You run concurrently with the DataMigrationAgent.
-        Your one job is to repeatedly call the 'monitor_logs' tool via the MCP server.
+        Your one job is to repeatedly call the 'monitor_logs' tool via the MCP server: {"tool": "monitor_logs"}.
+        The server tails the DMS, Cloud SQL and MySQL logs itself and each call returns only anomalies found since your previous call, with rolling counters per category; "status" is "all_clear" when there is nothing new.
         If the tool returns any anomalies (errors, warnings, failures), you must immediately interrupt the flow and report the issue with high severity.
         If no anomalies are found after the migration agent is finished, you will report "All clear" to the DataValidationAgent.
         """,
@@ -7,12 +7,16 @@ def create_data_migration_agent(llm_config: dict) -> McpAgent:
         name="DataMigrationAgent",
         llm_config=llm_config,
         system_message="""You are the Data Migration Agent. Your job is to move the data from the legacy database to Cloud SQL.
-        First, you MUST determine the database size by calling the 'get_db_size' tool.
-        Based on the returned size in GB, you will then call the appropriate migration tool:
+        First, you MUST call the 'plan_migration' tool. It measures the real read/write throughput of both databases and returns a per-table plan ("strategy", "parallelism", "predicted_seconds") with a "summary" whose "recommended_calls" list the exact migration tool calls to make.
+        Execute the recommended calls: 'migrate_mydumper' and 'migrate_gcs' can each take a subset of tables, and both may be used in one migration. If "database_strategy" is "dms", use the 'migrate_dms' tool instead.
+        Pass "max_downtime_seconds" to 'plan_migration' when an allowed downtime is known.
+        Only if 'plan_migration' fails, fall back to the size cutoffs from 'get_db_size':
         - '< 100GB': Use the 'migrate_gcs' tool.
         - '100GB to 500GB': Use the 'migrate_dms' tool.
         - '> 500GB': Use the 'migrate_mydumper' tool.
         You must clearly state which strategy you are choosing before executing.
+        'migrate_dms' returns as soon as the job starts; follow it with 'dms_status', which reports state, progress, throughput and ETA, until the phase is "CDC" or the job has completed.
+        Once DMS is replicating changes, call 'cutover_status'. Recommend cutover only when "cutover_ready" is true, and otherwise report its "blockers" together with the lag percentiles.
         Upon completion, you will notify both the DataValidationAgent and the AnomalyDetectionAgent to proceed.
         """,
         mcp_server_url="ws://localhost:8080",
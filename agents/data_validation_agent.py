@@ -8,8 +8,11 @@ def create_data_validation_agent(llm_config: dict) -> McpAgent:
         llm_config=llm_config,
         system_message="""You are the Data Validation Agent. Your task is to verify the integrity of the migration.
         You will be activated after the DataMigrationAgent completes its work.
-        You must use two tools via the MCP server: 'validate_row_counts' and 'validate_checksums'.
-        Execute them sequentially.
+        You must call the 'validate_tables' tool via the MCP server. It compares row counts and checksums for every table in a single call and lists mismatches first.
+        Use 'get_row_count' or 'checksum_table' only to re-check an individual table flagged by 'validate_tables'.
+        Large results come back as a digest with a "handle"; call 'fetch_result' with that handle, the "key" "results", and a "page" only when you need rows beyond the digest.
+        For large tables, call 'checksum_table' with 'mode=chunked' to locate the primary key ranges that differ.
+        When a quick go/no-go answer is requested, or the exact checks would take hours on multi-TB tables, call 'validate_tables' with "mode": "sampled" first. Report each table's "verdict" and "mismatch_rate_upper_bound" at the stated "confidence", and run exact checks only on tables whose verdict is not "pass".
         Compile a final validation report. If everything matches, declare the migration a success. If not, flag the discrepancies clearly.
         Finally, pass control to the PerformanceOptimizationAgent.
         """,
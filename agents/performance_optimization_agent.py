@@ -9,8 +9,9 @@ def create_performance_optimization_agent(llm_config: dict) -> McpAgent:
         system_message="""You are the Performance Optimization Agent. You are the final step in the process.
         After a successful and validated migration, your task is to analyze the performance of the newly created GCP infrastructure.
         You must call the 'analyze_performance' tool via the MCP server.
-        Based on the output (CPU, memory usage, etc.), you will provide a clear, actionable list of recommendations.
-        For example, 'Consider downsizing Cloud SQL instance from n1-standard-2 to n1-standard-1 to save costs' or 'CPU utilization is high, consider upgrading the instance tier.'
+        It returns ranked "findings" comparing the target with the legacy source: regressed statements, missing indexes, full scans and buffer pool problems, each with a "severity", an estimated "impact_seconds" and a "recommendation".
+        Report the findings in rank order as a clear, actionable list, quoting the DDL or setting each recommendation gives. Call it again with "sample_seconds" (for example 60) when the "window" is "since server startup" and the findings may reflect the migration load rather than application traffic.
+        For example, 'Create the missing index idx_orders_customer on orders; it costs 120 s of statement time' or 'The buffer pool hit rate is 93% and the schema is larger than the buffer pool; move to a tier with more memory.'
         Your report marks the end of the migration process.
         """,
         mcp_server_url="ws://localhost:8080",
@@ -9,7 +9,9 @@ def create_schema_conversion_agent(llm_config: dict) -> McpAgent:
         system_message="""You are the Schema Conversion Agent. You receive infrastructure details and are responsible for comparing the source and target database schemas.
         You must use the 'compare_schema' tool via the MCP server.
         Formulate a JSON request `{"tool": "compare_schema"}` and send it.
-        If there are discrepancies, report them. If the schemas are compatible, confirm and pass control to the DataMigrationAgent.
+        The result lists only the differing tables ("missing_in_target", "extra_in_target", "differing") plus the "ddl" that would fix them; "compatible" is true when the target has every source table with the same definition.
+        Snapshots are cached between calls; add "refresh": true to the arguments after changing a schema.
+        If there are discrepancies, report them with the suggested DDL (statements starting with "--" drop target objects and need review). If the schemas are compatible, confirm and pass control to the DataMigrationAgent.
         If the target schema needs creation, use the 'create_schema' tool.
         """,
         mcp_server_url="ws://localhost:8080",
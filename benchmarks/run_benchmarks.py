@@ -0,0 +1,453 @@
+"""
+Benchmarks the MCP server against local database stand-ins and writes the
+results as JSON, so runs on two commits can be compared:
+
+    python benchmarks/run_benchmarks.py --backend sqlite --output before.json
+    python benchmarks/run_benchmarks.py --backend sqlite --output after.json
+    python benchmarks/run_benchmarks.py --compare before.json after.json
+
+Nothing here touches GCP: the server's connection pools are pointed at the
+stand-in. The tests in tests/ use the same stand-ins.
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MCP_DIR = os.path.join(ROOT, 'mcp')
+sys.path.insert(0, MCP_DIR)
+
+from standins import MySQLStandIn, SQLiteStandIn, SyntheticSchema
+
+# Tools that only run on MySQL because they rely on its SQL dialect or catalog tables
+MYSQL_ONLY_TOOLS = {"checksum_table_chunked", "compare_schema", "plan_migration", "analyze_performance"}
+
+
+def summarize(samples):
+    """Latency summary in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "p50_ms": round(percentile(50) * 1000, 3),
+        "p95_ms": round(percentile(95) * 1000, 3),
+        "p99_ms": round(percentile(99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Sends the server's request logging to /dev/null while a measurement runs."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        yield
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def bench_config(standin, workdir):
+    return {
+        'project_id': 'benchmark',
+        'legacy_db_name': standin.schema,
+        'source_pool_size': 8,
+        'target_pool_size': 8,
+        'validation_source_concurrency': 4,
+        'validation_target_concurrency': 8,
+        'checksum_chunk_rows': 100000,
+        'checksum_max_ranges': 50,
+        'batch_workers': 8,
+        'max_workers': 32,
+        'plan_probe_seconds': 1.0,
+        'checkpoint_path': os.path.join(workdir, 'checkpoints.db'),
+    }
+
+
+def attach_standin(mcp_server, standin, config):
+    """Points the server's connection pools at the stand-in instead of the configured databases."""
+    mcp_server.close_db_pools()
+    for key, use_source in (('source', True), ('target', False)):
+        mcp_server._db_pools[key] = mcp_server.ConnectionPool(
+            lambda use_source=use_source: standin.connect(use_source),
+            max_size=config[f'{key}_pool_size'],
+            name=key,
+        )
+    mcp_server.MCPRequestHandler.server_config = config
+
+
+def tool_cases(synthetic, backend):
+    tables = [name for name, _, _ in synthetic.layout()]
+    cases = [
+        ("get_db_size", {}),
+        ("get_row_count", {"table_name": tables[-1]}),
+        ("checksum_table", {"table_name": tables[-1]}),
+        ("validate_tables", {"checks": ["row_count"], "resume": False}),
+        ("checksum_table_chunked", {"table_name": tables[-1], "mode": "chunked", "resume": False}),
+        ("compare_schema", {"refresh": True}),
+        ("plan_migration", {}),
+        ("analyze_performance", {}),
+    ]
+    return [(label, args) for label, args in cases if backend == "mysql" or label not in MYSQL_ONLY_TOOLS]
+
+
+def bench_tool_latency(mcp_server, synthetic, backend, repeat):
+    """Per-tool latency through the request handler, uncached and (for cacheable tools) cached."""
+    results = {}
+    for label, arguments in tool_cases(synthetic, backend):
+        tool = "checksum_table" if label == "checksum_table_chunked" else label
+        request = {"tool": tool, "arguments": arguments}
+        uncached, failures = [], 0
+        with quiet():
+            for _ in range(repeat):
+                started = time.perf_counter()
+                output = mcp_server.MCPRequestHandler.handle_request(dict(request, no_cache=True))["output"]
+                uncached.append(time.perf_counter() - started)
+                failures += str(output).startswith("Error")
+        results[label] = {"uncached": summarize(uncached), "errors": failures}
+        if mcp_server.TOOLS.get(tool).cache_ttl:
+            cached = []
+            with quiet():
+                mcp_server.MCPRequestHandler.handle_request(request)
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    mcp_server.MCPRequestHandler.handle_request(request)
+                    cached.append(time.perf_counter() - started)
+            results[label]["cached"] = summarize(cached)
+    return results
+
+
+def bench_validation(mcp_server, config, synthetic, repeat):
+    """Rows per second validated by validate_tables, per check, plus a resumed run over unchanged tables."""
+    results = {}
+    for label, checks in (("row_count", ["row_count"]), ("checksum", ["checksum"]),
+                          ("row_count+checksum", ["row_count", "checksum"])):
+        timings, mismatched = [], None
+        with quiet():
+            for _ in range(repeat):
+                started = time.perf_counter()
+                report = json.loads(mcp_server.validate_tables(config, checks=checks, resume=False))
+                timings.append(time.perf_counter() - started)
+                mismatched = report["mismatched"]
+        best = min(timings)
+        results[label] = {
+            "seconds": summarize(timings),
+            "rows_per_second": round(synthetic.total_rows / best, 1),
+            "tables_per_second": round(synthetic.tables / best, 2),
+            "mismatched": mismatched,
+        }
+    with quiet():
+        mcp_server.clear_checkpoints(config)
+        mcp_server.validate_tables(config, resume=True)
+        started = time.perf_counter()
+        report = json.loads(mcp_server.validate_tables(config, resume=True))
+        resumed = time.perf_counter() - started
+    results["resumed"] = {"seconds": round(resumed, 4), "skipped_unchanged": report["skipped_unchanged"]}
+    return results
+
+
+def start_server(mcp_server, mode):
+    """Starts the MCP server in this process on a free port; returns (port, stop)."""
+    port = free_port()
+    handler = mcp_server.MCPRequestHandler
+    if mode == 'async':
+        import asyncio
+        server = mcp_server.AsyncMCPServer(
+            handler.handle_request,
+            handler.tool_name_of,
+            long_running=[name for name in mcp_server.TOOLS.names() if mcp_server.TOOLS.get(name).long_running],
+            max_workers=handler.server_config['max_workers'],
+        )
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(server.serve('127.0.0.1', port))
+
+        def serve():
+            try:
+                loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                loop.close()
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+
+        def stop():
+            loop.call_soon_threadsafe(task.cancel)
+            thread.join(timeout=5)
+            server.executor.shutdown(wait=False, cancel_futures=True)
+    else:
+        httpd = mcp_server.ThreadingHTTPServer(('127.0.0.1', port), handler)
+        httpd.daemon_threads = True
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            httpd.shutdown()
+            httpd.server_close()
+    return port, stop
+
+
+def wait_until_healthy(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/healthz')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return True
+            conn.close()
+        except OSError:
+            time.sleep(0.005)
+    return False
+
+
+def bench_load(mcp_server, synthetic, mode, clients, duration, cached):
+    """Requests per second with `clients` concurrent callers issuing get_row_count for random tables."""
+    tables = [name for name, _, _ in synthetic.layout()]
+    port, stop = start_server(mcp_server, mode)
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = [0.0]
+
+    def client(seed):
+        rng = random.Random(seed)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local, failed = [], 0
+        while time.perf_counter() < deadline[0]:
+            body = json.dumps({"tool": "get_row_count", "arguments": {"table_name": rng.choice(tables)},
+                               "no_cache": not cached})
+            started = time.perf_counter()
+            try:
+                conn.request('POST', '/', body, {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                payload = response.read()
+                if response.status != 200 or b'"Error' in payload:
+                    failed += 1
+                if response.getheader('Connection', '').lower() == 'close' or response.version == 10:
+                    conn.close()
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+            local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    try:
+        with quiet():
+            if not wait_until_healthy(port):
+                return {"error": f"{mode} server did not start"}
+            started = time.perf_counter()
+            deadline[0] = started + duration
+            threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - started
+    finally:
+        stop()
+    return {
+        "clients": clients,
+        "seconds": round(elapsed, 3),
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "errors": errors[0],
+        "latency": summarize(latencies),
+    }
+
+
+def bench_startup(mcp_server, repeat):
+    """Module import time in a fresh interpreter, and time from server construction to the first response."""
+    imports = []
+    probe = ("import sys, time; sys.path.insert(0, sys.argv[1]); started = time.perf_counter(); "
+             "import mcp_server; print(time.perf_counter() - started)")
+    results = {}
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', probe, MCP_DIR], capture_output=True, text=True, cwd=MCP_DIR)
+        if result.returncode != 0:
+            lines = result.stderr.strip().splitlines()
+            results["import"] = {"error": lines[-1] if lines else "import failed"}
+            break
+        imports.append(float(result.stdout.strip().splitlines()[-1]))
+    else:
+        results["import"] = summarize(imports)
+    for mode in ('threaded', 'async'):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            port, stop = start_server(mcp_server, mode)
+            with quiet():
+                healthy = wait_until_healthy(port)
+            timings.append(time.perf_counter() - started)
+            stop()
+            if not healthy:
+                return dict(results, error=f"{mode} server did not start")
+        results[f"{mode}_first_response"] = summarize(timings)
+    return results
+
+
+def make_standin(args, workdir):
+    if args.backend == 'mysql':
+        source = {
+            'host': os.environ.get('BENCH_MYSQL_HOST', '127.0.0.1'),
+            'port': int(os.environ.get('BENCH_MYSQL_PORT', '3306')),
+            'user': os.environ.get('BENCH_MYSQL_USER', 'root'),
+            'password': os.environ.get('BENCH_MYSQL_PASSWORD', ''),
+        }
+        target = dict(source)
+        if os.environ.get('BENCH_MYSQL_TARGET_PORT'):
+            target['host'] = os.environ.get('BENCH_MYSQL_TARGET_HOST', source['host'])
+            target['port'] = int(os.environ['BENCH_MYSQL_TARGET_PORT'])
+        return MySQLStandIn(args.schema, source, target)
+    return SQLiteStandIn(os.path.join(workdir, 'sqlite'), args.schema)
+
+
+def run(args):
+    synthetic = SyntheticSchema(args.tables, args.rows, [int(w) for w in args.widths.split(',')], args.seed)
+    with tempfile.TemporaryDirectory(prefix='mcp-bench-') as workdir:
+        standin = make_standin(args, workdir)
+        mismatched = [name for name, _, _ in synthetic.layout()[:args.mismatched_tables]]
+        started = time.perf_counter()
+        standin.prepare(synthetic, mismatched)
+        setup_seconds = time.perf_counter() - started
+        print(f"Generated {synthetic.total_rows} rows in {synthetic.tables} tables ({args.backend}) "
+              f"in {setup_seconds:.1f}s")
+
+        import mcp_server
+        config = bench_config(standin, workdir)
+        attach_standin(mcp_server, standin, config)
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "backend": args.backend,
+                "schema": synthetic.describe(),
+                "mismatched_tables": len(mismatched),
+                "setup_seconds": round(setup_seconds, 3),
+            },
+            "results": {},
+        }
+        suites = args.suites.split(',')
+        try:
+            if 'startup' in suites:
+                print("Measuring startup...")
+                report["results"]["startup"] = bench_startup(mcp_server, args.repeat)
+            if 'tools' in suites:
+                print("Measuring tool latency...")
+                report["results"]["tools"] = bench_tool_latency(mcp_server, synthetic, args.backend, args.repeat)
+            if 'validation' in suites:
+                print("Measuring validation throughput...")
+                report["results"]["validation"] = bench_validation(mcp_server, config, synthetic, args.repeat)
+            if 'load' in suites:
+                load = {}
+                for mode in ('threaded', 'async'):
+                    for cached in (True, False):
+                        print(f"Measuring {mode} server load ({'cached' if cached else 'uncached'})...")
+                        load[f"{mode}_{'cached' if cached else 'uncached'}"] = bench_load(
+                            mcp_server, synthetic, mode, args.clients, args.duration, cached)
+                report["results"]["load"] = load
+        finally:
+            mcp_server.close_db_pools()
+            if mcp_server._checkpoint_store is not None:
+                mcp_server._checkpoint_store.close()
+                mcp_server._checkpoint_store = None
+            standin.close()
+    return report
+
+
+def flatten(value, prefix=""):
+    if isinstance(value, dict):
+        items = {}
+        for key, child in value.items():
+            items.update(flatten(child, f"{prefix}.{key}" if prefix else key))
+        return items
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: value}
+    return {}
+
+
+def compare(baseline_path, candidate_path):
+    """Prints every numeric result present in both reports with its relative change."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+    before, after = flatten(baseline["results"]), flatten(candidate["results"])
+    print(f"baseline  {baseline['meta'].get('commit')}  {baseline['meta'].get('timestamp')}")
+    print(f"candidate {candidate['meta'].get('commit')}  {candidate['meta'].get('timestamp')}")
+    width = max((len(k) for k in before), default=10)
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key], after[key]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"{key:<{width}}  {old:>12}  {new:>12}  {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MCP server against local database stand-ins.")
+    parser.add_argument('--backend', choices=['sqlite', 'mysql'], default='sqlite')
+    parser.add_argument('--schema', default='bench')
+    parser.add_argument('--tables', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=10000, help="rows per table")
+    parser.add_argument('--widths', default='64,512,4096', help="row widths in bytes, cycled over the tables")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mismatched-tables', type=int, default=1,
+                        help="tables whose target copy lacks a row (needs separate source and target)")
+    parser.add_argument('--suites', default='startup,tools,validation,load')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per load run")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help="compare two reports instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+        print(f"Wrote {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+import os
+import random
+import re
+import sqlite3
+import time
+import zlib
+from datetime import datetime, timedelta
+
+# (columns, fixed bytes per row) shared by every generated table; the payload column pads to the row width
+BASE_COLUMNS = [
+    ("id", "BIGINT NOT NULL"),
+    ("account_id", "INT NOT NULL"),
+    ("amount", "DECIMAL(12,2) NOT NULL"),
+    ("created_at", "DATETIME NOT NULL"),
+]
+BASE_ROW_BYTES = 28
+INSERT_BATCH_ROWS = 1000
+
+
+def table_name(index):
+    return f"bench_{index:04d}"
+
+
+def payload_type(width):
+    length = max(1, width - BASE_ROW_BYTES)
+    return "TEXT" if length > 1024 else f"VARCHAR({length})"
+
+
+def create_table_ddl(name, width):
+    columns = BASE_COLUMNS + [("payload", payload_type(width))]
+    body = ", ".join(f"`{column}` {kind}" for column, kind in columns)
+    return f"CREATE TABLE `{name}` ({body}, PRIMARY KEY (`id`))"
+
+
+def generate_rows(seed, rows, width):
+    """Yields deterministic rows for one table; the same seed always gives the same data."""
+    rng = random.Random(seed)
+    length = max(1, width - BASE_ROW_BYTES)
+    alphabet = "abcdefghijklmnopqrstuvwxyz0123456789"
+    start = datetime(2024, 1, 1)
+    for row_id in range(1, rows + 1):
+        yield (
+            row_id,
+            rng.randrange(1, 100000),
+            f"{rng.randrange(0, 10 ** 8) / 100:.2f}",
+            (start + timedelta(seconds=rng.randrange(0, 365 * 86400))).strftime("%Y-%m-%d %H:%M:%S"),
+            "".join(rng.choices(alphabet, k=rng.randrange(length // 2, length + 1))),
+        )
+
+
+class SyntheticSchema:
+    """
+    `tables` tables of `rows` rows each, with row widths cycling through
+    `widths` (bytes). Generation is seeded, so two runs with the same
+    parameters compare identical data.
+    """
+
+    def __init__(self, tables=20, rows=10000, widths=(64, 512, 4096), seed=1):
+        self.tables = tables
+        self.rows = rows
+        self.widths = list(widths)
+        self.seed = seed
+
+    def layout(self):
+        """Returns [(table, width, seed)]."""
+        return [(table_name(i), self.widths[i % len(self.widths)], self.seed * 100003 + i) for i in range(self.tables)]
+
+    @property
+    def total_rows(self):
+        return self.tables * self.rows
+
+    def describe(self):
+        return {"tables": self.tables, "rows_per_table": self.rows, "widths": self.widths, "seed": self.seed,
+                "total_rows": self.total_rows}
+
+    def load(self, conn, mismatched_tables=()):
+        """Creates and fills every table on `conn`, leaving out the last row of `mismatched_tables`."""
+        cursor = conn.cursor()
+        columns = ", ".join(f"`{c}`" for c, _ in BASE_COLUMNS + [("payload", None)])
+        for name, width, seed in self.layout():
+            cursor.execute(f"DROP TABLE IF EXISTS `{name}`")
+            cursor.execute(create_table_ddl(name, width))
+            rows = self.rows - 1 if name in mismatched_tables else self.rows
+            batch = []
+            for row in generate_rows(seed, rows, width):
+                batch.append(row)
+                if len(batch) == INSERT_BATCH_ROWS:
+                    cursor.executemany(f"INSERT INTO `{name}` ({columns}) VALUES (%s, %s, %s, %s, %s)", batch)
+                    batch = []
+            if batch:
+                cursor.executemany(f"INSERT INTO `{name}` ({columns}) VALUES (%s, %s, %s, %s, %s)", batch)
+            conn.commit()
+        cursor.close()
+
+
+class MySQLStandIn:
+    """
+    Source and target on a local MySQL server (e.g. the mysql:8 container).
+
+    Both sides use the schema `schema`. With a separate target server (a second
+    container on another port) the two sides hold their own copies; otherwise
+    source and target are the same database and every table matches.
+    """
+
+    name = "mysql"
+
+    def __init__(self, schema="bench", source=None, target=None):
+        import mysql.connector
+        self._connector = mysql.connector
+        self.schema = schema
+        self.source = source or {"host": "127.0.0.1", "port": 3306, "user": "root", "password": ""}
+        self.target = target or self.source
+        self.separate_target = self.target != self.source
+
+    def connect(self, use_source=True):
+        options = self.source if use_source else self.target
+        return self._connector.connect(database=self.schema, autocommit=True, **options)
+
+    def prepare(self, synthetic, mismatched_tables=()):
+        sides = [(self.source, ())]
+        if self.separate_target:
+            sides.append((self.target, mismatched_tables))
+        for options, mismatched in sides:
+            admin = self._connector.connect(autocommit=True, **options)
+            cursor = admin.cursor()
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{self.schema}`")
+            cursor.close()
+            admin.close()
+            conn = self._connector.connect(database=self.schema, **options)
+            synthetic.load(conn, mismatched)
+            cursor = conn.cursor()
+            # Refresh TABLE_ROWS and DATA_LENGTH so size- and stats-based tools see the new data
+            for name, _, _ in synthetic.layout():
+                cursor.execute(f"ANALYZE TABLE `{name}`")
+                cursor.fetchall()
+            cursor.close()
+            conn.close()
+
+    def close(self):
+        pass
+
+
+class SQLiteStandIn:
+    """
+    Source and target as two SQLite files, reached through connections that
+    accept the MySQL statements the validation and size tools issue: %s
+    placeholders, `CHECKSUM TABLE` and `information_schema.tables`.
+
+    Table statistics are written to an attached `information_schema` database
+    once the data is loaded, the way InnoDB keeps them, so reading them costs a
+    lookup rather than a scan. Tools that need other MySQL features (chunked
+    checksums, compare_schema, plan_migration) require the MySQL stand-in.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, directory, schema="bench"):
+        self.directory = directory
+        self.schema = schema
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, use_source, suffix=""):
+        return os.path.join(self.directory, f"{'source' if use_source else 'target'}{suffix}.db")
+
+    def connect(self, use_source=True, isolation_level=None):
+        # The tools expect autocommit connections; loading uses one transaction per table instead
+        conn = sqlite3.connect(self._path(use_source), check_same_thread=False, isolation_level=isolation_level)
+        conn.execute("ATTACH DATABASE ? AS information_schema", (self._path(use_source, "_information_schema"),))
+        return MySQLDialectConnection(conn, self.schema)
+
+    def prepare(self, synthetic, mismatched_tables=()):
+        for use_source in (True, False):
+            for suffix in ("", "_information_schema"):
+                path = self._path(use_source, suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+            conn = self.connect(use_source, isolation_level="")
+            conn.raw.execute("PRAGMA journal_mode=WAL")
+            synthetic.load(conn, () if use_source else mismatched_tables)
+            self._write_statistics(conn.raw, synthetic)
+            conn.commit()
+            conn.close()
+
+    def _write_statistics(self, raw, synthetic):
+        raw.execute("""
+            CREATE TABLE information_schema.tables (
+                table_schema TEXT, table_name TEXT, table_type TEXT, table_rows INTEGER,
+                data_length REAL, index_length REAL, update_time TEXT
+            )
+        """)
+        updated = time.strftime("%Y-%m-%d %H:%M:%S")
+        for name, _, _ in synthetic.layout():
+            rows, data_length = raw.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(LENGTH(payload) + {BASE_ROW_BYTES}), 0) FROM `{name}`"
+            ).fetchone()
+            raw.execute(
+                "INSERT INTO information_schema.tables VALUES (?, ?, 'BASE TABLE', ?, ?, ?, ?)",
+                (self.schema, name, rows, float(data_length), float(rows * 16), updated),
+            )
+
+    def close(self):
+        pass
+
+
+class MySQLDialectConnection:
+    """sqlite3 connection wrapper with the connection methods the MCP tools call."""
+
+    def __init__(self, raw, schema):
+        self.raw = raw
+        self.schema = schema
+
+    def cursor(self, *args, **kwargs):
+        return MySQLDialectCursor(self.raw.cursor(), self.schema)
+
+    def commit(self):
+        if self.raw.in_transaction:
+            self.raw.commit()
+
+    def rollback(self):
+        if self.raw.in_transaction:
+            self.raw.rollback()
+
+    def is_connected(self):
+        try:
+            self.raw.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self.raw.close()
+
+
+CHECKSUM_TABLE = re.compile(r"^\s*CHECKSUM\s+TABLE\s+`?((?:[^`]|``)+)`?\s*$", re.IGNORECASE)
+
+
+class MySQLDialectCursor:
+    """
+    Translates %s placeholders, ignores SET statements and answers
+    CHECKSUM TABLE with a CRC32 over the rows in primary key order.
+    """
+
+    def __init__(self, cursor, schema):
+        self._cursor = cursor
+        self._schema = schema
+        self._rows = None
+
+    def execute(self, query, params=()):
+        self._rows = None
+        stripped = query.strip()
+        if stripped.upper().startswith("SET "):
+            self._rows = []
+            return
+        match = CHECKSUM_TABLE.match(stripped)
+        if match:
+            table = match.group(1).replace("``", "`")
+            self._rows = [(f"{self._schema}.{table}", self._checksum(table))]
+            return
+        self._cursor.execute(query.replace("%s", "?"), tuple(params or ()))
+
+    def executemany(self, query, seq_of_params):
+        self._cursor.executemany(query.replace("%s", "?"), seq_of_params)
+
+    def _checksum(self, table):
+        try:
+            quoted = table.replace('"', '""')
+            rows = self._cursor.execute(f'SELECT * FROM "{quoted}" ORDER BY 1')
+        except sqlite3.OperationalError:
+            return None
+        crc = 0
+        for row in rows:
+            crc = zlib.crc32(repr(row).encode("utf-8"), crc)
+        return crc
+
+    def fetchone(self):
+        if self._rows is not None:
+            return self._rows.pop(0) if self._rows else None
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        if self._rows is not None:
+            rows, self._rows = self._rows[:size], self._rows[size:]
+            return rows
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        if self._rows is not None:
+            rows, self._rows = self._rows, []
+            return rows
+        return self._cursor.fetchall()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
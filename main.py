@@ -3,6 +3,7 @@
 import autogen
 from autogen.graph_utils import DiGraphBuilder
 import json
+import os
 import time
 import requests
 from agents.environment_setup_agent import create_environment_setup_agent
@@ -13,6 +14,97 @@ from agents.anomaly_detection_agent import create_anomaly_detection_agent
 from agents.performance_optimization_agent import create_performance_optimization_agent
 from tools.gemini_client import GeminiClient
 from tools.secret_manager import SecretManager
+from tools.graph_runner import ParallelGraphRunner, format_timings, timings_json
+
+# Per-node timeouts (seconds) for the parallel orchestrator; migration may take hours
+NODE_TIMEOUTS = {
+    "EnvironmentSetupAgent": 600,
+    "SchemaConversionAgent": 1800,
+    "DataMigrationAgent": 6 * 3600,
+    "AnomalyDetectionAgent": 6 * 3600,
+    "DataValidationAgent": 4 * 3600,
+    "PerformanceOptimizationAgent": 1800,
+}
+
+def workflow_edges(env_agent, schema_agent, migration_agent, validation_agent, anomaly_agent, perf_agent):
+    """The workflow as (agent, agent that follows it); both GraphFlow and parallel mode use it."""
+    return [
+        (env_agent, schema_agent),
+        (schema_agent, migration_agent),
+        # Anomaly detection runs in parallel with migration
+        (migration_agent, anomaly_agent),
+        # Validation happens after migration
+        (migration_agent, validation_agent),
+        # Anomaly detection must also finish before validation
+        (anomaly_agent, validation_agent),
+        # Performance optimization is the final step
+        (validation_agent, perf_agent),
+    ]
+
+def node_dependencies(agent, edges, concurrent=()):
+    """
+    The agents `agent` waits for in parallel mode. For an edge listed in
+    `concurrent`, the agent starts alongside the one before it instead of
+    after it, so it waits for that agent's own dependencies.
+    """
+    depends_on = []
+    for before, after in edges:
+        if after is not agent:
+            continue
+        if (before, after) in concurrent:
+            depends_on += node_dependencies(before, edges, concurrent)
+        else:
+            depends_on.append(before.name)
+    return list(dict.fromkeys(depends_on))
+
+def agent_step(agent):
+    """
+    Adapts an agent to a graph node: one reply to the messages gathered so far.
+    A node timeout abandons the step: the orchestrator stops waiting and skips
+    the agents downstream, but the reply already in flight (its LLM call runs
+    on a worker thread) and any tool call it makes may still complete.
+    """
+    async def run(messages, *table_group):
+        if table_group:
+            messages = messages + [{
+                "role": "user",
+                "content": f"Restrict this step to these tables: {table_group[0]}. Pass them as the 'tables' argument.",
+            }]
+        reply = await agent.a_generate_reply(messages=messages)
+        if isinstance(reply, dict):
+            return reply.get("content") or ""
+        return str(reply or "")
+    return run
+
+def run_parallel_workflow(initial_prompt, agents, edges, validation_agent, perf_agent, concurrent=()):
+    """
+    Runs the workflow graph with independent branches in parallel: each agent
+    starts as soon as the agents before it in `edges` have finished (or, for
+    the edges in `concurrent`, alongside the agent before it), and validation
+    can fan out over table groups (VALIDATION_TABLE_GROUPS="a,b;c,d").
+    """
+    default_timeout = float(os.environ.get("ORCHESTRATOR_NODE_TIMEOUT", "0")) or None
+    runner = ParallelGraphRunner(default_timeout=default_timeout)
+
+    groups = [g.strip() for g in os.environ.get("VALIDATION_TABLE_GROUPS", "").split(";") if g.strip()]
+    for agent in agents:
+        runner.add_node(
+            agent.name,
+            agent_step(agent),
+            node_dependencies(agent, edges, concurrent),
+            default_timeout or NODE_TIMEOUTS.get(agent.name),
+            fan_out=(groups or None) if agent is validation_agent else None,
+        )
+
+    report = runner.run(initial_prompt)
+    print(format_timings(report))
+    timings_path = os.environ.get("ORCHESTRATOR_TIMINGS_PATH")
+    if timings_path:
+        with open(timings_path, "w") as f:
+            f.write(timings_json(report))
+    final = report["nodes"][perf_agent.name]
+    print(final.get("output") or f"Workflow did not complete: {final.get('reason', final['status'])}")
+    return report
 
 def main():
     """
@@ -22,7 +114,8 @@ def main():
 
     # Initialize secret manager to fetch configuration
     secret_manager = SecretManager()
-    project_id = secret_manager.get_secret("gcp_project_id")
+    # Fetch everything the orchestrator needs in one concurrent round trip
+    project_id = secret_manager.prefetch(["gcp_project_id", "gemini_api_key"])["gcp_project_id"]
     if not project_id:
         raise ValueError("GCP_PROJECT_ID not found in Secret Manager.")
 
@@ -51,7 +144,27 @@ def main():
     validation_agent = create_data_validation_agent(llm_config)
     anomaly_agent = create_anomaly_detection_agent(llm_config)
     perf_agent = create_performance_optimization_agent(llm_config)
+    agents = [env_agent, schema_agent, migration_agent, validation_agent, anomaly_agent, perf_agent]
+    edges = workflow_edges(*agents)
+
+    # Initial message to kick off the workflow
+    initial_prompt = f"""
+    The migration process for project '{project_id}' is ready to begin.
+    
+    Your first task, EnvironmentSetupAgent, is to call the 'terraform_output' tool via the MCP server to get the details of our provisioned infrastructure. This information will be used by subsequent agents.
     
+    The MCP tool expects a JSON payload like: {{"tool": "terraform_output"}}
+    """
+
+    # ORCHESTRATOR_MODE=parallel schedules independent agents concurrently instead of one at a time
+    if os.environ.get("ORCHESTRATOR_MODE", "graphflow") == "parallel":
+        print("--- Running workflow in parallel mode ---")
+        # Anomaly monitoring watches the migration while it runs rather than after it
+        run_parallel_workflow(initial_prompt, agents, edges, validation_agent, perf_agent,
+                              concurrent=[(migration_agent, anomaly_agent)])
+        print("--- Migration Workflow Complete ---")
+        return
+
     # User proxy to manage the conversation flow
     user_proxy = autogen.UserProxyAgent(
         name="UserProxy",
@@ -68,34 +181,13 @@ def main():
 
     # Define the sequence and dependencies
     graph.add_edge(user_proxy, env_agent)
-    graph.add_edge(env_agent, schema_agent)
-    graph.add_edge(schema_agent, migration_agent)
-    
-    # Anomaly detection runs in parallel with migration
-    graph.add_edge(migration_agent, anomaly_agent)
-    
-    # Validation happens after migration
-    graph.add_edge(migration_agent, validation_agent)
-    
-    # Anomaly detection must also finish before validation
-    graph.add_edge(anomaly_agent, validation_agent)
-
-    # Performance optimization is the final step
-    graph.add_edge(validation_agent, perf_agent)
+    for before, after in edges:
+        graph.add_edge(before, after)
     graph.add_edge(perf_agent, user_proxy) # Report back to proxy
 
     workflow = graph.build()
     print("--- Workflow Graph Built Successfully ---")
 
-    # Initial message to kick off the workflow
-    initial_prompt = f"""
-    The migration process for project '{project_id}' is ready to begin.
-    
-    Your first task, EnvironmentSetupAgent, is to call the 'terraform_output' tool via the MCP server to get the details of our provisioned infrastructure. This information will be used by subsequent agents.
-    
-    The MCP tool expects a JSON payload like: {{"tool": "terraform_output"}}
-    """
-    
     # Initiate the chat
     user_proxy.initiate_chat(
         recipient=workflow,
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+MAX_HEADER_COUNT = 100
+MAX_HEADER_BYTES = 64 * 1024
+
+
+class RequestError(ValueError):
+    """A request the server refuses, with the HTTP status to answer it with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Job:
+    """A tool call running in the background, addressable by its id."""
+
+    def __init__(self, tool_name, request_data):
+        self.id = uuid.uuid4().hex
+        self.tool_name = tool_name
+        self.request_data = request_data
+        self.status = "pending"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done = asyncio.Event()
+
+    def to_dict(self, include_result=True, progress=None):
+        now = time.time()
+        data = {
+            "job_id": self.id,
+            "tool": self.tool_name,
+            "status": self.status,
+            "created": self.created,
+            "elapsed_seconds": round((self.finished or now) - (self.started or now), 3),
+        }
+        if progress is not None:
+            data["progress"] = progress
+        if include_result and self.status == "succeeded":
+            data["result"] = self.result
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """
+    Tracks background jobs. Finished jobs are kept for `retention_seconds` so
+    clients that timed out can still collect their result.
+    """
+
+    def __init__(self, retention_seconds=3600, max_jobs=1000):
+        self.retention_seconds = retention_seconds
+        self.max_jobs = max_jobs
+        self._jobs = {}
+
+    def add(self, job):
+        self._prune()
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def list(self):
+        return list(self._jobs.values())
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished < cutoff:
+                del self._jobs[job_id]
+        # Drop the oldest finished jobs if the table is still over its cap
+        finished = sorted((j for j in self._jobs.values() if j.finished), key=lambda j: j.finished)
+        for job in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job.id]
+
+
+class AsyncMCPServer:
+    """
+    asyncio HTTP front end for the MCP tools.
+
+    Connections are served by the event loop, and tool calls run on one bounded
+    thread pool, so many concurrent callers do not each get an OS thread. Tools
+    in `long_running` (or any request with "async": true) return a job id at
+    once with HTTP 202; clients poll GET /jobs/<id> or follow progress as
+    server-sent events from GET /jobs/<id>/events.
+
+    `handle_request(request_data)` is the blocking tool dispatcher, and
+    `progress_for(tool_name)` returns a progress snapshot for a tool, or None.
+    `get_routes` maps extra GET paths to (content type, callable returning the body).
+    """
+
+    def __init__(self, handle_request, tool_name_of, long_running=(), progress_for=None,
+                 get_routes=None, max_workers=32, event_interval=1.0):
+        self.handle_request = handle_request
+        self.get_routes = get_routes or {}
+        self.tool_name_of = tool_name_of
+        self.long_running = set(long_running)
+        self.progress_for = progress_for or (lambda tool_name: None)
+        self.event_interval = event_interval
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="mcp-tool")
+        self.jobs = JobManager()
+        # The event loop only keeps weak references to tasks
+        self._job_tasks = set()
+
+    async def serve(self, host='', port=8000):
+        server = await asyncio.start_server(self._serve_connection, host or None, port)
+        async with server:
+            await server.serve_forever()
+
+    def run(self, host='', port=8000):
+        try:
+            asyncio.run(self.serve(host, port))
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                if method == 'GET' and path.startswith('/jobs/') and path.endswith('/events'):
+                    await self._stream_events(writer, path[len('/jobs/'):-len('/events')])
+                    break
+                status, content_type, payload = await self._route(method, path, body)
+                await _write_response(writer, status, content_type, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            status = getattr(e, 'status', HTTPStatus.BAD_REQUEST)
+            await _write_response(writer, status, 'text/plain', str(e).encode(), False)
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if method == 'GET' and path == '/healthz':
+            return HTTPStatus.OK, 'text/plain', b'ok'
+        if method == 'GET' and path in self.get_routes:
+            content_type, render = self.get_routes[path]
+            return HTTPStatus.OK, content_type, render().encode('utf-8')
+        if method == 'GET' and path == '/jobs':
+            jobs = [job.to_dict(include_result=False) for job in self.jobs.list()]
+            return HTTPStatus.OK, 'application/json', json.dumps(jobs).encode('utf-8')
+        if method == 'GET' and path.startswith('/jobs/'):
+            job = self.jobs.get(path[len('/jobs/'):])
+            if job is None:
+                return HTTPStatus.NOT_FOUND, 'text/plain', b'Job not found'
+            body = job.to_dict(progress=self._progress(job))
+            return HTTPStatus.OK, 'application/json', json.dumps(body, default=str).encode('utf-8')
+        if method == 'POST':
+            try:
+                request_data = json.loads(body)
+            except json.JSONDecodeError:
+                return HTTPStatus.BAD_REQUEST, 'text/plain', b'Invalid JSON'
+            print(f"Received request: {request_data}")
+            tool_name = self.tool_name_of(request_data)
+            if request_data.get('async') or tool_name in self.long_running:
+                job = self.jobs.add(Job(tool_name, request_data))
+                task = asyncio.get_running_loop().create_task(self._run_job(job))
+                self._job_tasks.add(task)
+                task.add_done_callback(self._job_tasks.discard)
+                body = job.to_dict()
+                body["status_url"] = f"/jobs/{job.id}"
+                body["events_url"] = f"/jobs/{job.id}/events"
+                return HTTPStatus.ACCEPTED, 'application/json', json.dumps(body).encode('utf-8')
+            try:
+                response = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.handle_request, request_data)
+            except Exception as e:
+                print(f"Error handling request: {e}")
+                return HTTPStatus.INTERNAL_SERVER_ERROR, 'text/plain', b'Internal Server Error'
+            return HTTPStatus.OK, 'application/json', json.dumps(response, default=str).encode('utf-8')
+        return HTTPStatus.NOT_FOUND, 'text/plain', b'File Not Found'
+
+    async def _run_job(self, job):
+        try:
+            job.result = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._execute_job, job)
+            job.status = "succeeded"
+        except Exception as e:
+            print(f"Job {job.id} ({job.tool_name}) failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+            job.done.set()
+
+    def _execute_job(self, job):
+        # Runs on the executor, so a job stays "pending" while it waits for a free worker
+        job.status = "running"
+        job.started = time.time()
+        return self.handle_request(job.request_data)
+
+    def _progress(self, job):
+        if job.status != "running":
+            return None
+        try:
+            return self.progress_for(job.tool_name)
+        except Exception:
+            return None
+
+    async def _stream_events(self, writer, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            await _write_response(writer, HTTPStatus.NOT_FOUND, 'text/plain', b'Job not found', False)
+            return
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n"
+        )
+        while not job.done.is_set():
+            await _write_event(writer, "progress", job.to_dict(include_result=False, progress=self._progress(job)))
+            try:
+                await asyncio.wait_for(job.done.wait(), self.event_interval)
+            except asyncio.TimeoutError:
+                pass
+        await _write_event(writer, "result", job.to_dict())
+
+
+async def _read_request(reader):
+    """Reads one HTTP/1.1 request; returns None when the client has closed the connection."""
+    try:
+        request_line = await reader.readline()
+    except ConnectionError:
+        return None
+    if not request_line.strip():
+        return None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise ValueError("Malformed request line")
+    method, path, _ = parts
+    headers = {}
+    header_count = header_bytes = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        header_count += 1
+        header_bytes += len(line)
+        if header_count > MAX_HEADER_COUNT or header_bytes > MAX_HEADER_BYTES:
+            raise RequestError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many or too large headers")
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    # Bodies are read by Content-Length only; a chunked body must not be dispatched as an empty one
+    if headers.get('transfer-encoding', 'identity').lower() != 'identity':
+        raise RequestError(HTTPStatus.NOT_IMPLEMENTED, "Transfer-Encoding is not supported; send Content-Length")
+    if method.upper() == 'POST' and 'content-length' not in headers:
+        raise RequestError(HTTPStatus.LENGTH_REQUIRED, "Content-Length required")
+    length = int(headers.get('content-length') or 0)
+    if length < 0:
+        raise ValueError("Invalid Content-Length")
+    if length > MAX_REQUEST_BYTES:
+        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), path.split('?', 1)[0], headers, body
+
+
+async def _write_response(writer, status, content_type, payload, keep_alive):
+    status = HTTPStatus(status)
+    writer.write(
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + payload
+    )
+    await writer.drain()
+
+
+async def _write_event(writer, event, data):
+    writer.write(f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode('utf-8'))
+    await writer.drain()
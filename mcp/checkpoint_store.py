@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def fetch_table_fingerprints(conn, schema, table_name=None):
+    """
+    Returns {table: (UPDATE_TIME, TABLE_ROWS, DATA_LENGTH)} for one or all tables
+    of a schema in a single information_schema query.
+    """
+    cursor = conn.cursor()
+    try:
+        try:
+            # MySQL 8 caches these statistics for a day by default; read them fresh
+            cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+        except Exception:
+            pass  # MySQL 5.7 has no cache and no such variable
+        query = """
+            SELECT table_name, update_time, table_rows, data_length
+            FROM information_schema.tables
+            WHERE table_schema = %s AND table_type = 'BASE TABLE'
+        """
+        params = (schema,)
+        if table_name is not None:
+            query += " AND table_name = %s"
+            params = (schema, table_name)
+        cursor.execute(query, params)
+        return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def combine_fingerprints(source, target):
+    """
+    Hashes the source and target statistics of a table into one fingerprint.
+    Returns None when either side has no UPDATE_TIME (e.g. InnoDB after a restart),
+    since the table cannot then be proven unchanged.
+    """
+    if not source or not target or source[0] is None or target[0] is None:
+        return None
+    raw = json.dumps([source, target], default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """
+    SQLite-backed record of per-table and per-chunk validation results, plus the
+    read positions of the log monitor.
+
+    Results are keyed by a fingerprint of both tables' statistics, so a rerun
+    can skip work whose inputs have not changed since it last passed. Safe to
+    share between threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS table_results (
+                    table_name TEXT NOT NULL,
+                    check_name TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    matched INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    validated_at REAL NOT NULL,
+                    PRIMARY KEY (table_name, check_name)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunk_results (
+                    table_name TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    chunk_start INTEGER NOT NULL,
+                    chunk_end INTEGER NOT NULL,
+                    source_hash TEXT NOT NULL,
+                    target_hash TEXT NOT NULL,
+                    PRIMARY KEY (table_name, fingerprint, chunk_start, chunk_end)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS log_cursors (
+                    source TEXT PRIMARY KEY,
+                    cursor TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def get_table_result(self, table_name, check_name, fingerprint):
+        """Returns the stored result if it was recorded under the same fingerprint."""
+        if fingerprint is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM table_results WHERE table_name = ? AND check_name = ? AND fingerprint = ?",
+                (table_name, check_name, fingerprint),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_table_result(self, table_name, check_name, fingerprint, result, matched):
+        if fingerprint is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO table_results VALUES (?, ?, ?, ?, ?, ?)",
+                (table_name, check_name, fingerprint, int(bool(matched)),
+                 json.dumps(result, default=str), time.time()),
+            )
+            # Chunk checkpoints only matter until the table as a whole has a result
+            self._conn.execute(
+                "DELETE FROM chunk_results WHERE table_name = ? AND fingerprint != ?",
+                (table_name, fingerprint),
+            )
+
+    def get_chunk_results(self, table_name, fingerprint):
+        """Returns {(start, end): (source_hash, target_hash)} recorded under the fingerprint."""
+        if fingerprint is None:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_start, chunk_end, source_hash, target_hash FROM chunk_results "
+                "WHERE table_name = ? AND fingerprint = ?",
+                (table_name, fingerprint),
+            ).fetchall()
+        return {(r[0], r[1]): (tuple(json.loads(r[2])), tuple(json.loads(r[3]))) for r in rows}
+
+    def save_chunk_result(self, table_name, fingerprint, chunk, source_hash, target_hash):
+        if fingerprint is None:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunk_results VALUES (?, ?, ?, ?, ?, ?)",
+                (table_name, fingerprint, chunk[0], chunk[1],
+                 json.dumps(list(source_hash)), json.dumps(list(target_hash))),
+            )
+
+    def get_cursor(self, source):
+        """Returns the saved read position of a log source, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT cursor FROM log_cursors WHERE source = ?", (source,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_cursor(self, source, cursor):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO log_cursors VALUES (?, ?, ?)",
+                (source, json.dumps(cursor), time.time()),
+            )
+
+    def clear(self, table_name=None):
+        """Forgets checkpoints for one table, or for all tables."""
+        with self._lock, self._conn:
+            if table_name is None:
+                self._conn.execute("DELETE FROM table_results")
+                self._conn.execute("DELETE FROM chunk_results")
+            else:
+                self._conn.execute("DELETE FROM table_results WHERE table_name = ?", (table_name,))
+                self._conn.execute("DELETE FROM chunk_results WHERE table_name = ?", (table_name,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
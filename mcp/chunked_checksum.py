@@ -0,0 +1,270 @@
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from checkpoint_store import combine_fingerprints, fetch_table_fingerprints
+from table_validation import quote_identifier
+
+# Leading primary key types that can be split into arithmetic key ranges
+CHUNKABLE_KEY_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+
+
+def describe_table(conn, schema, table_name):
+    """Returns (leading primary key column, its data type, all columns in ordinal order)."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT c.column_name, c.data_type, k.ordinal_position
+            FROM information_schema.columns c
+            LEFT JOIN information_schema.key_column_usage k
+              ON k.table_schema = c.table_schema AND k.table_name = c.table_name
+             AND k.column_name = c.column_name AND k.constraint_name = 'PRIMARY'
+            WHERE c.table_schema = %s AND c.table_name = %s
+            ORDER BY c.ordinal_position
+        """, (schema, table_name))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if not rows:
+        raise LookupError(f"table '{table_name}' does not exist")
+    key_columns = sorted((r for r in rows if r[2] is not None), key=lambda r: r[2])
+    key_column, key_type = (key_columns[0][0], key_columns[0][1].lower()) if key_columns else (None, None)
+    return key_column, key_type, [r[0] for r in rows]
+
+
+def row_hash_expression(columns):
+    """
+    CRC32 over the row concatenation. CONCAT_WS skips NULLs, so a NULL marker
+    per column keeps (NULL, '') and ('', NULL) from hashing the same.
+    """
+    quoted = [quote_identifier(c) for c in columns]
+    null_markers = ", ".join(f"ISNULL({c})" for c in quoted)
+    return f"CRC32(CONCAT_WS('#', {', '.join(quoted)}, CONCAT({null_markers})))"
+
+
+class ChunkedChecksum:
+    """
+    Compares a table chunk by chunk over ranges of its leading primary key column.
+
+    Each chunk is reduced on the server to (row count, BIT_XOR of row CRC32s), so
+    memory stays constant and each scan is bounded to roughly `chunk_rows` rows.
+    Chunks start at every `chunk_rows`-th key of the source, read off the primary
+    key before hashing, so clustered or sparse keys do not put most rows in one chunk.
+    Source and target chunks are hashed concurrently; a mismatching chunk is split
+    `split_factor` ways and re-compared until the differing ranges are at most
+    `min_range` keys wide. A chunk is only split while the report can still hold
+    all of its pieces within `max_ranges`; past that, or once `max_chunk_queries`
+    source/target query pairs have run, differing chunks are reported as coarse
+    ranges and `truncated` is set. Top-level chunks beyond `max_chunk_queries`
+    are listed in `unchecked_ranges` and the report is not `complete`.
+
+    With a `checkpoints` store, an unchanged table that already matched is not
+    scanned again, and an interrupted or incomplete run resumes after its last
+    completed chunk.
+    """
+
+    def __init__(self, connect, schema, chunk_rows=100000, split_factor=8, min_range=1,
+                 max_ranges=50, max_chunk_queries=10000, source_concurrency=4, target_concurrency=8,
+                 checkpoints=None):
+        self.connect = connect
+        self.checkpoints = checkpoints
+        self.schema = schema
+        self.chunk_rows = max(1, chunk_rows)
+        self.split_factor = max(2, split_factor)
+        self.min_range = max(1, min_range)
+        self.max_ranges = max(1, max_ranges)
+        self.max_chunk_queries = max(1, max_chunk_queries)
+        self.source_concurrency = max(1, source_concurrency)
+        self.target_concurrency = max(1, target_concurrency)
+
+    def compare(self, table_name):
+        """Returns a report dict for one table."""
+        started = time.monotonic()
+        with ThreadPoolExecutor(self.source_concurrency, thread_name_prefix="chunk-src") as source_pool, \
+                ThreadPoolExecutor(self.target_concurrency, thread_name_prefix="chunk-tgt") as target_pool:
+            key_column, key_type, columns = self._on_side(True, describe_table, self.schema, table_name)
+            if key_column is None or key_type not in CHUNKABLE_KEY_TYPES:
+                raise ValueError(
+                    f"chunked mode needs an integer leading primary key on '{table_name}'; "
+                    "use the default checksum mode instead"
+                )
+            source_stats = source_pool.submit(self._on_side, True, fetch_table_fingerprints, self.schema, table_name)
+            target_stats = target_pool.submit(self._on_side, False, fetch_table_fingerprints, self.schema, table_name)
+            fingerprint = combine_fingerprints(source_stats.result().get(table_name),
+                                               target_stats.result().get(table_name))
+            if self.checkpoints:
+                cached = self.checkpoints.get_table_result(table_name, "chunked", fingerprint)
+                if cached is not None and cached["match"]:
+                    return dict(cached, unchanged=True, elapsed_seconds=round(time.monotonic() - started, 3))
+
+            source_bounds = source_pool.submit(self._on_side, True, self._bounds, table_name, key_column)
+            target_bounds = target_pool.submit(self._on_side, False, self._bounds, table_name, key_column)
+            lows = [b[0] for b in (source_bounds.result(), target_bounds.result()) if b[0] is not None]
+            highs = [b[1] for b in (source_bounds.result(), target_bounds.result()) if b[1] is not None]
+
+            report = {
+                "table": table_name,
+                "mode": "chunked",
+                "key": key_column,
+                "chunks": 0,
+                "chunk_queries": 0,
+                "source_rows": 0,
+                "target_rows": 0,
+                "match": True,
+                "mismatched_ranges": [],
+                "truncated": False,
+                "complete": True,
+                "unchecked_ranges": [],
+                "resumed_chunks": 0,
+            }
+            if lows:
+                low, high = int(min(lows)), int(max(highs))
+                starts = source_pool.submit(self._on_side, True, self._chunk_starts, table_name, key_column, low)
+                self._compare_ranges(report, source_pool, target_pool, table_name, key_column,
+                                     columns, starts.result(), high, fingerprint)
+
+        report["mismatched_ranges"] = _merge_adjacent(report["mismatched_ranges"])
+        report["unchecked_ranges"] = [{"from": r["from"], "to": r["to"]}
+                                      for r in _merge_adjacent(report["unchecked_ranges"])]
+        if self.checkpoints:
+            self.checkpoints.save_table_result(table_name, "chunked", fingerprint, report, report["match"])
+        report["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        return report
+
+    def compare_json(self, table_name):
+        return json.dumps(self.compare(table_name), separators=(",", ":"), default=str)
+
+    def _compare_ranges(self, report, source_pool, target_pool, table_name, key_column, columns,
+                        starts, high, fingerprint):
+        level = list(zip(starts, starts[1:] + [high + 1]))
+        report["chunks"] = len(level)
+        query = self._chunk_query(table_name, key_column, columns)
+        # Top-level chunks that matched in an interrupted run with the same fingerprint
+        completed = self.checkpoints.get_chunk_results(table_name, fingerprint) if self.checkpoints else {}
+
+        depth = 0
+        while level:
+            futures, submitted = [], 0
+            for chunk in level:
+                previous = completed.get(chunk) if depth == 0 else None
+                if previous is not None and previous[0] == previous[1]:
+                    report["resumed_chunks"] += 1
+                    futures.append((chunk, previous[0], previous[1]))
+                    continue
+                if report["chunk_queries"] + submitted >= self.max_chunk_queries:
+                    # Only top-level chunks can get here; deeper levels are sized to the remaining budget
+                    report["complete"] = False
+                    report["match"] = False
+                    report["unchecked_ranges"].append({"from": chunk[0], "to": chunk[1] - 1,
+                                                       "source_rows": 0, "target_rows": 0})
+                    continue
+                submitted += 1
+                futures.append((chunk,
+                                source_pool.submit(self._on_side, True, _chunk_hash, query, chunk),
+                                target_pool.submit(self._on_side, False, _chunk_hash, query, chunk)))
+            mismatching = []
+            for (start, end), source_outcome, target_outcome in futures:
+                if isinstance(source_outcome, tuple):
+                    source_hash, target_hash = source_outcome, target_outcome
+                else:
+                    source_hash, target_hash = source_outcome.result(), target_outcome.result()
+                    report["chunk_queries"] += 1
+                    if depth == 0 and self.checkpoints:
+                        self.checkpoints.save_chunk_result(table_name, fingerprint, (start, end),
+                                                           source_hash, target_hash)
+                if depth == 0:
+                    report["source_rows"] += source_hash[0]
+                    report["target_rows"] += target_hash[0]
+                if source_hash != target_hash:
+                    report["match"] = False
+                    mismatching.append((start, end, source_hash, target_hash))
+
+            next_level = []
+            for i, (start, end, source_hash, target_hash) in enumerate(mismatching):
+                pieces = self._split(start, end) if end - start > self.min_range else []
+                if pieces:
+                    # Every queued piece and every chunk still to be placed may end up as one reported range
+                    reserved = len(report["mismatched_ranges"]) + len(next_level) + len(mismatching) - i - 1
+                    budget = self.max_chunk_queries - report["chunk_queries"] - len(next_level)
+                    if reserved + len(pieces) <= self.max_ranges and len(pieces) <= budget:
+                        next_level.extend(pieces)
+                        continue
+                    report["truncated"] = True
+                if len(report["mismatched_ranges"]) < self.max_ranges:
+                    report["mismatched_ranges"].append({
+                        "from": start, "to": end - 1,
+                        "source_rows": source_hash[0], "target_rows": target_hash[0],
+                    })
+                else:
+                    report["truncated"] = True
+            level = next_level
+            depth += 1
+
+    def _split(self, start, end):
+        step = max(1, math.ceil((end - start) / self.split_factor))
+        return [(s, min(s + step, end)) for s in range(start, end, step)]
+
+    def _chunk_query(self, table_name, key_column, columns):
+        key = quote_identifier(key_column)
+        return (
+            f"SELECT COUNT(*), COALESCE(BIT_XOR({row_hash_expression(columns)}), 0) "
+            f"FROM {quote_identifier(table_name)} WHERE {key} >= %s AND {key} < %s"
+        )
+
+    def _bounds(self, conn, table_name, key_column):
+        key = quote_identifier(key_column)
+        cursor = conn.cursor()
+        try:
+            # MIN/MAX on the primary key are index lookups, not scans
+            cursor.execute(f"SELECT MIN({key}), MAX({key}) FROM {quote_identifier(table_name)}")
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+    def _chunk_starts(self, conn, table_name, key_column, low):
+        """Returns `low` and then every `chunk_rows`-th key after it, in key order."""
+        key = quote_identifier(key_column)
+        # Each step walks chunk_rows keys of the primary key index from the previous start
+        query = (f"SELECT {key} FROM {quote_identifier(table_name)} WHERE {key} > %s "
+                 f"ORDER BY {key} LIMIT 1 OFFSET {self.chunk_rows - 1}")
+        starts = [low]
+        cursor = conn.cursor()
+        try:
+            while True:
+                cursor.execute(query, (starts[-1],))
+                row = cursor.fetchone()
+                if row is None:
+                    return starts
+                starts.append(int(row[0]))
+        finally:
+            cursor.close()
+
+    def _on_side(self, use_source, fn, *args):
+        with self.connect(use_source) as conn:
+            if not conn:
+                side = "source" if use_source else "target"
+                raise ConnectionError(f"could not connect to the {side} database")
+            return fn(conn, *args)
+
+
+def _chunk_hash(conn, query, chunk):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, chunk)
+        count, digest = cursor.fetchone()
+        return int(count), int(digest)
+    finally:
+        cursor.close()
+
+
+def _merge_adjacent(ranges):
+    merged = []
+    for r in sorted(ranges, key=lambda r: r["from"]):
+        if merged and merged[-1]["to"] + 1 == r["from"]:
+            merged[-1]["to"] = r["to"]
+            merged[-1]["source_rows"] += r["source_rows"]
+            merged[-1]["target_rows"] += r["target_rows"]
+        else:
+            merged.append(dict(r))
+    return merged
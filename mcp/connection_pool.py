@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+def default_health_check(conn):
+    """Returns True if the connection still answers a round trip."""
+    try:
+        if hasattr(conn, 'ping'):
+            # mysql.connector raises InterfaceError when the server has gone away
+            conn.ping(reconnect=False)
+        else:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+def default_reset(conn):
+    """
+    Ends any transaction left open by the previous borrower so the next one
+    does not read from a stale REPEATABLE READ snapshot.
+    """
+    if hasattr(conn, 'rollback'):
+        conn.rollback()
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """
+    A bounded, thread-safe pool of connections to a single database endpoint.
+
+    Connections are opened lazily through `factory` and at most `max_size` are
+    checked out at any time; further callers block for up to `checkout_timeout`
+    seconds. Reused connections are health-checked on checkout unless they were
+    returned within the last `validation_interval` seconds, and connections idle
+    for longer than `max_idle_seconds` are closed rather than reused.
+    """
+
+    def __init__(self, factory, max_size=8, max_idle_seconds=300.0, checkout_timeout=30.0,
+                 validation_interval=5.0, health_check=default_health_check, reset=default_reset,
+                 name="pool"):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.name = name
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.checkout_timeout = checkout_timeout
+        self.validation_interval = validation_interval
+        self._factory = factory
+        self._health_check = health_check
+        self._reset = reset
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        # (connection, returned_at) pairs; the right end holds the most recently used
+        self._idle = deque()
+        self._in_use = 0
+        self._created = 0
+        self._discarded = 0
+        self._closed = False
+
+    def acquire(self, timeout=None):
+        """Checks out a connection, opening a new one if no healthy idle one exists."""
+        if self._closed:
+            raise PoolTimeoutError(f"Connection pool '{self.name}' is closed.")
+        timeout = self.checkout_timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolTimeoutError(
+                f"Timed out after {timeout}s waiting for a connection from pool '{self.name}'."
+            )
+        try:
+            conn = self._checkout_idle()
+            if conn is None:
+                conn = self._factory()
+                with self._lock:
+                    self._created += 1
+            with self._lock:
+                self._in_use += 1
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        """Returns a connection to the pool, or closes it if `discard` is set or it cannot be reset."""
+        try:
+            if not discard and not self._closed:
+                try:
+                    self._reset(conn)
+                except Exception:
+                    discard = True
+            if discard or self._closed:
+                _close_quietly(conn)
+                with self._lock:
+                    self._discarded += 1
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that checks out a connection and always returns it."""
+        conn = self.acquire(timeout)
+        discard = False
+        try:
+            yield conn
+        except Exception:
+            # A failed query usually leaves the session usable; only drop it if it is dead.
+            discard = not self._health_check(conn)
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def evict_idle(self):
+        """Closes idle connections older than `max_idle_seconds`. Returns how many were closed."""
+        cutoff = time.monotonic() - self.max_idle_seconds
+        with self._lock:
+            stale = [conn for conn, returned_at in self._idle if returned_at < cutoff]
+            self._idle = deque(item for item in self._idle if item[1] >= cutoff)
+            self._discarded += len(stale)
+        for conn in stale:
+            _close_quietly(conn)
+        return len(stale)
+
+    def close(self):
+        """Closes all idle connections; connections still checked out are closed on release."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, deque()
+        for conn, _ in idle:
+            _close_quietly(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "created": self._created,
+                "discarded": self._discarded,
+            }
+
+    def _checkout_idle(self):
+        self.evict_idle()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                # LIFO keeps a small hot set busy and lets surplus connections age out
+                conn, returned_at = self._idle.pop()
+            if time.monotonic() - returned_at <= self.validation_interval or self._health_check(conn):
+                return conn
+            _close_quietly(conn)
+            with self._lock:
+                self._discarded += 1
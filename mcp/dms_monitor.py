@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import deque
+
+DMS_API = "https://datamigration.googleapis.com/v1"
+TERMINAL_STATES = {"COMPLETED", "FAILED", "STOPPED", "DELETED"}
+
+
+class DmsApiBackend:
+    """
+    Reads a DMS migration job through the REST API on one authorized HTTP
+    session, so each status check is a single request instead of a gcloud
+    process. Credentials come from the VM's service account.
+    """
+
+    def __init__(self, project_id, region, job_name, session=None, timeout=30.0):
+        self.name = f"projects/{project_id}/locations/{region}/migrationJobs/{job_name}"
+        self.timeout = timeout
+        self._session = session
+        self._lock = threading.Lock()
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                import google.auth
+                from google.auth.transport.requests import AuthorizedSession
+                credentials, _ = google.auth.default(scopes=["https://www.googleapis.com/auth/cloud-platform"])
+                self._session = AuthorizedSession(credentials)
+            return self._session
+
+    def get_job(self):
+        """Returns the migration job resource as a dict (state, phase, error, ...)."""
+        response = self._get_session().get(f"{DMS_API}/{self.name}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+class FakeDmsBackend:
+    """
+    Offline DMS stand-in. Each get_job() returns the next job dict from `jobs`,
+    repeating the last one once the list is exhausted.
+    """
+
+    def __init__(self, jobs):
+        self.jobs = list(jobs)
+        self.calls = 0
+
+    def get_job(self):
+        job = self.jobs[min(self.calls, len(self.jobs) - 1)]
+        self.calls += 1
+        return dict(job)
+
+
+class DmsJobMonitor:
+    """
+    Polls a DMS job in the background and derives throughput and ETA.
+
+    DMS reports job state but not row counts, so progress is measured on the
+    databases: `measure_target()` returns (rows, bytes) copied so far and
+    `measure_source()` the (rows, bytes) to copy, both from information_schema
+    statistics (estimates for InnoDB). The source is re-measured every
+    `source_every` polls since it keeps changing while the job replicates. Rates
+    are computed over the samples of the last `rate_window` seconds.
+    """
+
+    def __init__(self, backend, measure_target, measure_source, poll_interval=30.0, source_every=10,
+                 rate_window=300.0):
+        self.backend = backend
+        self.measure_target = measure_target
+        self.measure_source = measure_source
+        self.poll_interval = poll_interval
+        self.source_every = max(1, source_every)
+        self.rate_window = rate_window
+        self._samples = deque()
+        self._job = {}
+        self._source = None
+        self._polls = 0
+        self._last_error = None
+        self._last_poll = None
+        self._started = time.time()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="dms-monitor", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll(self):
+        """Takes one sample of job state and copy progress."""
+        with self._lock:
+            source, polls = self._source, self._polls
+        try:
+            job = self.backend.get_job()
+            if source is None or polls % self.source_every == 0:
+                source = self.measure_source()
+            rows, size = self.measure_target()
+        except Exception as e:
+            with self._lock:
+                self._last_error = str(e)
+                self._last_poll = time.time()
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._job = job
+            self._source = source
+            self._polls += 1
+            self._last_error = None
+            self._last_poll = time.time()
+            self._samples.append((now, rows, size))
+            while len(self._samples) > 2 and self._samples[0][0] < now - self.rate_window:
+                self._samples.popleft()
+
+    def status(self):
+        with self._lock:
+            job = dict(self._job)
+            samples = list(self._samples)
+            source = self._source
+            report = {
+                "job": job.get("displayName") or job.get("name"),
+                "state": job.get("state", "UNKNOWN"),
+                "phase": job.get("phase"),
+                "error": (job.get("error") or {}).get("message"),
+                "polls": self._polls,
+                "last_poll": self._last_poll,
+                "last_poll_error": self._last_error,
+                "monitoring": self.running,
+                "monitored_seconds": round(time.time() - self._started, 1),
+            }
+        if samples:
+            _, rows, size = samples[-1]
+            report["target_rows"] = rows
+            report["target_bytes"] = size
+        if source:
+            report["source_rows"] = source[0]
+            report["source_bytes"] = source[1]
+        if len(samples) >= 2 and samples[-1][0] > samples[0][0]:
+            elapsed = samples[-1][0] - samples[0][0]
+            report["rows_per_second"] = round(max(0, samples[-1][1] - samples[0][1]) / elapsed, 1)
+            report["bytes_per_second"] = round(max(0, samples[-1][2] - samples[0][2]) / elapsed, 1)
+        if samples and source and source[1]:
+            report["progress"] = round(min(1.0, samples[-1][2] / source[1]), 4)
+            remaining = max(0, source[1] - samples[-1][2])
+            if report.get("bytes_per_second"):
+                report["eta_seconds"] = round(remaining / report["bytes_per_second"])
+        # Once the initial load is done DMS keeps replicating changes, so the ETA no longer applies
+        if report["phase"] == "CDC" or report["state"] in TERMINAL_STATES:
+            report.pop("eta_seconds", None)
+        return report
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll()
+            with self._lock:
+                state = self._job.get("state")
+            if state in TERMINAL_STATES:
+                break
+            self._stop.wait(self.poll_interval)
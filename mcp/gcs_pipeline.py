@@ -0,0 +1,361 @@
+import datetime
+import decimal
+import gzip
+import json
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mydumper_pipeline import _drain, chunk_select, describe_schema, plan_key_ranges
+from table_validation import quote_identifier
+
+_END_OF_STREAM = object()
+
+# MySQL LOAD DATA escapes inside a field enclosed by double quotes
+_ESCAPES = {
+    ord('\\'): b'\\\\', ord('"'): b'\\"', ord('\n'): b'\\n', ord('\r'): b'\\r', 0: b'\\0',
+}
+_NEEDS_ESCAPE = re.compile(rb'[\\"\n\r\x00]')
+
+
+def format_time(value):
+    """
+    Formats a MySQL TIME, which the connector returns as a timedelta, as
+    [-]HH:MM:SS[.ffffff]. str() would give '1 day, 2:00:00' or '-1 day, 23:59:59'.
+    """
+    micros = (value.days * 86400 + value.seconds) * 1000000 + value.microseconds
+    sign = '-' if micros < 0 else ''
+    seconds, micros = divmod(abs(micros), 1000000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    text = f"{sign}{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return text + f".{micros:06d}" if micros else text
+
+
+def encode_value(value):
+    """Encodes one column value for a CSV shard that LOAD DATA / Cloud SQL import can read."""
+    if value is None:
+        return b'\\N'
+    if isinstance(value, bool):
+        return b'1' if value else b'0'
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return str(value).encode('ascii')
+    if isinstance(value, (bytes, bytearray)):
+        raw = bytes(value)
+    elif isinstance(value, datetime.timedelta):
+        raw = format_time(value).encode('ascii')
+    elif isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        raw = str(value).encode('ascii')
+    else:
+        raw = str(value).encode('utf-8')
+    raw = _NEEDS_ESCAPE.sub(lambda m: _ESCAPES[m.group()[0]], raw)
+    return b'"' + raw + b'"'
+
+
+def encode_row(row):
+    return b','.join(encode_value(v) for v in row) + b'\n'
+
+
+class _CountingWriter:
+    """Passes writes through to a storage writer while counting the bytes sent."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self.raw.write(data) if self.raw is not None else len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.raw is not None:
+            self.raw.close()
+
+    def detach(self):
+        """Returns the storage writer; later writes, such as a gzip trailer, are dropped."""
+        raw, self.raw = self.raw, None
+        return raw
+
+
+class CloudSqlImporter:
+    """
+    Imports CSV shards from GCS with `gcloud sql import csv`. Cloud SQL runs one
+    import per instance at a time, so the pipeline calls this from a single thread.
+    """
+
+    def __init__(self, run_command, project_id, instance, database):
+        self.run_command = run_command
+        self.project_id = project_id
+        self.instance = instance
+        self.database = database
+
+    def import_shard(self, storage, shard_name, table_name, columns):
+        output = self.run_command([
+            "gcloud", "sql", "import", "csv", self.instance, storage.uri(shard_name),
+            f"--database={self.database}",
+            f"--table={table_name}",
+            f"--columns={','.join(columns)}",
+            "--fields-terminated-by=2C", "--quote=22", "--escape=5C", "--lines-terminated-by=0A",
+            f"--project={self.project_id}",
+            "--quiet",
+        ])
+        if output.startswith("Error"):
+            raise RuntimeError(output)
+
+
+class LoadDataImporter:
+    """
+    Imports shards with LOAD DATA LOCAL INFILE into a MySQL server. Used with
+    LocalStorage to exercise the export/import path without GCP; `connect()` must
+    return a connection opened with allow_local_infile=True.
+    """
+
+    def __init__(self, connect):
+        self.connect = connect
+
+    def import_shard(self, storage, shard_name, table_name, columns):
+        with storage.open_reader(shard_name) as compressed, tempfile.NamedTemporaryFile(suffix='.csv') as plain:
+            with gzip.GzipFile(fileobj=compressed) as rows:
+                shutil.copyfileobj(rows, plain)
+            plain.flush()
+            conn = self.connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s INTO TABLE {quote_identifier(table_name)} "
+                    "FIELDS TERMINATED BY ',' ENCLOSED BY '\"' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                    f"({', '.join(quote_identifier(c) for c in columns)})",
+                    (plain.name,),
+                )
+                conn.commit()
+                cursor.close()
+            finally:
+                conn.close()
+
+
+class ExportImportPipeline:
+    """
+    Exports tables as gzip-compressed CSV shards and imports them into the target.
+
+    Export workers read primary-key-range chunks in parallel and stream rows
+    straight into shard writers, rolling over to a new shard once `shard_bytes`
+    compressed bytes have been written. With GCSStorage each writer is a resumable
+    upload, so shards upload concurrently while they are produced. Finished shards
+    are handed to a single import thread, which starts importing while the export
+    is still running.
+    """
+
+    def __init__(self, connect, schema, storage, importer, export_workers=4, chunk_rows=100000,
+                 shard_bytes=256 * 1024 * 1024, batch_rows=5000, compress_level=6, prefix=None,
+                 keep_shards=False):
+        self.connect = connect
+        self.schema = schema
+        self.storage = storage
+        self.importer = importer
+        self.export_workers = max(1, export_workers)
+        self.chunk_rows = max(1, chunk_rows)
+        self.shard_bytes = max(1, shard_bytes)
+        self.batch_rows = max(1, batch_rows)
+        self.compress_level = compress_level
+        self.prefix = prefix or f"migrate-{schema}-{time.strftime('%Y%m%d-%H%M%S')}"
+        self.keep_shards = keep_shards
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._started = None
+        self._finished = None
+        self._bytes_uploaded = 0
+        self._rows_exported = 0
+
+    def run(self, tables=None):
+        """Exports and imports the given tables (default: all base tables); returns the final report."""
+        self._started = time.monotonic()
+        layout = self._on_side(True, describe_schema, self.schema)
+        if tables:
+            for table_name in (t for t in tables if t not in layout):
+                self._tables[table_name] = _table_state("failed", error="table not found on source")
+            layout = {t: layout[t] for t in tables if t in layout}
+
+        ready = queue.Queue()
+        importer = threading.Thread(target=self._import_worker, args=(ready, layout),
+                                    name="gcs-import", daemon=True)
+        importer.start()
+        try:
+            with ThreadPoolExecutor(self.export_workers, thread_name_prefix="gcs-export") as exporters:
+                plans = {table_name: exporters.submit(self._on_side, True, plan_key_ranges, self.schema,
+                                                      table_name, info, self.chunk_rows)
+                         for table_name, info in layout.items()}
+                exports = []
+                for table_name, plan in plans.items():
+                    try:
+                        chunks = plan.result()
+                    except Exception as e:
+                        self._fail(table_name, f"planning failed: {e}")
+                        continue
+                    with self._lock:
+                        self._tables[table_name] = _table_state("running", chunks=len(chunks))
+                    for index, chunk in enumerate(chunks):
+                        exports.append(exporters.submit(
+                            self._export_chunk, ready, table_name, layout[table_name], index, chunk))
+                for future in exports:
+                    future.result()
+        finally:
+            ready.put(_END_OF_STREAM)
+            importer.join()
+            self._finished = time.monotonic()
+        return self.progress()
+
+    def run_json(self, tables=None):
+        return json.dumps(self.run(tables), separators=(",", ":"), default=str)
+
+    def progress(self):
+        """Snapshot of shard progress and throughput; safe to call while `run()` is in flight."""
+        with self._lock:
+            elapsed = ((self._finished or time.monotonic()) - self._started) if self._started else 0.0
+            tables = {}
+            for table_name, state in self._tables.items():
+                summary = {k: v for k, v in state.items() if k != "chunks_exported"}
+                if state["status"] == "running":
+                    exported = state["chunks_exported"] == state["chunks"]
+                    if exported and state["shards_imported"] == state["shards_written"]:
+                        summary["status"] = "done"
+                    elif self._finished is not None:
+                        summary["status"] = "incomplete"
+                    elif exported:
+                        summary["status"] = "importing"
+                tables[table_name] = summary
+            return {
+                "strategy": "gcs",
+                "schema": self.schema,
+                "staging": self.storage.uri(self.prefix),
+                "finished": self._finished is not None,
+                "tables_total": len(tables),
+                "tables_done": sum(1 for t in tables.values() if t["status"] == "done"),
+                "tables_failed": sum(1 for t in tables.values() if t["status"] == "failed"),
+                "shards_written": sum(t["shards_written"] for t in tables.values()),
+                "shards_imported": sum(t["shards_imported"] for t in tables.values()),
+                "rows_exported": self._rows_exported,
+                "bytes_uploaded": self._bytes_uploaded,
+                "upload_bytes_per_second": round(self._bytes_uploaded / elapsed, 1) if elapsed else 0.0,
+                "elapsed_seconds": round(elapsed, 3),
+                "tables": dict(sorted(tables.items(), key=lambda item: item[1]["status"] == "done")),
+            }
+
+    def _export_chunk(self, ready, table_name, info, index, chunk):
+        query, params = chunk_select(table_name, info, chunk)
+        part = 0
+        writer = stream = shard_name = None
+        try:
+            with self.connect(True) as conn:
+                if not conn:
+                    raise ConnectionError("could not connect to the source database")
+                cursor = conn.cursor()
+                drained = False
+                try:
+                    cursor.execute(query, params)
+                    while not self._is_failed(table_name):
+                        rows = cursor.fetchmany(self.batch_rows)
+                        if not rows:
+                            drained = True
+                            break
+                        if stream is None:
+                            shard_name = f"{self.prefix}/{table_name}/{table_name}.{index:05d}.{part:03d}.csv.gz"
+                            writer = _CountingWriter(self.storage.open_writer(shard_name))
+                            stream = gzip.GzipFile(filename='', mode='wb',
+                                                   compresslevel=self.compress_level, fileobj=writer)
+                        stream.write(b''.join(encode_row(row) for row in rows))
+                        with self._lock:
+                            self._rows_exported += len(rows)
+                            self._tables[table_name]["rows_exported"] += len(rows)
+                        if writer.bytes_written >= self.shard_bytes:
+                            self._finish_shard(ready, table_name, shard_name, stream, writer)
+                            stream = writer = None
+                            part += 1
+                finally:
+                    if not drained:
+                        _drain(cursor, self.batch_rows)
+                    cursor.close()
+            if stream is not None and drained:
+                self._finish_shard(ready, table_name, shard_name, stream, writer)
+                stream = writer = None
+        except Exception as e:
+            self._fail(table_name, f"export of chunk {index} failed: {e}")
+        finally:
+            if stream is not None:
+                # A shard cut short by a failure is discarded, never finalized where an import could find it
+                raw = writer.detach()
+                try:
+                    stream.close()
+                    self.storage.abort(shard_name, raw)
+                except Exception as e:
+                    print(f"gcs: could not discard partial shard {shard_name}: {e}")
+            with self._lock:
+                self._tables[table_name]["chunks_exported"] += 1
+
+    def _finish_shard(self, ready, table_name, shard_name, stream, writer):
+        stream.close()
+        writer.close()
+        with self._lock:
+            self._bytes_uploaded += writer.bytes_written
+            state = self._tables[table_name]
+            state["shards_written"] += 1
+            state["bytes_uploaded"] += writer.bytes_written
+        ready.put((table_name, shard_name))
+
+    def _import_worker(self, ready, layout):
+        while True:
+            item = ready.get()
+            if item is _END_OF_STREAM:
+                return
+            table_name, shard_name = item
+            if self._is_failed(table_name):
+                if not self.keep_shards:
+                    self._delete_quietly(shard_name)
+                continue
+            try:
+                self.importer.import_shard(self.storage, shard_name, table_name, layout[table_name][2])
+                if not self.keep_shards:
+                    self.storage.delete(shard_name)
+            except Exception as e:
+                self._fail(table_name, f"import of {shard_name} failed: {e}")
+                continue
+            with self._lock:
+                self._tables[table_name]["shards_imported"] += 1
+
+    def _delete_quietly(self, shard_name):
+        try:
+            self.storage.delete(shard_name)
+        except Exception as e:
+            print(f"gcs: could not delete shard {shard_name}: {e}")
+
+    def _fail(self, table_name, error):
+        print(f"gcs: table {table_name}: {error}")
+        with self._lock:
+            state = self._tables.setdefault(table_name, _table_state("failed"))
+            state["status"] = "failed"
+            state.setdefault("error", error)
+
+    def _is_failed(self, table_name):
+        with self._lock:
+            return self._tables.get(table_name, {}).get("status") == "failed"
+
+    def _on_side(self, use_source, fn, *args):
+        with self.connect(use_source) as conn:
+            if not conn:
+                side = "source" if use_source else "target"
+                raise ConnectionError(f"could not connect to the {side} database")
+            return fn(conn, *args)
+
+
+def _table_state(status, chunks=0, error=None):
+    state = {"status": status, "chunks": chunks, "chunks_exported": 0, "rows_exported": 0,
+             "shards_written": 0, "shards_imported": 0, "bytes_uploaded": 0}
+    if error:
+        state["error"] = error
+    return state
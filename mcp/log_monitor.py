@@ -0,0 +1,304 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+LOGGING_API = "https://logging.googleapis.com/v2"
+
+# One alternation decides whether a line is worth classifying at all; most log lines fail it
+PREFILTER = re.compile(
+    r"error|fatal|fail|warn|deadlock|lock wait timeout|aborted|crash|corrupt|denied|"
+    r"out of memory|too many connections|query_time",
+    re.IGNORECASE,
+)
+
+# (category, severity, pattern), checked in order; the first match wins
+ANOMALY_PATTERNS = [
+    ("crash", "critical", re.compile(r"\b(crash|assertion failure|signal \d+|corrupt)", re.IGNORECASE)),
+    ("out_of_resources", "critical", re.compile(r"out of memory|too many connections|disk full|no space left",
+                                                re.IGNORECASE)),
+    ("deadlock", "high", re.compile(r"deadlock", re.IGNORECASE)),
+    ("lock_wait_timeout", "high", re.compile(r"lock wait timeout", re.IGNORECASE)),
+    ("access_denied", "high", re.compile(r"access denied|permission denied", re.IGNORECASE)),
+    ("replication", "high", re.compile(r"(replica|slave|binlog|gtid|relay log).*(error|fail|stopp)",
+                                       re.IGNORECASE)),
+    ("error", "high", re.compile(r"\[error\]|\berror\b|\bfatal\b|\bfailed\b|\bfailure\b", re.IGNORECASE)),
+    ("aborted_connection", "medium", re.compile(r"aborted (connection|clients?)", re.IGNORECASE)),
+    ("warning", "low", re.compile(r"\[warning\]|\bwarn(ing)?\b", re.IGNORECASE)),
+]
+
+QUERY_TIME = re.compile(r"#\s*Query_time:\s*([\d.]+)")
+
+MAX_LINE_CHARS = 500
+
+
+def classify(line, slow_query_seconds=10.0):
+    """Returns (category, severity) for an anomalous log line, or None."""
+    if not PREFILTER.search(line):
+        return None
+    match = QUERY_TIME.search(line)
+    if match:
+        return ("slow_query", "medium") if float(match.group(1)) >= slow_query_seconds else None
+    for category, severity, pattern in ANOMALY_PATTERNS:
+        if pattern.search(line):
+            return category, severity
+    return None
+
+
+class FileLogSource:
+    """
+    Tails a local log file (MySQL error or slow log, or a test fixture) from a
+    byte offset. Only complete lines are consumed, so a line being written is
+    read on the next poll. A file that shrank or was replaced is read from the
+    start again.
+    """
+
+    def __init__(self, name, path, max_bytes_per_poll=8 * 1024 * 1024):
+        self.name = name
+        self.path = path
+        self.max_bytes_per_poll = max_bytes_per_poll
+
+    def read(self, cursor):
+        """Returns (lines, new cursor). The cursor is {"inode", "offset"}."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return [], cursor
+        cursor = cursor or {}
+        offset = cursor.get("offset", 0)
+        if cursor.get("inode") != stat.st_ino or stat.st_size < offset:
+            offset = 0
+        if stat.st_size == offset:
+            return [], {"inode": stat.st_ino, "offset": offset}
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(self.max_bytes_per_poll)
+        end = data.rfind(b"\n")
+        if end < 0:
+            # No complete line yet, unless a single line is longer than a whole poll
+            if len(data) < self.max_bytes_per_poll:
+                return [], {"inode": stat.st_ino, "offset": offset}
+            end = len(data) - 1
+        lines = data[:end + 1].decode("utf-8", errors="replace").splitlines()
+        return lines, {"inode": stat.st_ino, "offset": offset + end + 1}
+
+
+class CloudLoggingApi:
+    """
+    Lists Cloud Logging entries through the REST API (entries:list) on one
+    authorized HTTP session, so each poll is a single request instead of a
+    gcloud process. Credentials come from the VM's service account.
+    """
+
+    def __init__(self, project_id, session=None, timeout=30.0):
+        self.project_id = project_id
+        self.timeout = timeout
+        self._session = session
+        self._lock = threading.Lock()
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                import google.auth
+                from google.auth.transport.requests import AuthorizedSession
+                credentials, _ = google.auth.default(scopes=["https://www.googleapis.com/auth/logging.read"])
+                self._session = AuthorizedSession(credentials)
+            return self._session
+
+    def list_entries(self, log_filter, page_size):
+        """Returns up to `page_size` entries matching `log_filter`, oldest first."""
+        body = {
+            "resourceNames": [f"projects/{self.project_id}"],
+            "filter": log_filter,
+            "orderBy": "timestamp asc",
+            "pageSize": page_size,
+        }
+        response = self._get_session().post(f"{LOGGING_API}/entries:list", json=body, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get("entries", [])
+
+
+class CloudLoggingSource:
+    """
+    Reads Cloud Logging entries (DMS job and Cloud SQL logs) newer than the
+    cursor timestamp. The filter is applied by Cloud Logging, so only matching
+    entries are transferred. `list_entries(log_filter, page_size)` returns the
+    entries oldest first, e.g. CloudLoggingApi.list_entries.
+    """
+
+    def __init__(self, name, list_entries, log_filter, limit=1000, initial_freshness_seconds=3600):
+        self.name = name
+        self.list_entries = list_entries
+        self.log_filter = log_filter
+        self.limit = limit
+        self.initial_freshness_seconds = initial_freshness_seconds
+
+    def read(self, cursor):
+        """Returns (lines, new cursor). The cursor is {"timestamp", "insert_ids" seen at that timestamp}."""
+        cursor = cursor or {}
+        since = cursor.get("timestamp") or time.strftime(
+            "%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - self.initial_freshness_seconds))
+        entries = self.list_entries(f'({self.log_filter}) AND timestamp>="{since}"', self.limit)
+        seen = set(cursor.get("insert_ids", []))
+        timestamp = cursor.get("timestamp")
+        lines = []
+        for entry in entries:
+            if entry.get("insertId") in seen and entry.get("timestamp") == cursor.get("timestamp"):
+                continue
+            if entry.get("timestamp") != timestamp:
+                timestamp, seen = entry.get("timestamp"), set()
+            seen.add(entry.get("insertId"))
+            lines.append(f"{entry.get('severity', '')} {_entry_text(entry)}")
+        return lines, {"timestamp": timestamp, "insert_ids": sorted(seen)}
+
+
+def _entry_text(entry):
+    if entry.get("textPayload"):
+        return entry["textPayload"]
+    payload = entry.get("jsonPayload") or entry.get("protoPayload") or {}
+    message = payload.get("message") or (payload.get("status") or {}).get("message")
+    return message or json.dumps(payload, separators=(",", ":"))
+
+
+class DmsStatusSource:
+    """Follows the DMS migration job state and reports a line whenever state or error changes."""
+
+    def __init__(self, name, get_job, job_name):
+        self.name = name
+        # get_job() returns the job resource as a dict, e.g. DmsApiBackend.get_job
+        self.get_job = get_job
+        self.job_name = job_name
+
+    def read(self, cursor):
+        job = self.get_job()
+        state = job.get("state", "UNKNOWN")
+        error = (job.get("error") or {}).get("message")
+        current = {"state": state, "phase": job.get("phase"), "error": error}
+        if cursor == current:
+            return [], cursor
+        line = f"DMS job {self.job_name} state={state} phase={job.get('phase')}"
+        if error:
+            line += f" error: {error}"
+        elif state == "FAILED":
+            line += " failed"
+        return [line], current
+
+
+class LogMonitor:
+    """
+    Polls log sources in the background and keeps the anomalies found.
+
+    Each source's read position is saved in `cursors` (a CheckpointStore), so a
+    restarted server continues where it stopped instead of rescanning. Lines are
+    pre-filtered with one compiled pattern before classification. Rolling counts
+    per category cover the whole run and the last `window_seconds`. `drain()`
+    returns only anomalies not returned by a previous call.
+    """
+
+    def __init__(self, sources, cursors=None, poll_interval=15.0, slow_query_seconds=10.0,
+                 window_seconds=900.0, max_buffered=1000):
+        self.sources = list(sources)
+        self.cursors = cursors
+        self.poll_interval = poll_interval
+        self.slow_query_seconds = slow_query_seconds
+        self.window_seconds = window_seconds
+        self._buffer = deque(maxlen=max_buffered)
+        self._recent = deque()
+        self._totals = {}
+        self._dropped = 0
+        self._seq = 0
+        self._delivered = 0
+        self._lines_scanned = 0
+        self._source_status = {}
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-monitor", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def poll(self):
+        """Reads every source once, concurrently; returns the number of new anomalies."""
+        with self._poll_lock:
+            with ThreadPoolExecutor(max(1, len(self.sources)), thread_name_prefix="log-source") as pool:
+                results = list(pool.map(self._read_source, self.sources))
+            return sum(results)
+
+    def drain(self, max_anomalies=50):
+        """Returns a report with anomalies found since the previous drain, oldest first."""
+        with self._lock:
+            fresh = [a for a in self._buffer if a["seq"] > self._delivered]
+            returned = fresh[:max_anomalies]
+            if returned:
+                self._delivered = returned[-1]["seq"]
+            self._expire(time.time())
+            window = {}
+            for _, category in self._recent:
+                window[category] = window.get(category, 0) + 1
+            return {
+                "new_anomalies": returned,
+                "more_pending": len(fresh) - len(returned),
+                "counters": {c: {"total": n, "recent": window.get(c, 0)} for c, n in sorted(self._totals.items())},
+                "window_seconds": self.window_seconds,
+                "lines_scanned": self._lines_scanned,
+                "dropped": self._dropped,
+                "sources": dict(self._source_status),
+            }
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.poll_interval)
+
+    def _read_source(self, source):
+        cursor = self.cursors.get_cursor(source.name) if self.cursors else None
+        try:
+            lines, cursor = source.read(cursor)
+        except Exception as e:
+            with self._lock:
+                self._source_status[source.name] = f"error: {e}"
+            return 0
+        found = []
+        for line in lines:
+            verdict = classify(line, self.slow_query_seconds)
+            if verdict is not None:
+                found.append((verdict, line))
+        now = time.time()
+        with self._lock:
+            self._lines_scanned += len(lines)
+            self._source_status[source.name] = "ok"
+            for (category, severity), line in found:
+                self._seq += 1
+                if len(self._buffer) == self._buffer.maxlen:
+                    self._dropped += 1
+                self._buffer.append({
+                    "seq": self._seq,
+                    "source": source.name,
+                    "category": category,
+                    "severity": severity,
+                    "line": line[:MAX_LINE_CHARS],
+                    "seen_at": now,
+                })
+                self._totals[category] = self._totals.get(category, 0) + 1
+                self._recent.append((now, category))
+            self._expire(now)
+        # The cursor is saved only after the lines are buffered, so a crash re-reads rather than skips
+        if self.cursors is not None and cursor is not None:
+            self.cursors.save_cursor(source.name, cursor)
+        return len(found)
+
+    def _expire(self, now):
+        while self._recent and self._recent[0][0] < now - self.window_seconds:
+            self._recent.popleft()
@@ -5,6 +5,7 @@ import threading
 import subprocess
 import mysql.connector
 import os
+from contextlib import contextmanager
 from autogen_ext.tools.mcp import McpWorkbench, StdioMcpToolAdapter
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from socketserver import ThreadingMixIn
@@ -13,33 +14,168 @@ from socketserver import ThreadingMixIn
 # pip install google-cloud-secret-manager mysql-connector-python
 from google.cloud import secretmanager
 
+from connection_pool import ConnectionPool, PoolTimeoutError
+from table_validation import BulkValidator, quote_identifier
+from chunked_checksum import ChunkedChecksum
+from sampled_validation import SampledValidator
+from checkpoint_store import CheckpointStore, fetch_table_fingerprints
+from mydumper_pipeline import DumpLoadPipeline
+from gcs_pipeline import CloudSqlImporter, ExportImportPipeline, LoadDataImporter
+from shard_storage import GCSStorage, LocalStorage
+from async_server import AsyncMCPServer
+from tool_registry import ToolError, ToolRegistry, parse_tool_code
+from result_cache import ResultCache
+from metrics import InstrumentedConnection, MetricsRegistry
+from secret_cache import SecretCache
+from schema_compare import SchemaComparer, SchemaSnapshotCache
+from result_store import ResultStore
+from dms_monitor import DmsApiBackend, DmsJobMonitor
+from replication_monitor import DeltaValidator, HeartbeatLagProbe, cutover_readiness
+from migration_planner import MigrationPlanner
+from performance_analysis import PerformanceAnalyzer
+from log_monitor import CloudLoggingApi, CloudLoggingSource, DmsStatusSource, FileLogSource, LogMonitor
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Metrics ---
+
+METRICS = MetricsRegistry()
+TOOL_CALLS = METRICS.counter('mcp_tool_calls_total', 'Tool calls handled.', ['tool'])
+TOOL_ERRORS = METRICS.counter('mcp_tool_errors_total', 'Tool calls that returned or raised an error.', ['tool'])
+TOOL_SECONDS = METRICS.histogram('mcp_tool_duration_seconds', 'Tool call latency.', ['tool'])
+REQUESTS_IN_FLIGHT = METRICS.gauge('mcp_requests_in_flight', 'Requests currently being handled.')
+DB_CONNECT_SECONDS = METRICS.histogram('mcp_db_connect_seconds', 'Time to open a database connection.', ['endpoint'])
+DB_QUERY_SECONDS = METRICS.histogram('mcp_db_query_seconds', 'Time spent executing queries.', ['endpoint'])
+DB_ROWS_READ = METRICS.counter('mcp_db_rows_read_total', 'Rows read back by MCP server queries.', ['endpoint'])
+SUBPROCESS_SECONDS = METRICS.histogram('mcp_subprocess_duration_seconds', 'gcloud subprocess run time.', ['command'])
+SUBPROCESS_FAILURES = METRICS.counter('mcp_subprocess_failures_total', 'gcloud subprocesses that failed.', ['command'])
+
+def observe_tool_call(tool_name, seconds, failed):
+    TOOL_CALLS.inc(tool_name)
+    TOOL_SECONDS.observe(tool_name, value=seconds)
+    if failed:
+        TOOL_ERRORS.inc(tool_name)
+
+def collect_runtime_metrics():
+    """Pool and cache gauges, read at scrape time."""
+    with _db_pools_lock:
+        pools = dict(_db_pools)
+    pool_stats = {endpoint: pool.stats() for endpoint, pool in pools.items()}
+    cache = TOOLS.cache.stats() if TOOLS.cache is not None else {}
+    families = [
+        ('mcp_db_pool_in_use', 'gauge', 'Pooled connections checked out.',
+         {(e,): s['in_use'] for e, s in pool_stats.items()}, ['endpoint']),
+        ('mcp_db_pool_idle', 'gauge', 'Pooled connections idle.',
+         {(e,): s['idle'] for e, s in pool_stats.items()}, ['endpoint']),
+        ('mcp_db_pool_connections_created_total', 'counter', 'Connections opened by the pool.',
+         {(e,): s['created'] for e, s in pool_stats.items()}, ['endpoint']),
+    ]
+    if _dms_monitor is not None:
+        dms = _dms_monitor.status()
+        families.append(('mcp_dms_state', 'gauge', 'DMS job state (1 for the current state).',
+                         {(dms['state'],): 1}, ['state']))
+        for key, name, doc in (
+            ('rows_per_second', 'mcp_dms_rows_per_second', 'DMS copy rate in rows per second.'),
+            ('bytes_per_second', 'mcp_dms_bytes_per_second', 'DMS copy rate in bytes per second.'),
+            ('progress', 'mcp_dms_progress_ratio', 'Fraction of source bytes present on the target.'),
+            ('eta_seconds', 'mcp_dms_eta_seconds', 'Estimated seconds until the initial load completes.'),
+        ):
+            if key in dms:
+                families.append((name, 'gauge', doc, {(): dms[key]}, []))
+    if _lag_probe is not None:
+        lag = _lag_probe.status()
+        for key, name, doc in (
+            ('current_lag_seconds', 'mcp_cdc_lag_seconds', 'Age of the oldest heartbeat not yet on the target.'),
+            ('p95_seconds', 'mcp_cdc_lag_p95_seconds', 'p95 replication lag over the heartbeat window.'),
+        ):
+            if lag[key] is not None:
+                families.append((name, 'gauge', doc, {(): lag[key]}, []))
+    if _delta_validator is not None:
+        delta = _delta_validator.status()
+        families += [
+            ('mcp_cdc_delta_verified_rows_total', 'counter', 'Changed rows compared by delta validation.',
+             {(): delta['verified_rows']}, []),
+            ('mcp_cdc_delta_mismatched_rows', 'gauge', 'Changed rows still differing after the settle time.',
+             {(): delta['mismatched_rows']}, []),
+            ('mcp_cdc_delta_pending_rows', 'gauge', 'Changed rows differing but still within the settle time.',
+             {(): delta['pending_rows']}, []),
+        ]
+    if cache:
+        families += [
+            ('mcp_cache_hits_total', 'counter', 'Result cache hits.', {(): cache['hits']}, []),
+            ('mcp_cache_misses_total', 'counter', 'Result cache misses.', {(): cache['misses']}, []),
+            ('mcp_cache_entries', 'gauge', 'Result cache entries.', {(): cache['entries']}, []),
+        ]
+    return families
+
+METRICS.add_collector(collect_runtime_metrics)
+
 # --- Configuration Loading ---
 
+SECRET_KEYS = [
+    'legacy_db_host', 'legacy_db_user', 'legacy_db_password', 'legacy_db_name',
+    'cloud_sql_user', 'cloud_sql_password',
+]
+
+TERRAFORM_OUTPUTS = {
+    'project_id': 'project_id.txt',
+    'cloud_sql_connection_name': 'cloud_sql_connection_name.txt',
+    'dms_job_name': 'dms_job_name.txt',
+    'dms_job_region': 'dms_job_region.txt',
+}
+
+# Building a Secret Manager client costs more than an access call, so one client is shared
+_secret_client = None
+_secret_client_lock = threading.Lock()
+_secret_cache = None
+
+def get_secret_client():
+    global _secret_client
+    with _secret_client_lock:
+        if _secret_client is None:
+            _secret_client = secretmanager.SecretManagerServiceClient()
+        return _secret_client
+
 def get_secret(project_id, secret_id, version_id="latest"):
     """Fetches a secret from GCP Secret Manager."""
     try:
-        client = secretmanager.SecretManagerServiceClient()
         name = f"projects/{project_id}/secrets/{secret_id}/versions/{version_id}"
-        response = client.access_secret_version(request={"name": name})
+        response = get_secret_client().access_secret_version(request={"name": name})
         return response.payload.data.decode("UTF-8")
     except Exception as e:
         print(f"Failed to access secret: {secret_id} in project: {project_id}. Error: {e}")
         raise
 
-def load_terraform_output(filename):
-    """Reads a value from a terraform output file in the parent directory."""
+def load_terraform_outputs(outputs):
+    """Reads {key: filename} terraform output files from the parent directory, reporting every missing file at once."""
     # This script is in 'mcp/', terraform outputs are in 'terraform_outputs/'
-    path = os.path.join(os.path.dirname(__file__), '..', 'terraform_outputs', filename)
-    try:
-        with open(path, 'r') as f:
-            return f.read().strip()
-    except FileNotFoundError:
-        print(f"Error: Terraform output file not found at {path}.")
+    directory = os.path.join(os.path.dirname(__file__), '..', 'terraform_outputs')
+    values, missing = {}, []
+    for key, filename in outputs.items():
+        path = os.path.join(directory, filename)
+        try:
+            with open(path, 'r') as f:
+                values[key] = f.read().strip()
+        except FileNotFoundError:
+            missing.append(path)
+        except Exception as e:
+            print(f"Error reading terraform file {path}. Error: {e}")
+            raise
+    if missing:
+        print(f"Error: Terraform output file(s) not found: {', '.join(missing)}.")
         print("Please ensure 'terraform apply' and 'setup_orchestrator.sh' ran successfully.")
-        raise
-    except Exception as e:
-        print(f"Error reading terraform file {path}. Error: {e}")
-        raise
+        raise FileNotFoundError(missing[0])
+    return values
+
+def env_setting(name, default, cast=int):
+    """Reads an optional tuning setting from the environment, falling back to a default."""
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        print(f"Warning: ignoring invalid value '{value}' for {name}; using {default}.")
+        return default
 
 def load_app_configuration():
     """
@@ -50,19 +186,67 @@ def load_app_configuration():
     print("Loading application configuration...")
     try:
         # 1. Load non-sensitive resource info from Terraform state
-        config['project_id'] = load_terraform_output('project_id.txt')
-        config['cloud_sql_connection_name'] = load_terraform_output('cloud_sql_connection_name.txt')
-        config['dms_job_name'] = load_terraform_output('dms_job_name.txt')
-        config['dms_job_region'] = load_terraform_output('dms_job_region.txt')
+        config.update(load_terraform_outputs(TERRAFORM_OUTPUTS))
 
-        # 2. Load sensitive data from Secret Manager using the project_id
+        # 2. Load sensitive data from Secret Manager using the project_id, all secrets at once
         print(f"Fetching secrets from project: {config['project_id']}...")
-        config['legacy_db_host'] = get_secret(config['project_id'], 'legacy_db_host')
-        config['legacy_db_user'] = get_secret(config['project_id'], 'legacy_db_user')
-        config['legacy_db_password'] = get_secret(config['project_id'], 'legacy_db_password')
-        config['legacy_db_name'] = get_secret(config['project_id'], 'legacy_db_name')
-        config['cloud_sql_user'] = get_secret(config['project_id'], 'cloud_sql_user')
-        config['cloud_sql_password'] = get_secret(config['project_id'], 'cloud_sql_password')
+        config['secret_ttl_seconds'] = env_setting('MCP_SECRET_TTL_SECONDS', 300.0, float)
+        config.update(load_secrets(config, SECRET_KEYS))
+
+        # 3. Connection pool tuning, overridable per deployment via environment variables
+        config['source_pool_size'] = env_setting('MCP_SOURCE_POOL_SIZE', 8)
+        config['target_pool_size'] = env_setting('MCP_TARGET_POOL_SIZE', 8)
+        config['pool_max_idle_seconds'] = env_setting('MCP_POOL_MAX_IDLE_SECONDS', 300.0, float)
+        config['pool_checkout_timeout'] = env_setting('MCP_POOL_CHECKOUT_TIMEOUT', 30.0, float)
+        config['validation_source_concurrency'] = env_setting('MCP_VALIDATION_SOURCE_CONCURRENCY', 4)
+        config['validation_target_concurrency'] = env_setting('MCP_VALIDATION_TARGET_CONCURRENCY', 8)
+        config['checksum_chunk_rows'] = env_setting('MCP_CHECKSUM_CHUNK_ROWS', 100000)
+        config['checksum_max_ranges'] = env_setting('MCP_CHECKSUM_MAX_RANGES', 50)
+        config['checksum_max_queries'] = env_setting('MCP_CHECKSUM_MAX_QUERIES', 10000)
+        config['sample_rows'] = env_setting('MCP_SAMPLE_ROWS', 3000)
+        config['sample_confidence'] = env_setting('MCP_SAMPLE_CONFIDENCE', 0.95, float)
+        config['sample_estimate_tolerance'] = env_setting('MCP_SAMPLE_ESTIMATE_TOLERANCE', 0.25, float)
+        config['mydumper_dump_workers'] = env_setting('MCP_MYDUMPER_DUMP_WORKERS', 4)
+        config['mydumper_load_workers'] = env_setting('MCP_MYDUMPER_LOAD_WORKERS', 4)
+        config['mydumper_chunk_rows'] = env_setting('MCP_MYDUMPER_CHUNK_ROWS', 100000)
+        config['mydumper_batch_rows'] = env_setting('MCP_MYDUMPER_BATCH_ROWS', 1000)
+        config['gcs_bucket'] = env_setting('MCP_GCS_BUCKET', f"{config['project_id']}-migration-staging", str)
+        # When set, shards go to this local directory and are loaded with LOAD DATA (local testing)
+        config['gcs_local_root'] = env_setting('MCP_GCS_LOCAL_ROOT', None, str)
+        config['gcs_export_workers'] = env_setting('MCP_GCS_EXPORT_WORKERS', 4)
+        config['gcs_shard_mb'] = env_setting('MCP_GCS_SHARD_MB', 256)
+        # 'threaded' keeps the original one-thread-per-request server; 'async' enables job handles
+        config['server_mode'] = env_setting('MCP_SERVER_MODE', 'threaded', str)
+        config['max_workers'] = env_setting('MCP_MAX_WORKERS', 32)
+        config['batch_workers'] = env_setting('MCP_BATCH_WORKERS', 8)
+        config['cache_max_entries'] = env_setting('MCP_CACHE_MAX_ENTRIES', 1024)
+        config['schema_snapshot_ttl'] = env_setting('MCP_SCHEMA_SNAPSHOT_TTL', 600.0, float)
+        config['result_max_chars'] = env_setting('MCP_RESULT_MAX_CHARS', 4000)
+        config['result_store_entries'] = env_setting('MCP_RESULT_STORE_ENTRIES', 256)
+        # Local logs to tail as "name=path;name=path", e.g. the MySQL error and slow logs on this VM
+        config['log_files'] = env_setting('MCP_LOG_FILES', '', str)
+        config['log_cloud'] = env_setting('MCP_LOG_CLOUD', 1) == 1
+        config['log_poll_seconds'] = env_setting('MCP_LOG_POLL_SECONDS', 15.0, float)
+        config['slow_query_seconds'] = env_setting('MCP_SLOW_QUERY_SECONDS', 10.0, float)
+        config['dms_poll_seconds'] = env_setting('MCP_DMS_POLL_SECONDS', 30.0, float)
+        config['plan_probe_seconds'] = env_setting('MCP_PLAN_PROBE_SECONDS', 2.0, float)
+        # Heartbeat lag probe and delta validation while DMS replicates changes (0 disables the autostart)
+        config['cdc_monitor'] = env_setting('MCP_CDC_MONITOR', 1) == 1
+        config['cdc_heartbeat_seconds'] = env_setting('MCP_CDC_HEARTBEAT_SECONDS', 1.0, float)
+        config['cdc_delta_seconds'] = env_setting('MCP_CDC_DELTA_SECONDS', 30.0, float)
+        config['cdc_watermark_columns'] = env_setting('MCP_CDC_WATERMARK_COLUMNS', 'updated_at', str)
+        config['cdc_settle_seconds'] = env_setting('MCP_CDC_SETTLE_SECONDS', 60.0, float)
+        config['cdc_max_lag_seconds'] = env_setting('MCP_CDC_MAX_LAG_SECONDS', 5.0, float)
+        # analyze_performance: 0 analyzes counters since server startup instead of a live sample
+        config['perf_sample_seconds'] = env_setting('MCP_PERF_SAMPLE_SECONDS', 0.0, float)
+        config['perf_max_findings'] = env_setting('MCP_PERF_MAX_FINDINGS', 20)
+        config['perf_regression_ratio'] = env_setting('MCP_PERF_REGRESSION_RATIO', 1.5, float)
+        # Validation checkpoints live next to terraform_outputs/ so reruns on the VM can resume
+        config['checkpoint_path'] = env_setting(
+            'MCP_CHECKPOINT_PATH',
+            os.path.join(os.path.dirname(__file__), '..', 'validation_state', 'checkpoints.db'),
+            str,
+        )
 
         print("Configuration loaded successfully.")
         return config
@@ -71,61 +255,143 @@ def load_app_configuration():
         # In a real-world scenario, you might have more sophisticated error handling
         exit(1)
 
+def load_secrets(config, secret_ids):
+    """
+    Fetches the secrets concurrently into a TTL cache that refreshes in the
+    background. Rotated values are written back into `config`, so new pooled
+    connections pick up rotated credentials without a restart.
+    """
+    global _secret_cache
+    project_id = config['project_id']
+
+    def on_change(secret_id, value):
+        print(f"Secret '{secret_id}' was rotated; new connections will use the new value.")
+        config[secret_id] = value
+
+    _secret_cache = SecretCache(
+        lambda secret_id: get_secret(project_id, secret_id),
+        ttl=config['secret_ttl_seconds'],
+        on_change=on_change,
+    )
+    values = _secret_cache.prefetch(secret_ids)
+    _secret_cache.start()
+    return values
+
+def close_secret_cache():
+    if _secret_cache is not None:
+        _secret_cache.close()
+
 # --- Database & Cloud Tool Implementation ---
 
+def open_db_connection(config, use_source=True, **options):
+    """
+    Opens a new connection to the source (MySQL) or target (Cloud SQL) database.
+    Extra keyword options are passed through to mysql.connector.connect.
+    """
+    if use_source:
+        # Connect to the source database
+        return mysql.connector.connect(
+            host=config['legacy_db_host'],
+            user=config['legacy_db_user'],
+            password=config['legacy_db_password'],
+            database=config['legacy_db_name'],
+            autocommit=True,
+            **options
+        )
+    # Connect to Cloud SQL via the Auth Proxy's Unix socket
+    # This is the recommended and most secure method for GCE/GKE
+    return mysql.connector.connect(
+        user=config['cloud_sql_user'],
+        password=config['cloud_sql_password'],
+        database=config['legacy_db_name'], # Assuming same DB name
+        unix_socket=f"/cloudsql/{config['cloud_sql_connection_name']}",
+        autocommit=True,
+        **options
+    )
+
+def timed_db_connect(config, use_source=True):
+    with DB_CONNECT_SECONDS.time('source' if use_source else 'target'):
+        return open_db_connection(config, use_source)
+
+# One pool per endpoint, shared by all ThreadingHTTPServer handler threads
+_db_pools = {}
+_db_pools_lock = threading.Lock()
+
+def get_db_pool(config, use_source=True):
+    """Returns the connection pool for the source or target endpoint, creating it on first use."""
+    key = 'source' if use_source else 'target'
+    with _db_pools_lock:
+        pool = _db_pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                lambda: timed_db_connect(config, use_source),
+                max_size=config.get(f'{key}_pool_size', 8),
+                max_idle_seconds=config.get('pool_max_idle_seconds', 300.0),
+                checkout_timeout=config.get('pool_checkout_timeout', 30.0),
+                name=key,
+            )
+            _db_pools[key] = pool
+        return pool
+
+def close_db_pools():
+    """Closes every pooled connection; called on server shutdown."""
+    with _db_pools_lock:
+        pools = list(_db_pools.values())
+        _db_pools.clear()
+    for pool in pools:
+        pool.close()
+
+@contextmanager
 def get_db_connection(config, use_source=True):
     """
-    Establishes a connection to the source (MySQL) or target (Cloud SQL) database.
+    Checks out a pooled connection to the source (MySQL) or target (Cloud SQL)
+    database and returns it to the pool afterwards. Yields None if no
+    connection could be established.
     """
+    pool = get_db_pool(config, use_source)
     try:
-        if use_source:
-            # Connect to the source database
-            return mysql.connector.connect(
-                host=config['legacy_db_host'],
-                user=config['legacy_db_user'],
-                password=config['legacy_db_password'],
-                database=config['legacy_db_name']
-            )
-        else:
-            # Connect to Cloud SQL via the Auth Proxy's Unix socket
-            # This is the recommended and most secure method for GCE/GKE
-            return mysql.connector.connect(
-                user=config['cloud_sql_user'],
-                password=config['cloud_sql_password'],
-                database=config['legacy_db_name'], # Assuming same DB name
-                unix_socket=f"/cloudsql/{config['cloud_sql_connection_name']}"
-            )
-    except mysql.connector.Error as err:
+        conn = pool.acquire()
+    except (mysql.connector.Error, PoolTimeoutError) as err:
         print(f"Error connecting to database: {err}")
-        return None
+        yield None
+        return
+    discard = False
+    try:
+        yield InstrumentedConnection(conn, pool.name, DB_QUERY_SECONDS, DB_ROWS_READ)
+    except Exception:
+        discard = not conn.is_connected()
+        raise
+    finally:
+        pool.release(conn, discard=discard)
 
 def get_db_size(config):
     """Calculates the size of the source database in GB."""
-    conn = get_db_connection(config, use_source=True)
-    if not conn:
-        return "Error: Could not connect to the source database."
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT SUM(data_length + index_length) / 1024 / 1024 / 1024
-            FROM information_schema.tables WHERE table_schema = %s
-        """, (config['legacy_db_name'],))
-        result = cursor.fetchone()
-        size_gb = result[0] if result and result[0] is not None else 0
-        return f"{size_gb:.2f}GB"
-    except mysql.connector.Error as err:
-        return f"Error executing query to get DB size: {err}"
-    finally:
-        if conn and conn.is_connected():
-            conn.close()
+    with get_db_connection(config, use_source=True) as conn:
+        if not conn:
+            return "Error: Could not connect to the source database."
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT SUM(data_length + index_length) / 1024 / 1024 / 1024
+                FROM information_schema.tables WHERE table_schema = %s
+            """, (config['legacy_db_name'],))
+            result = cursor.fetchone()
+            size_gb = result[0] if result and result[0] is not None else 0
+            return f"{size_gb:.2f}GB"
+        except mysql.connector.Error as err:
+            return f"Error executing query to get DB size: {err}"
 
 def run_gcloud_command(command):
     """Executes a gcloud command and returns its output."""
+    # Label by the command group only (e.g. "gcloud dms jobs") to keep metric cardinality bounded
+    label = ' '.join(command[:3])
     try:
         print(f"Executing command: {' '.join(command)}")
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
+        with SUBPROCESS_SECONDS.time(label):
+            result = subprocess.run(command, check=True, capture_output=True, text=True)
         return result.stdout.strip()
     except subprocess.CalledProcessError as e:
+        SUBPROCESS_FAILURES.inc(label)
         error_message = f"Error executing gcloud command: {e.stderr.strip()}"
         print(error_message)
         return error_message
@@ -137,47 +403,618 @@ def migrate_dms(config):
         f"--project={config['project_id']}",
         f"--region={config['dms_job_region']}"
     ]
-    return run_gcloud_command(command)
+    output = run_gcloud_command(command)
+    if output.startswith("Error"):
+        return output
+    get_dms_monitor(config).start()
+    if config.get('cdc_monitor', True):
+        get_replication_monitors(config)
+    return (f"{output}\nDMS job started; call 'dms_status' for progress, throughput and ETA, "
+            "and 'cutover_status' for replication lag and delta validation.").strip()
+
+# One API session and one background poller for the configured DMS job
+_dms_backend = None
+_dms_monitor = None
+_dms_lock = threading.Lock()
+
+def get_dms_backend(config):
+    global _dms_backend
+    with _dms_lock:
+        if _dms_backend is None:
+            _dms_backend = DmsApiBackend(config['project_id'], config['dms_job_region'], config['dms_job_name'])
+        return _dms_backend
+
+def measure_database(config, use_source):
+    """Returns (rows, bytes) of the migrated schema on one side, from information_schema statistics."""
+    with get_db_connection(config, use_source) as conn:
+        if not conn:
+            raise ConnectionError(f"could not connect to the {'source' if use_source else 'target'} database")
+        stats = fetch_table_fingerprints(conn, config['legacy_db_name'])
+    return sum(s[1] or 0 for s in stats.values()), sum(s[2] or 0 for s in stats.values())
+
+def get_dms_monitor(config):
+    global _dms_monitor
+    backend = get_dms_backend(config)
+    with _dms_lock:
+        if _dms_monitor is None:
+            _dms_monitor = DmsJobMonitor(
+                backend,
+                lambda: measure_database(config, use_source=False),
+                lambda: measure_database(config, use_source=True),
+                poll_interval=config.get('dms_poll_seconds', 30.0),
+            )
+        return _dms_monitor
+
+def close_dms_monitor():
+    if _dms_monitor is not None:
+        _dms_monitor.close()
+
+def dms_status(config):
+    """DMS job state with copy progress, rows/bytes per second and ETA from the background poller."""
+    monitor = get_dms_monitor(config)
+    if monitor.status()["polls"] == 0:
+        monitor.poll()
+    report = monitor.status()
+    if report["state"] not in ("COMPLETED", "FAILED", "STOPPED", "DELETED"):
+        monitor.start()
+    return json.dumps(report, separators=(",", ":"), default=str)
+
+# Replication lag probe and delta validator, started with migrate_dms or the first cutover_status call
+_lag_probe = None
+_delta_validator = None
+_replication_lock = threading.Lock()
+
+def get_replication_monitors(config):
+    """Returns (lag probe, delta validator), starting both background threads on first use."""
+    global _lag_probe, _delta_validator
+    with _replication_lock:
+        if _lag_probe is None:
+            connect = lambda use_source: get_db_connection(config, use_source)
+            _lag_probe = HeartbeatLagProbe(connect, config['legacy_db_name'],
+                                           interval=config.get('cdc_heartbeat_seconds', 1.0))
+            _delta_validator = DeltaValidator(
+                connect,
+                config['legacy_db_name'],
+                watermark_columns=[c.strip() for c in config.get('cdc_watermark_columns', 'updated_at').split(',')
+                                   if c.strip()],
+                interval=config.get('cdc_delta_seconds', 30.0),
+                settle_seconds=config.get('cdc_settle_seconds', 60.0),
+                cursors=get_checkpoint_store(config),
+            )
+            _lag_probe.start()
+            _delta_validator.start()
+        return _lag_probe, _delta_validator
+
+def close_replication_monitors():
+    if _lag_probe is not None:
+        _lag_probe.close()
+    if _delta_validator is not None:
+        _delta_validator.close()
+
+def cutover_status(config, max_lag_seconds=None, include_dms=True):
+    """
+    Replication lag percentiles, delta validation of recently changed rows, and
+    whether it is safe to cut over, with the reasons when it is not.
+    """
+    probe, validator = get_replication_monitors(config)
+    try:
+        if probe.status()["polls"] == 0:
+            probe.poll()
+        dms = None
+        if include_dms:
+            dms = get_dms_monitor(config).status()
+            if dms["polls"] == 0:
+                get_dms_monitor(config).poll()
+                dms = get_dms_monitor(config).status()
+        lag, delta = probe.status(), validator.status()
+        ready, blockers = cutover_readiness(lag, delta, dms,
+                                            max_lag_seconds=max_lag_seconds or config.get('cdc_max_lag_seconds', 5.0))
+    except Exception as e:
+        return f"Error checking cutover readiness: {e}"
+    report = {"cutover_ready": ready, "blockers": blockers, "lag": lag, "delta": delta}
+    if dms is not None:
+        report["dms"] = {"state": dms["state"], "phase": dms["phase"], "error": dms["error"]}
+    return json.dumps(report, separators=(",", ":"), default=str)
+
+# Most recent pipeline per strategy, so migration_progress can report on a run in flight
+_migrations = {}
+_migrations_lock = threading.Lock()
+
+def migrate_mydumper(config, tables=None, dump_workers=None, load_workers=None, truncate_target=False):
+    """
+    Streams the source database into Cloud SQL in parallel primary-key-range chunks,
+    without staging a dump on disk, and returns per-table progress.
+    """
+    pipeline = DumpLoadPipeline(
+        lambda use_source: get_db_connection(config, use_source),
+        config['legacy_db_name'],
+        # Each worker holds one pooled connection for the length of a chunk
+        dump_workers=min(dump_workers or config.get('mydumper_dump_workers', 4), config.get('source_pool_size', 8)),
+        load_workers=min(load_workers or config.get('mydumper_load_workers', 4), config.get('target_pool_size', 8)),
+        chunk_rows=config.get('mydumper_chunk_rows', 100000),
+        batch_rows=config.get('mydumper_batch_rows', 1000),
+        truncate_target=truncate_target,
+    )
+    with _migrations_lock:
+        _migrations['mydumper'] = pipeline
+    try:
+        return pipeline.run_json(tables)
+    except Exception as e:
+        return f"Error running mydumper migration: {e}"
+
+def migrate_gcs(config, tables=None, export_workers=None, shard_mb=None, keep_shards=False):
+    """
+    Exports the source database as compressed CSV shards streamed to GCS in
+    parallel and imports them into Cloud SQL as they become available.
+    """
+    if config.get('gcs_local_root'):
+        storage = LocalStorage(config['gcs_local_root'])
+        importer = LoadDataImporter(lambda: open_db_connection(config, use_source=False, allow_local_infile=True))
+    else:
+        storage = GCSStorage(config['gcs_bucket'])
+        importer = CloudSqlImporter(
+            run_gcloud_command,
+            config['project_id'],
+            # The connection name is "project:region:instance"
+            config['cloud_sql_connection_name'].split(':')[-1],
+            config['legacy_db_name'],
+        )
+    pipeline = ExportImportPipeline(
+        lambda use_source: get_db_connection(config, use_source),
+        config['legacy_db_name'],
+        storage,
+        importer,
+        export_workers=min(export_workers or config.get('gcs_export_workers', 4), config.get('source_pool_size', 8)),
+        chunk_rows=config.get('mydumper_chunk_rows', 100000),
+        shard_bytes=(shard_mb or config.get('gcs_shard_mb', 256)) * 1024 * 1024,
+        keep_shards=keep_shards,
+    )
+    with _migrations_lock:
+        _migrations['gcs'] = pipeline
+    try:
+        return pipeline.run_json(tables)
+    except Exception as e:
+        return f"Error running GCS migration: {e}"
+
+def plan_migration(config, tables=None, max_downtime_seconds=None, probe_seconds=None):
+    """
+    Probes source read and target write throughput and returns a per-table
+    strategy and parallelism plan with predicted durations.
+    """
+    planner = MigrationPlanner(
+        lambda use_source: get_db_connection(config, use_source),
+        config['legacy_db_name'],
+        workers=min(config.get('mydumper_dump_workers', 4), config.get('source_pool_size', 8)),
+        load_workers=min(config.get('mydumper_load_workers', 4), config.get('target_pool_size', 8)),
+        chunk_rows=config.get('mydumper_chunk_rows', 100000),
+        shard_bytes=config.get('gcs_shard_mb', 256) * 1024 * 1024,
+        probe_seconds=probe_seconds or config.get('plan_probe_seconds', 2.0),
+        probe_workers=min(2, config.get('source_pool_size', 8), config.get('target_pool_size', 8)),
+    )
+    try:
+        return planner.plan_json(tables, max_downtime_seconds)
+    except Exception as e:
+        return f"Error planning migration: {e}"
+
+def migration_progress(config, strategy=None):
+    """Reports progress of the most recent migration run, optionally for one strategy."""
+    with _migrations_lock:
+        if strategy:
+            runs = {strategy: _migrations[strategy]} if strategy in _migrations else {}
+        else:
+            runs = dict(_migrations)
+    if not runs:
+        return "No migration has been started on this server."
+    return json.dumps({name: run.progress() for name, run in runs.items()}, separators=(",", ":"), default=str)
 
 def get_table_property(config, table_name, is_checksum=False):
     """Gets row count or checksum for a table from both databases."""
     prop_name = "Checksum" if is_checksum else "Row Count"
-    source_conn = get_db_connection(config, use_source=True)
-    target_conn = get_db_connection(config, use_source=False)
+    with get_db_connection(config, use_source=True) as source_conn, \
+            get_db_connection(config, use_source=False) as target_conn:
+
+        if not source_conn or not target_conn:
+            return f"Error: Could not connect to one or both databases for {prop_name} validation."
+
+        try:
+            source_cursor = source_conn.cursor()
+            target_cursor = target_conn.cursor()
+
+            table = quote_identifier(table_name)
+            query = f"CHECKSUM TABLE {table}" if is_checksum else f"SELECT COUNT(*) FROM {table}"
+
+            source_cursor.execute(query)
+            source_result = source_cursor.fetchone()[1 if is_checksum else 0]
+
+            target_cursor.execute(query)
+            target_result = target_cursor.fetchone()[1 if is_checksum else 0]
+
+            return json.dumps({
+                "table": table_name,
+                "property": prop_name,
+                "source_value": str(source_result),
+                "target_value": str(target_result),
+                "match": source_result == target_result
+            })
 
-    if not source_conn or not target_conn:
-        return f"Error: Could not connect to one or both databases for {prop_name} validation."
+        except mysql.connector.Error as err:
+            return f"Error validating {prop_name} for table {table_name}: {err}"
 
+_checkpoint_store = None
+_checkpoint_store_lock = threading.Lock()
+
+def get_checkpoint_store(config):
+    """Returns the shared validation checkpoint store, opening it on first use."""
+    global _checkpoint_store
+    with _checkpoint_store_lock:
+        if _checkpoint_store is None:
+            _checkpoint_store = CheckpointStore(config['checkpoint_path'])
+        return _checkpoint_store
+
+def clear_checkpoints(config, table_name=None):
+    """Forgets stored validation results so the next run re-checks everything."""
+    get_checkpoint_store(config).clear(table_name)
+    return f"Cleared validation checkpoints for {table_name or 'all tables'}."
+
+def validate_tables(config, checks=None, tables=None, source_concurrency=None, target_concurrency=None,
+                    resume=True, mode="exact", sample_rows=None, sampling="random", confidence=None, seed=None):
+    """
+    Validates row counts and/or checksums for every table in one call, running
+    source and target queries concurrently with a bounded worker pool per database.
+    With `resume`, tables that matched before and are unchanged since are skipped.
+    mode="sampled" compares hashes of sampled rows instead of whole tables.
+    """
+    # Never run more workers than the pool can hand out connections
+    source_concurrency = min(source_concurrency or config.get('validation_source_concurrency', 4),
+                             config.get('source_pool_size', 8))
+    target_concurrency = min(target_concurrency or config.get('validation_target_concurrency', 8),
+                             config.get('target_pool_size', 8))
+    if mode == "sampled":
+        return sampled_validation(config, tables, sample_rows, sampling, confidence, seed,
+                                  source_concurrency, target_concurrency)
+    validator = BulkValidator(
+        lambda use_source: get_db_connection(config, use_source),
+        config['legacy_db_name'],
+        source_concurrency=source_concurrency,
+        target_concurrency=target_concurrency,
+        checkpoints=get_checkpoint_store(config) if resume else None,
+    )
     try:
-        source_cursor = source_conn.cursor()
-        target_cursor = target_conn.cursor()
+        return validator.run_json(checks=checks or ("row_count", "checksum"), tables=tables)
+    except Exception as e:
+        return f"Error running bulk validation: {e}"
 
-        query = f"CHECKSUM TABLE {table_name}" if is_checksum else f"SELECT COUNT(*) FROM {table_name}"
+def sampled_validation(config, tables=None, sample_rows=None, sampling="random", confidence=None, seed=None,
+                       source_concurrency=None, target_concurrency=None):
+    """
+    Go/no-go validation for very large tables: compares TABLE_ROWS estimates,
+    then row hashes of the same sampled primary keys on both sides, and reports
+    an upper bound on the mismatch rate at the requested confidence.
+    """
+    try:
+        validator = SampledValidator(
+            lambda use_source: get_db_connection(config, use_source),
+            config['legacy_db_name'],
+            sample_rows=sample_rows or config.get('sample_rows', 3000),
+            method=sampling,
+            confidence=confidence or config.get('sample_confidence', 0.95),
+            estimate_tolerance=config.get('sample_estimate_tolerance', 0.25),
+            source_concurrency=source_concurrency or min(config.get('validation_source_concurrency', 4),
+                                                         config.get('source_pool_size', 8)),
+            target_concurrency=target_concurrency or min(config.get('validation_target_concurrency', 8),
+                                                         config.get('target_pool_size', 8)),
+            seed=seed,
+        )
+        return validator.run_json(tables)
+    except Exception as e:
+        return f"Error running sampled validation: {e}"
 
-        source_cursor.execute(query)
-        source_result = source_cursor.fetchone()[1 if is_checksum else 0]
+def chunked_checksum_table(config, table_name, chunk_rows=None, resume=True):
+    """
+    Compares a table in primary-key-range chunks on both databases and narrows
+    mismatching chunks down to the differing key ranges. With `resume`, an
+    interrupted run continues from its checkpointed chunks.
+    """
+    engine = ChunkedChecksum(
+        lambda use_source: get_db_connection(config, use_source),
+        config['legacy_db_name'],
+        chunk_rows=chunk_rows or config.get('checksum_chunk_rows', 100000),
+        max_ranges=config.get('checksum_max_ranges', 50),
+        max_chunk_queries=config.get('checksum_max_queries', 10000),
+        source_concurrency=min(config.get('validation_source_concurrency', 4), config.get('source_pool_size', 8)),
+        target_concurrency=min(config.get('validation_target_concurrency', 8), config.get('target_pool_size', 8)),
+        checkpoints=get_checkpoint_store(config) if resume else None,
+    )
+    try:
+        return engine.compare_json(table_name)
+    except Exception as e:
+        return f"Error running chunked checksum for table {table_name}: {e}"
 
-        target_cursor.execute(query)
-        target_result = target_cursor.fetchone()[1 if is_checksum else 0]
+def get_row_count(config, table_name):
+    """Compares the row count of one table between the databases."""
+    return get_table_property(config, table_name, is_checksum=False)
 
-        return json.dumps({
-            "table": table_name,
-            "property": prop_name,
-            "source_value": str(source_result),
-            "target_value": str(target_result),
-            "match": source_result == target_result
-        })
+def checksum_table(config, table_name, mode="table", chunk_rows=None, resume=True):
+    """Compares one table's checksum: whole-table, in primary-key-range chunks, or on sampled rows."""
+    if mode == "chunked":
+        return chunked_checksum_table(config, table_name, chunk_rows=chunk_rows, resume=resume)
+    if mode == "sampled":
+        return sampled_validation(config, [table_name])
+    return get_table_property(config, table_name, is_checksum=True)
 
-    except mysql.connector.Error as err:
-        return f"Error validating {prop_name} for table {table_name}: {err}"
-    finally:
-        if source_conn and source_conn.is_connected():
-            source_conn.close()
-        if target_conn and target_conn.is_connected():
-            target_conn.close()
+def cache_stats(config):
+    """Reports result cache hit/miss counters."""
+    return json.dumps(TOOLS.cache.stats())
+
+def invalidate_cache(config, tool_name=None):
+    """Drops cached tool outputs, for one tool or all of them."""
+    TOOLS.cache.invalidate(tool_name)
+    return f"Invalidated cached results for {tool_name or 'all tools'}."
+
+# Schema snapshots survive between compare_schema calls; sized in __main__ from configuration
+_schema_snapshots = SchemaSnapshotCache()
+
+def compare_schema(config, tables=None, refresh=False):
+    """
+    Compares source and target table definitions and returns only the differences,
+    with the DDL that would bring the target in line with the source.
+    """
+    comparer = SchemaComparer(
+        lambda use_source: get_db_connection(config, use_source),
+        config['legacy_db_name'],
+        cache=_schema_snapshots,
+    )
+    try:
+        return comparer.compare_json(tables, refresh)
+    except Exception as e:
+        return f"Error comparing schemas: {e}"
+
+def analyze_performance(config, sample_seconds=None, max_findings=None, compare_source=True):
+    """
+    Ranks target performance problems from performance_schema digests and InnoDB
+    counters, using the same statements on the source as the baseline.
+    """
+    analyzer = PerformanceAnalyzer(
+        lambda use_source: get_db_connection(config, use_source),
+        config['legacy_db_name'],
+        sample_seconds=config.get('perf_sample_seconds', 0.0) if sample_seconds is None else sample_seconds,
+        max_findings=max_findings or config.get('perf_max_findings', 20),
+        regression_ratio=config.get('perf_regression_ratio', 1.5),
+    )
+    try:
+        return analyzer.analyze_json(compare_source)
+    except Exception as e:
+        return f"Error analyzing performance: {e}"
+
+_log_monitor = None
+_log_monitor_lock = threading.Lock()
+
+def log_sources(config):
+    """Log sources from configuration: local files, plus DMS status and Cloud Logging unless disabled."""
+    sources = []
+    for spec in filter(None, (s.strip() for s in config.get('log_files', '').split(';'))):
+        name, sep, path = spec.partition('=')
+        sources.append(FileLogSource(name.strip(), path.strip()) if sep else FileLogSource(os.path.basename(spec), spec))
+    if config.get('log_cloud', True):
+        project_id = config['project_id']
+        # The connection name is "project:region:instance"; Cloud SQL logs use "project:instance"
+        database_id = f"{project_id}:{config['cloud_sql_connection_name'].split(':')[-1]}"
+        # Both log sources list entries through one authorized session
+        logging_api = CloudLoggingApi(project_id)
+        sources += [
+            DmsStatusSource('dms_status', get_dms_backend(config).get_job, config['dms_job_name']),
+            CloudLoggingSource('dms_logs', logging_api.list_entries,
+                               'resource.type="datamigration.googleapis.com/MigrationJob" AND severity>=WARNING'),
+            CloudLoggingSource('cloud_sql_logs', logging_api.list_entries,
+                               f'resource.type="cloudsql_database" AND resource.labels.database_id="{database_id}" '
+                               'AND severity>=WARNING'),
+        ]
+    return sources
+
+def get_log_monitor(config):
+    """Returns the shared log monitor, starting its background poller on first use."""
+    global _log_monitor
+    with _log_monitor_lock:
+        if _log_monitor is None:
+            _log_monitor = LogMonitor(
+                log_sources(config),
+                cursors=get_checkpoint_store(config),
+                poll_interval=config.get('log_poll_seconds', 15.0),
+                slow_query_seconds=config.get('slow_query_seconds', 10.0),
+            )
+            _log_monitor.start()
+        return _log_monitor
+
+def close_log_monitor():
+    if _log_monitor is not None:
+        _log_monitor.close()
+
+def monitor_logs(config, max_anomalies=50, poll=True):
+    """
+    Returns anomalies found in the migration logs since the previous call, with
+    rolling counters per category. Logs are tailed server-side from saved cursors.
+    """
+    monitor = get_log_monitor(config)
+    if poll:
+        monitor.poll()
+    report = monitor.drain(max_anomalies)
+    report["status"] = "anomalies_found" if report["new_anomalies"] else "all_clear"
+    return json.dumps(report, separators=(",", ":"), default=str)
+
+# Large outputs are kept here and replaced by a digest; sized in __main__ from configuration
+RESULTS = ResultStore()
+
+def fetch_result(config, handle, page=1, key=None):
+    """Returns one page of a stored tool output that was replaced by a digest."""
+    try:
+        return RESULTS.fetch(handle, page, key)
+    except KeyError as e:
+        return f"Error: {e.args[0]}"
+
+# --- Tool Registry ---
+
+_TABLE_LIST = {"type": "array", "items": {"type": "string"},
+               "description": "Table names; all base tables when omitted."}
+
+# Sized from the environment again in __main__ once configuration is loaded
+TOOLS = ToolRegistry(cache=ResultCache(), observer=observe_tool_call)
+
+TOOLS.register("get_db_size", get_db_size, read_only=True, cache_ttl=300,
+               description="Size of the source database in GB.")
+TOOLS.register("migrate_dms", migrate_dms, long_running=True, invalidates_cache=True,
+               description="Starts the pre-configured Database Migration Service job.")
+# Not read-only: the write probe inserts into a temporary table on the target
+TOOLS.register("plan_migration", plan_migration, parameters={
+    "type": "object",
+    "properties": {
+        "tables": _TABLE_LIST,
+        "max_downtime_seconds": {"type": "number", "minimum": 0,
+                                 "description": "Recommend DMS when the predicted copy time exceeds this."},
+        "probe_seconds": {"type": "number", "minimum": 0.1,
+                          "description": "Length of each read/write throughput probe."},
+    },
+}, description="Measures throughput and returns a per-table migration strategy, parallelism and predicted duration.")
+TOOLS.register("dms_status", dms_status, read_only=True,
+               description="DMS job state, copy progress, rows/bytes per second and ETA.")
+TOOLS.register("cutover_status", cutover_status, parameters={
+    "type": "object",
+    "properties": {
+        "max_lag_seconds": {"type": "number", "minimum": 0},
+        "include_dms": {"type": "boolean", "default": True},
+    },
+}, description="Replication lag percentiles, delta validation of changed rows and a cutover-ready signal.")
+TOOLS.register("migrate_mydumper", migrate_mydumper, long_running=True, invalidates_cache=True, parameters={
+    "type": "object",
+    "properties": {
+        "tables": _TABLE_LIST,
+        "dump_workers": {"type": "integer", "minimum": 1},
+        "load_workers": {"type": "integer", "minimum": 1},
+        "truncate_target": {"type": "boolean", "default": False},
+    },
+}, description="Streams the source into Cloud SQL in parallel primary-key-range chunks.")
+TOOLS.register("migrate_gcs", migrate_gcs, long_running=True, invalidates_cache=True, parameters={
+    "type": "object",
+    "properties": {
+        "tables": _TABLE_LIST,
+        "export_workers": {"type": "integer", "minimum": 1},
+        "shard_mb": {"type": "integer", "minimum": 1},
+        "keep_shards": {"type": "boolean", "default": False},
+    },
+}, description="Exports compressed CSV shards to GCS and imports them into Cloud SQL.")
+TOOLS.register("migration_progress", migration_progress, read_only=True, parameters={
+    "type": "object",
+    "properties": {"strategy": {"type": "string", "enum": ["gcs", "mydumper"]}},
+}, description="Progress of the most recent migrate_gcs / migrate_mydumper run.")
+TOOLS.register("get_row_count", get_row_count, read_only=True, cache_ttl=60, parameters={
+    "type": "object",
+    "properties": {"table_name": {"type": "string"}},
+    "required": ["table_name"],
+}, description="Compares the row count of one table between source and target.")
+TOOLS.register("checksum_table", checksum_table, read_only=True, long_running=True, cache_ttl=60, parameters={
+    "type": "object",
+    "properties": {
+        "table_name": {"type": "string"},
+        "mode": {"type": "string", "enum": ["table", "chunked", "sampled"], "default": "table"},
+        "chunk_rows": {"type": "integer", "minimum": 1},
+        "resume": {"type": "boolean", "default": True},
+    },
+    "required": ["table_name"],
+}, description="Compares one table's checksum; mode=chunked locates differing key ranges, "
+               "mode=sampled compares sampled rows.")
+TOOLS.register("validate_tables", validate_tables, read_only=True, long_running=True, parameters={
+    "type": "object",
+    "properties": {
+        "checks": {"type": "array", "items": {"type": "string", "enum": ["row_count", "checksum"]}},
+        "tables": _TABLE_LIST,
+        "source_concurrency": {"type": "integer", "minimum": 1},
+        "target_concurrency": {"type": "integer", "minimum": 1},
+        "resume": {"type": "boolean", "default": True},
+        "mode": {"type": "string", "enum": ["exact", "sampled"], "default": "exact"},
+        "sample_rows": {"type": "integer", "minimum": 1},
+        "sampling": {"type": "string", "enum": ["random", "stratified"], "default": "random"},
+        "confidence": {"type": "number", "exclusiveMinimum": 0, "exclusiveMaximum": 1},
+        "seed": {"type": "integer"},
+    },
+}, description="Row counts and checksums for every table in one call, mismatches first; "
+               "mode=sampled is a fast statistical check for very large tables.")
+TOOLS.register("clear_checkpoints", clear_checkpoints, parameters={
+    "type": "object",
+    "properties": {"table_name": {"type": "string"}},
+}, description="Forgets stored validation results for one table or all tables.")
+TOOLS.register("compare_schema", compare_schema, read_only=True, parameters={
+    "type": "object",
+    "properties": {
+        "tables": _TABLE_LIST,
+        "refresh": {"type": "boolean", "default": False,
+                    "description": "Re-read both schemas instead of reusing cached snapshots."},
+    },
+}, description="Compares source and target schemas; returns differing tables and the DDL to fix them.")
+TOOLS.register("analyze_performance", analyze_performance, read_only=True, long_running=True, cache_ttl=60, parameters={
+    "type": "object",
+    "properties": {
+        "sample_seconds": {"type": "number", "minimum": 0,
+                           "description": "Measure only activity during this window; 0 uses counters since startup."},
+        "max_findings": {"type": "integer", "minimum": 1},
+        "compare_source": {"type": "boolean", "default": True},
+    },
+}, description="Ranked target performance findings: regressed statements, missing indexes, full scans "
+               "and buffer pool problems.")
+TOOLS.register("monitor_logs", monitor_logs, parameters={
+    "type": "object",
+    "properties": {
+        "max_anomalies": {"type": "integer", "minimum": 1, "default": 50},
+        "poll": {"type": "boolean", "default": True,
+                 "description": "Read the sources now instead of only returning what the background poller found."},
+    },
+}, description="New anomalies in DMS, Cloud SQL and MySQL logs since the last call, plus rolling counters.")
+TOOLS.register("fetch_result", fetch_result, read_only=True, parameters={
+    "type": "object",
+    "properties": {
+        "handle": {"type": "string"},
+        "page": {"type": "integer", "minimum": 1, "default": 1},
+        "key": {"type": "string", "description": "List field of a JSON result to page through item by item."},
+    },
+    "required": ["handle"],
+}, description="Pages through the full output behind a result handle returned in place of a large result.")
+TOOLS.register("cache_stats", cache_stats, read_only=True,
+               description="Result cache hit/miss counters.")
+TOOLS.register("invalidate_cache", invalidate_cache, parameters={
+    "type": "object",
+    "properties": {"tool_name": {"type": "string"}},
+}, description="Drops cached tool outputs so the next call queries the databases again.")
 
 # --- MCP Server ---
 
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+def get_batch_executor(config):
+    """Returns the shared pool that runs the read-only calls of a batch concurrently."""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(config.get('batch_workers', 8), thread_name_prefix="mcp-batch")
+        return _batch_executor
+
+def parse_tool_request(request_data):
+    """
+    Returns (tool_name, args, kwargs) from either {"tool": ..., "arguments": {...}}
+    or the legacy {"tool_code": "name(arg, key=value)"} form.
+    """
+    if 'tool' in request_data:
+        arguments = request_data.get('arguments') or {}
+        if not isinstance(arguments, dict):
+            raise ToolError("'arguments' must be a JSON object")
+        return request_data['tool'], [], arguments
+    return parse_tool_code(request_data.get('tool_code', ''))
+
+def tool_progress(tool_name):
+    """Live progress for a running tool, where the tool can report it."""
+    strategy = {"migrate_gcs": "gcs", "migrate_mydumper": "mydumper"}.get(tool_name)
+    with _migrations_lock:
+        run = _migrations.get(strategy)
+    return run.progress() if run is not None else None
+
 class MCPRequestHandler(BaseHTTPRequestHandler):
     # Class-level attribute to hold the config, loaded once at server start
     server_config = None
@@ -188,6 +1025,16 @@ class MCPRequestHandler(BaseHTTPRequestHandler):
             self.send_header('Content-type', 'text/plain')
             self.end_headers()
             self.wfile.write(b'ok')
+        elif self.path == '/metrics':
+            self.send_response(200)
+            self.send_header('Content-type', 'text/plain; version=0.0.4')
+            self.end_headers()
+            self.wfile.write(METRICS.render().encode('utf-8'))
+        elif self.path == '/tools':
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(TOOLS.describe()).encode('utf-8'))
         else:
             self.send_error(404, 'File Not Found')
 
@@ -201,45 +1048,76 @@ class MCPRequestHandler(BaseHTTPRequestHandler):
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.end_headers()
-            self.wfile.write(json.dumps(response_data).encode('utf-8'))
+            self.wfile.write(json.dumps(response_data, default=str).encode('utf-8'))
         except json.JSONDecodeError:
             self.send_error(400, "Invalid JSON")
         except Exception as e:
             print(f"Error handling request: {e}")
             self.send_error(500, "Internal Server Error")
 
-    def handle_request(self, request_data):
-        tool_code = request_data.get('tool_code', '')
-        # Basic parsing to extract tool name and arguments
+    @staticmethod
+    def tool_name_of(request_data):
+        if 'calls' in request_data:
+            return 'batch'
+        try:
+            return parse_tool_request(request_data)[0]
+        except ToolError:
+            return ''
+
+    @classmethod
+    def handle_request(cls, request_data):
+        with REQUESTS_IN_FLIGHT.track_in_progress():
+            return cls._dispatch(request_data)
+
+    @classmethod
+    def _dispatch(cls, request_data):
+        # A batch is {"calls": [<request>, ...]} and returns one output per call, in order
+        if 'calls' in request_data:
+            return {"outputs": cls.handle_batch(request_data['calls'])}
         try:
-            tool_name = tool_code.split('(')[0].replace('print(','').strip()
-            args_str = tool_code[tool_code.find('(')+1:tool_code.rfind(')')]
-            args = [a.strip().replace('"', '').replace("'", "") for a in args_str.split(',') if a]
-        except IndexError:
-            return {"output": "Error: Invalid tool_code format"}
-
-        print(f"Executing tool '{tool_name}' with args {args}")
-        output = self.main_tool_handler(tool_name, args, self.server_config)
+            tool_name, args, kwargs = parse_tool_request(request_data)
+        except ToolError as e:
+            return {"output": f"Error: {e}"}
+
+        print(f"Executing tool '{tool_name}' with args {args} {kwargs}")
+        output = cls.main_tool_handler(tool_name, args, kwargs, cls.server_config,
+                                       use_cache=not request_data.get('no_cache', False))
+        # "full": true skips the digest, for callers that are not LLM agents
+        if tool_name != 'fetch_result' and not request_data.get('full', False):
+            output = RESULTS.compact(tool_name, output)
         return {"output": output}
 
-    def main_tool_handler(self, tool_name, args, config):
+    @classmethod
+    def handle_batch(cls, calls):
+        if not isinstance(calls, list):
+            return ["Error: 'calls' must be a list of tool requests."]
+        parsed, errors = [], {}
+        for index, call in enumerate(calls):
+            try:
+                parsed.append(parse_tool_request(call))
+            except (ToolError, AttributeError) as e:
+                errors[index] = f"Error: {e}"
+                parsed.append(None)
+        print(f"Executing batch of {len(calls)} tool calls")
+        valid = [p for p in parsed if p is not None]
+        outputs = iter(TOOLS.call_batch(valid, cls.server_config, get_batch_executor(cls.server_config)))
+        results = []
+        for index, (call, p) in enumerate(zip(calls, parsed)):
+            if p is None:
+                results.append(errors[index])
+            elif p[0] == 'fetch_result' or call.get('full', False):
+                results.append(next(outputs))
+            else:
+                results.append(RESULTS.compact(p[0], next(outputs)))
+        return results
+
+    @staticmethod
+    def main_tool_handler(tool_name, args, kwargs, config, use_cache=True):
         """Routes tool calls to the appropriate Python function."""
-        # Database readiness tools
-        if tool_name == "get_db_size":
-            return get_db_size(config)
-        # Migration tools
-        elif tool_name == "migrate_dms":
-            return migrate_dms(config)
-        # Validation tools
-        elif tool_name == "get_row_count":
-            return get_table_property(config, args[0], is_checksum=False) if args else "Error: table_name required."
-        elif tool_name == "checksum_table":
-            return get_table_property(config, args[0], is_checksum=True) if args else "Error: table_name required."
-        # Fallback for unimplemented tools
-        elif tool_name in ["compare_schema", "migrate_gcs", "migrate_mydumper"]:
-             return f"Tool '{tool_name}' is a valid placeholder but not implemented in this version."
-        else:
-            return f"Error: Tool '{tool_name}' is not recognized."
+        try:
+            return TOOLS.call(tool_name, config, args, kwargs, use_cache=use_cache)
+        except ToolError as e:
+            return f"Error: {e}"
 
 class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
     pass
@@ -248,9 +1126,37 @@ if __name__ == '__main__':
     # Load configuration once globally at server startup.
     # The handler will access this via its class attribute.
     MCPRequestHandler.server_config = load_app_configuration()
+    TOOLS.cache = ResultCache(MCPRequestHandler.server_config['cache_max_entries'])
+    _schema_snapshots.ttl = MCPRequestHandler.server_config['schema_snapshot_ttl']
+    RESULTS = ResultStore(MCPRequestHandler.server_config['result_max_chars'],
+                          max_entries=MCPRequestHandler.server_config['result_store_entries'])
 
     port = 8000
-    server_address = ('', port)
-    httpd = ThreadingHTTPServer(server_address, MCPRequestHandler)
-    print(f"Starting MCP server on http://localhost:{port}...")
-    httpd.serve_forever()
\ No newline at end of file
+    try:
+        if MCPRequestHandler.server_config['server_mode'] == 'async':
+            server = AsyncMCPServer(
+                MCPRequestHandler.handle_request,
+                MCPRequestHandler.tool_name_of,
+                long_running=[name for name in TOOLS.names() if TOOLS.get(name).long_running],
+                get_routes={
+                    '/tools': ('application/json', lambda: json.dumps(TOOLS.describe())),
+                    '/metrics': ('text/plain; version=0.0.4', METRICS.render),
+                },
+                progress_for=tool_progress,
+                max_workers=MCPRequestHandler.server_config['max_workers'],
+            )
+            print(f"Starting async MCP server on http://localhost:{port}...")
+            server.run('', port)
+        else:
+            server_address = ('', port)
+            httpd = ThreadingHTTPServer(server_address, MCPRequestHandler)
+            print(f"Starting MCP server on http://localhost:{port}...")
+            httpd.serve_forever()
+    finally:
+        close_replication_monitors()
+        close_dms_monitor()
+        close_log_monitor()
+        close_secret_cache()
+        close_db_pools()
+        if _checkpoint_store is not None:
+            _checkpoint_store.close()
\ No newline at end of file
@@ -0,0 +1,308 @@
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from chunked_checksum import CHUNKABLE_KEY_TYPES
+from table_validation import INTERNAL_TABLES, quote_identifier
+
+LOB_TYPES = {"tinyblob", "blob", "mediumblob", "longblob", "tinytext", "text", "mediumtext", "longtext", "json"}
+
+# Fixed costs of the two paths, in seconds
+GCS_IMPORT_OVERHEAD = 15.0  # per `gcloud sql import csv` operation (one per shard)
+MYDUMPER_TABLE_OVERHEAD = 1.0  # key range planning and session setup per table
+# LOAD DATA CSV grows with escaping, most for binary/text-heavy rows
+CSV_INFLATION = 1.1
+CSV_INFLATION_LOB = 1.5
+GCS_COMPRESSION_RATIO = 3.0
+
+
+def fetch_table_stats(conn, schema):
+    """
+    Returns {table: stats} for every base table in two information_schema
+    queries: sizes and row counts, LOB column counts, and the leading primary
+    key type that decides whether a table can be split into parallel chunks.
+    """
+    cursor = conn.cursor()
+    try:
+        try:
+            cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+        except Exception:
+            pass  # MySQL 5.7
+        lob_types = ", ".join(f"'{t}'" for t in sorted(LOB_TYPES))
+        cursor.execute(f"""
+            SELECT t.table_name, t.table_rows, t.avg_row_length, t.data_length, t.index_length,
+                   SUM(c.data_type IN ({lob_types})), COUNT(c.column_name)
+            FROM information_schema.tables t
+            JOIN information_schema.columns c
+              ON c.table_schema = t.table_schema AND c.table_name = t.table_name
+            WHERE t.table_schema = %s AND t.table_type = 'BASE TABLE'
+            GROUP BY t.table_name, t.table_rows, t.avg_row_length, t.data_length, t.index_length
+        """, (schema,))
+        stats = {
+            row[0]: {
+                "rows": int(row[1] or 0),
+                "avg_row_bytes": int(row[2] or 0),
+                "data_bytes": int(row[3] or 0),
+                "index_bytes": int(row[4] or 0),
+                "lob_columns": int(row[5] or 0),
+                "columns": int(row[6] or 0),
+                "key": None,
+                "chunkable": False,
+            }
+            for row in cursor.fetchall()
+            if row[0] not in INTERNAL_TABLES
+        }
+        cursor.execute("""
+            SELECT k.table_name, k.column_name, c.data_type
+            FROM information_schema.key_column_usage k
+            JOIN information_schema.columns c
+              ON c.table_schema = k.table_schema AND c.table_name = k.table_name AND c.column_name = k.column_name
+            WHERE k.table_schema = %s AND k.constraint_name = 'PRIMARY' AND k.ordinal_position = 1
+        """, (schema,))
+        for table_name, column_name, data_type in cursor.fetchall():
+            if table_name in stats:
+                stats[table_name]["key"] = column_name
+                stats[table_name]["chunkable"] = data_type.lower() in CHUNKABLE_KEY_TYPES
+    finally:
+        cursor.close()
+    return stats
+
+
+def _row_bytes(row):
+    return sum(len(v) if isinstance(v, (bytes, bytearray, str)) else 8 for v in row if v is not None)
+
+
+class MigrationPlanner:
+    """
+    Builds a per-table migration plan from measured throughput.
+
+    A short probe reads from the source on `probe_workers` connections at once
+    (keyset-paged scans of the largest tables) and writes to the target into
+    session temporary tables, giving per-connection read and write rates on the
+    real network path. Each table is then assigned to the streaming dump/load
+    path ('mydumper') or the GCS CSV path ('gcs') by predicted duration, with the
+    parallelism its size and primary key allow. GCS imports are serialized by
+    Cloud SQL and pay a fixed cost per shard; the streaming path parallelizes
+    only over integer primary-key ranges. If the predicted total exceeds
+    `max_downtime_seconds`, DMS (continuous replication) is recommended for
+    the whole database instead.
+    """
+
+    def __init__(self, connect, schema, workers=4, load_workers=4, chunk_rows=100000, shard_bytes=256 * 1024 * 1024,
+                 probe_seconds=2.0, probe_workers=2):
+        self.connect = connect
+        self.schema = schema
+        self.workers = max(1, workers)
+        self.load_workers = max(1, load_workers)
+        self.chunk_rows = max(1, chunk_rows)
+        self.shard_bytes = max(1, shard_bytes)
+        self.probe_seconds = probe_seconds
+        self.probe_workers = max(1, probe_workers)
+
+    def plan(self, tables=None, max_downtime_seconds=None):
+        started = time.monotonic()
+        stats = self._on_side(True, fetch_table_stats, self.schema)
+        if tables:
+            wanted = set(tables)
+            stats = {t: s for t, s in stats.items() if t in wanted}
+        probe = self.probe(stats)
+        read_rate = probe["source_read_bytes_per_second"] / probe["workers"]
+        write_rate = probe["target_write_bytes_per_second"]
+        write_rate = read_rate if write_rate == "unmeasured" else write_rate / probe["workers"]
+
+        planned = [self._plan_table(name, s, read_rate, write_rate) for name, s in stats.items()]
+        planned.sort(key=lambda p: p["predicted_seconds"], reverse=True)
+
+        by_strategy = {}
+        for strategy in ("mydumper", "gcs"):
+            chosen = [p for p in planned if p["strategy"] == strategy]
+            if not chosen:
+                continue
+            total_bytes = sum(p["data_bytes"] for p in chosen)
+            if strategy == "mydumper":
+                # Tables share the worker pool, but no table finishes faster than its own estimate
+                pooled = total_bytes / max(1.0, min(read_rate * self.workers, write_rate * self.load_workers))
+                seconds = max(pooled + MYDUMPER_TABLE_OVERHEAD * len(chosen), chosen[0]["predicted_seconds"])
+            else:
+                # Cloud SQL runs one import at a time
+                seconds = sum(p["predicted_seconds"] for p in chosen)
+            by_strategy[strategy] = {"tables": len(chosen), "data_bytes": total_bytes,
+                                     "predicted_seconds": round(seconds)}
+        # The two paths can run side by side
+        predicted = max((s["predicted_seconds"] for s in by_strategy.values()), default=0)
+
+        calls = []
+        if "mydumper" in by_strategy:
+            calls.append({"tool": "migrate_mydumper", "arguments": {
+                "tables": [p["table"] for p in planned if p["strategy"] == "mydumper"],
+                "dump_workers": self.workers, "load_workers": self.load_workers}})
+        if "gcs" in by_strategy:
+            calls.append({"tool": "migrate_gcs", "arguments": {
+                "tables": [p["table"] for p in planned if p["strategy"] == "gcs"],
+                "export_workers": self.workers}})
+        summary = {
+            "tables": len(planned),
+            "data_bytes": sum(p["data_bytes"] for p in planned),
+            "by_strategy": by_strategy,
+            "predicted_seconds": predicted,
+            "database_strategy": "per_table",
+            "recommended_calls": calls,
+        }
+        if max_downtime_seconds is not None and predicted > max_downtime_seconds:
+            summary["database_strategy"] = "dms"
+            summary["reason"] = (f"predicted copy time {predicted}s exceeds the allowed downtime of "
+                                 f"{max_downtime_seconds}s; DMS keeps replicating until cutover")
+            summary["recommended_calls"] = [{"tool": "migrate_dms", "arguments": {}}]
+        return {
+            "probe": probe,
+            "summary": summary,
+            "tables": planned,
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+        }
+
+    def plan_json(self, tables=None, max_downtime_seconds=None):
+        return json.dumps(self.plan(tables, max_downtime_seconds), separators=(",", ":"), default=str)
+
+    def probe(self, stats):
+        """Measures source read and target write throughput with `probe_workers` connections each."""
+        candidates = sorted((n for n, s in stats.items() if s["rows"]), key=lambda n: stats[n]["data_bytes"],
+                            reverse=True)[:self.probe_workers] or [None]
+        with ThreadPoolExecutor(self.probe_workers * 2, thread_name_prefix="plan-probe") as pool:
+            reads = [pool.submit(self._on_side, True, self._read_probe, candidates[i % len(candidates)], stats)
+                     for i in range(self.probe_workers)]
+            writes = [pool.submit(self._on_side, False, self._write_probe) for _ in range(self.probe_workers)]
+            read_bytes, read_seconds = map(sum, zip(*(f.result() for f in reads)))
+            write_results = [f.result() for f in writes]
+        # Rates are aggregated over concurrent workers: total bytes over the mean worker time
+        read_rate = round(read_bytes / max(read_seconds / self.probe_workers, 1e-3))
+        probe = {
+            "workers": self.probe_workers,
+            "seconds": self.probe_seconds,
+            "source_read_bytes_per_second": read_rate,
+        }
+        if any(r is None for r in write_results):
+            probe["target_write_bytes_per_second"] = "unmeasured"
+            probe["note"] = ("target is read-only (a DMS destination?), so writes were not probed; "
+                             "predictions assume the target writes as fast as the source reads")
+        else:
+            write_bytes, write_seconds = map(sum, zip(*write_results))
+            probe["target_write_bytes_per_second"] = round(write_bytes / max(write_seconds / self.probe_workers, 1e-3))
+        return probe
+
+    def _read_probe(self, conn, table_name, stats):
+        if table_name is None:
+            return 0, self.probe_seconds
+        info = stats[table_name]
+        batch = max(100, min(50000, (8 * 1024 * 1024) // max(1, info["avg_row_bytes"])))
+        table = quote_identifier(table_name)
+        cursor = conn.cursor()
+        started = time.monotonic()
+        total = 0
+        try:
+            if not info["chunkable"]:
+                # No key to page on; OFFSET paging keeps this a timed read like the keyset path
+                offset = 0
+                while time.monotonic() - started < self.probe_seconds:
+                    cursor.execute(f"SELECT * FROM {table} LIMIT {batch} OFFSET {offset}")
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+                    offset += len(rows)
+                    total += sum(_row_bytes(r) for r in rows)
+            else:
+                key = quote_identifier(info["key"])
+                key_index = None
+                last = None
+                while time.monotonic() - started < self.probe_seconds:
+                    if last is None:
+                        cursor.execute(f"SELECT * FROM {table} ORDER BY {key} LIMIT {batch}")
+                    else:
+                        cursor.execute(f"SELECT * FROM {table} WHERE {key} > %s ORDER BY {key} LIMIT {batch}",
+                                       (last,))
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+                    if key_index is None:
+                        key_index = [d[0] for d in cursor.description].index(info["key"])
+                    last = rows[-1][key_index]
+                    total += sum(_row_bytes(r) for r in rows)
+        finally:
+            cursor.close()
+        return total, time.monotonic() - started
+
+    def _write_probe(self, conn):
+        """Returns (bytes, seconds) written, or None when the target is read-only."""
+        payload = os.urandom(16 * 1024)
+        cursor = conn.cursor()
+        cursor.execute("SELECT @@global.read_only")
+        read_only = int(cursor.fetchone()[0] or 0)
+        if read_only:
+            cursor.close()
+            return None
+        started = time.monotonic()
+        total = 0
+        next_id = 0
+        try:
+            # Temporary tables are private to the session and never replicated into the migrated schema
+            cursor.execute("CREATE TEMPORARY TABLE IF NOT EXISTS `_mcp_plan_probe` "
+                           "(id INT PRIMARY KEY, payload MEDIUMBLOB)")
+            while time.monotonic() - started < self.probe_seconds:
+                rows = [(next_id + i, payload) for i in range(64)]
+                cursor.executemany("INSERT INTO `_mcp_plan_probe` (id, payload) VALUES (%s, %s)", rows)
+                next_id += len(rows)
+                total += len(rows) * len(payload)
+        finally:
+            try:
+                cursor.execute("DROP TEMPORARY TABLE IF EXISTS `_mcp_plan_probe`")
+            finally:
+                cursor.close()
+        return total, time.monotonic() - started
+
+    def _plan_table(self, name, s, read_rate, write_rate):
+        size = max(s["data_bytes"], s["rows"] * s["avg_row_bytes"])
+        lob_heavy = s["lob_columns"] > 0 and s["avg_row_bytes"] >= 8192
+        parallelism = min(self.workers, max(1, math.ceil(s["rows"] / self.chunk_rows))) if s["chunkable"] else 1
+        # Secondary indexes are rebuilt on the target as rows arrive
+        index_factor = 1 + s["index_bytes"] / max(1, s["data_bytes"])
+
+        stream_rate = max(1.0, min(read_rate * parallelism, write_rate * min(parallelism, self.load_workers)))
+        mydumper_seconds = size * index_factor / stream_rate + MYDUMPER_TABLE_OVERHEAD
+
+        csv_bytes = size * (CSV_INFLATION_LOB if lob_heavy else CSV_INFLATION)
+        shards = max(1, math.ceil(csv_bytes / GCS_COMPRESSION_RATIO / self.shard_bytes))
+        export_seconds = csv_bytes / max(1.0, read_rate * parallelism)
+        import_seconds = csv_bytes * index_factor / max(1.0, write_rate) + GCS_IMPORT_OVERHEAD * shards
+        # Export of later shards overlaps the import of earlier ones
+        gcs_seconds = max(export_seconds, import_seconds)
+
+        if lob_heavy:
+            strategy, reason = "mydumper", "LOB-heavy rows stream binary-safe; CSV escaping would inflate them"
+        elif mydumper_seconds <= gcs_seconds:
+            strategy, reason = "mydumper", "fastest predicted path"
+        else:
+            strategy, reason = "gcs", "fastest predicted path"
+        if strategy == "mydumper" and not s["chunkable"] and parallelism == 1 and s["rows"] > self.chunk_rows:
+            reason += "; no integer primary key, so it is copied on a single connection"
+        return {
+            "table": name,
+            "rows": s["rows"],
+            "data_bytes": s["data_bytes"],
+            "index_bytes": s["index_bytes"],
+            "avg_row_bytes": s["avg_row_bytes"],
+            "lob_columns": s["lob_columns"],
+            "chunkable": s["chunkable"],
+            "strategy": strategy,
+            "parallelism": parallelism,
+            "predicted_seconds": round(mydumper_seconds if strategy == "mydumper" else gcs_seconds, 1),
+            "alternative_seconds": round(gcs_seconds if strategy == "mydumper" else mydumper_seconds, 1),
+            "reason": reason,
+        }
+
+    def _on_side(self, use_source, fn, *args):
+        with self.connect(use_source) as conn:
+            if not conn:
+                side = "source" if use_source else "target"
+                raise ConnectionError(f"could not connect to the {side} database")
+            return fn(conn, *args)
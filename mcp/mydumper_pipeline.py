@@ -0,0 +1,355 @@
+import json
+import math
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from chunked_checksum import CHUNKABLE_KEY_TYPES
+from table_validation import INTERNAL_TABLES, quote_identifier
+
+_END_OF_STREAM = object()
+
+
+def describe_schema(conn, schema):
+    """
+    Returns {table: (leading primary key column or None, key data type, insertable columns)}
+    for every base table of a schema, except INTERNAL_TABLES, in one query. Generated columns are left out
+    because MySQL rejects explicit values for them.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT c.table_name, c.column_name, c.data_type, c.extra, k.ordinal_position
+            FROM information_schema.columns c
+            JOIN information_schema.tables t
+              ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+             AND t.table_type = 'BASE TABLE'
+            LEFT JOIN information_schema.key_column_usage k
+              ON k.table_schema = c.table_schema AND k.table_name = c.table_name
+             AND k.column_name = c.column_name AND k.constraint_name = 'PRIMARY'
+            WHERE c.table_schema = %s
+            ORDER BY c.table_name, c.ordinal_position
+        """, (schema,))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    tables = {}
+    for table_name, column_name, data_type, extra, key_position in rows:
+        if table_name in INTERNAL_TABLES:
+            continue
+        info = tables.setdefault(table_name, {"key": None, "key_type": None, "columns": []})
+        if key_position == 1:
+            info["key"], info["key_type"] = column_name, data_type.lower()
+        if 'GENERATED' not in (extra or '').upper():
+            info["columns"].append(column_name)
+    return {name: (info["key"], info["key_type"], info["columns"]) for name, info in tables.items()}
+
+
+def plan_key_ranges(conn, schema, table_name, info, chunk_rows):
+    """
+    Splits a table into half-open [start, end) ranges of its integer leading primary
+    key holding roughly `chunk_rows` rows each. Returns [None] (one unbounded chunk)
+    for tables that cannot be split, and [] for empty tables.
+    """
+    key_column, key_type, _ = info
+    if key_column is None or key_type not in CHUNKABLE_KEY_TYPES:
+        return [None]
+    key = quote_identifier(key_column)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT MIN({key}), MAX({key}) FROM {quote_identifier(table_name)}")
+        low, high = cursor.fetchone()
+        cursor.execute("""
+            SELECT table_rows FROM information_schema.tables
+            WHERE table_schema = %s AND table_name = %s
+        """, (schema, table_name))
+        row = cursor.fetchone()
+        estimated_rows = int(row[0] or 0) if row else 0
+    finally:
+        cursor.close()
+    if low is None:
+        return []
+    low, high = int(low), int(high)
+    chunk_count = max(1, math.ceil(max(estimated_rows, 1) / chunk_rows))
+    width = max(1, math.ceil((high - low + 1) / chunk_count))
+    return [(start, min(start + width, high + 1)) for start in range(low, high + 1, width)]
+
+
+def chunk_select(table_name, info, chunk):
+    """Builds the SELECT (and its parameters) that streams one chunk of a table."""
+    key_column, _, columns = info
+    query = f"SELECT {', '.join(quote_identifier(c) for c in columns)} FROM {quote_identifier(table_name)}"
+    if chunk is None:
+        return query, ()
+    key = quote_identifier(key_column)
+    return query + f" WHERE {key} >= %s AND {key} < %s", tuple(chunk)
+
+
+class DumpLoadPipeline:
+    """
+    Streams tables from the source to the target without staging a dump on disk.
+
+    Dump workers read tables in primary-key-range chunks and push batches of
+    rows onto a bounded in-process queue; load workers pop them and batch-insert
+    into the target. The bounded queue applies backpressure, so memory stays at
+    roughly `queue_segments` x `batch_rows` rows however large the tables are.
+    Tables without an integer leading primary key are streamed as a single chunk.
+
+    `connect(use_source)` must return a context manager yielding a connection,
+    or None on failure. `progress()` may be called from other threads while
+    `run()` is in flight.
+    """
+
+    def __init__(self, connect, schema, dump_workers=4, load_workers=4, chunk_rows=100000,
+                 batch_rows=1000, queue_segments=32, truncate_target=False):
+        self.connect = connect
+        self.schema = schema
+        self.dump_workers = max(1, dump_workers)
+        self.load_workers = max(1, load_workers)
+        self.chunk_rows = max(1, chunk_rows)
+        self.batch_rows = max(1, batch_rows)
+        self.queue_segments = max(1, queue_segments)
+        self.truncate_target = truncate_target
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._started = None
+        self._finished = None
+
+    def run(self, tables=None):
+        """Migrates the given tables (default: all base tables) and returns the final report."""
+        self._started = time.monotonic()
+        layout = self._on_side(True, describe_schema, self.schema)
+        if tables:
+            missing = [t for t in tables if t not in layout]
+            layout = {t: layout[t] for t in tables if t in layout}
+            for table_name in missing:
+                self._tables[table_name] = _table_state("failed", error="table not found on source")
+        if self.truncate_target:
+            # Before the loaders start, since each of them holds a target connection for the whole run
+            self._truncate(layout)
+            layout = {t: info for t, info in layout.items() if not self._is_failed(t)}
+
+        segments = queue.Queue(maxsize=self.queue_segments)
+        loaders = [threading.Thread(target=self._load_worker, args=(segments, layout),
+                                    name=f"mydumper-load-{i}", daemon=True)
+                   for i in range(self.load_workers)]
+        for loader in loaders:
+            loader.start()
+
+        try:
+            with ThreadPoolExecutor(self.dump_workers, thread_name_prefix="mydumper-dump") as dumpers:
+                plans = {table_name: dumpers.submit(self._on_side, True, plan_key_ranges, self.schema,
+                                                    table_name, info, self.chunk_rows)
+                         for table_name, info in layout.items()}
+                chunk_futures = []
+                for table_name, plan in plans.items():
+                    try:
+                        chunks = plan.result()
+                    except Exception as e:
+                        self._fail(table_name, f"planning failed: {e}")
+                        continue
+                    with self._lock:
+                        state = self._tables[table_name] = _table_state("running")
+                        state["chunks"] = {index: _chunk_state(chunk) for index, chunk in enumerate(chunks)}
+                    for index, chunk in enumerate(chunks):
+                        chunk_futures.append(dumpers.submit(
+                            self._dump_chunk, segments, table_name, layout[table_name], index, chunk))
+                for future in chunk_futures:
+                    future.result()
+        finally:
+            for _ in loaders:
+                segments.put(_END_OF_STREAM)
+            for loader in loaders:
+                loader.join()
+            self._finished = time.monotonic()
+        return self.progress(final=True)
+
+    def run_json(self, tables=None):
+        return json.dumps(self.run(tables), separators=(",", ":"), default=str)
+
+    def progress(self, final=False):
+        """Snapshot of per-table progress; per-chunk detail is included for unfinished tables."""
+        with self._lock:
+            elapsed = ((self._finished or time.monotonic()) - self._started) if self._started else 0.0
+            tables = {}
+            rows_loaded = 0
+            for table_name, state in self._tables.items():
+                chunks = state["chunks"].values()
+                done = sum(1 for c in chunks if c["done"])
+                if state["status"] == "running" and (done == len(state["chunks"]) or final):
+                    state["status"] = "done" if done == len(state["chunks"]) else "incomplete"
+                summary = {
+                    "status": state["status"],
+                    "chunks": len(state["chunks"]),
+                    "chunks_done": done,
+                    "rows_dumped": sum(c["rows_dumped"] for c in chunks),
+                    "rows_loaded": sum(c["rows_loaded"] for c in chunks),
+                }
+                if state.get("error"):
+                    summary["error"] = state["error"]
+                if state["status"] != "done":
+                    summary["chunk_detail"] = [
+                        {"chunk": index, "range": c["range"], "rows_dumped": c["rows_dumped"],
+                         "rows_loaded": c["rows_loaded"], "done": c["done"]}
+                        for index, c in state["chunks"].items() if not c["done"]
+                    ]
+                rows_loaded += summary["rows_loaded"]
+                tables[table_name] = summary
+            return {
+                "strategy": "mydumper",
+                "schema": self.schema,
+                "finished": self._finished is not None,
+                "tables_total": len(tables),
+                "tables_done": sum(1 for t in tables.values() if t["status"] == "done"),
+                "tables_failed": sum(1 for t in tables.values() if t["status"] == "failed"),
+                "rows_loaded": rows_loaded,
+                "rows_per_second": round(rows_loaded / elapsed, 1) if elapsed else 0.0,
+                "elapsed_seconds": round(elapsed, 3),
+                "tables": dict(sorted(tables.items(), key=lambda item: item[1]["status"] == "done")),
+            }
+
+    def _dump_chunk(self, segments, table_name, info, index, chunk):
+        if self._is_failed(table_name):
+            return
+        query, params = chunk_select(table_name, info, chunk)
+        try:
+            with self.connect(True) as conn:
+                if not conn:
+                    raise ConnectionError("could not connect to the source database")
+                cursor = conn.cursor()
+                drained = False
+                try:
+                    cursor.execute(query, params)
+                    while True:
+                        rows = cursor.fetchmany(self.batch_rows)
+                        if not rows:
+                            drained = True
+                            break
+                        with self._lock:
+                            chunk_state = self._tables[table_name]["chunks"][index]
+                            chunk_state["rows_dumped"] += len(rows)
+                            chunk_state["segments_dumped"] += 1
+                        # Blocks while the loaders are behind, which bounds memory
+                        segments.put((table_name, index, rows))
+                        if self._is_failed(table_name):
+                            return
+                finally:
+                    if not drained:
+                        # Unread rows on an unbuffered cursor would break the next borrower of this connection
+                        _drain(cursor, self.batch_rows)
+                    cursor.close()
+        except Exception as e:
+            self._fail(table_name, f"dump of chunk {index} failed: {e}")
+            return
+        with self._lock:
+            chunk_state = self._tables[table_name]["chunks"][index]
+            chunk_state["dump_done"] = True
+            chunk_state["done"] = chunk_state["segments_loaded"] == chunk_state["segments_dumped"]
+
+    def _load_worker(self, segments, layout):
+        with self.connect(False) as conn:
+            cursor = None
+            if conn:
+                try:
+                    cursor = conn.cursor()
+                    # Skip per-row FK checks during the bulk load; the source already enforced them
+                    cursor.execute("SET SESSION foreign_key_checks = 0")
+                except Exception as e:
+                    print(f"mydumper: loader could not prepare its target session: {e}")
+                    cursor = None
+            # A loader without a session keeps draining the queue so dump workers never block forever
+            try:
+                while True:
+                    item = segments.get()
+                    if item is _END_OF_STREAM:
+                        return
+                    table_name, index, rows = item
+                    if self._is_failed(table_name):
+                        continue
+                    if cursor is None:
+                        self._fail(table_name, "could not connect to the target database")
+                        continue
+                    try:
+                        columns = layout[table_name][2]
+                        cursor.executemany(
+                            f"INSERT INTO {quote_identifier(table_name)} "
+                            f"({', '.join(quote_identifier(c) for c in columns)}) "
+                            f"VALUES ({', '.join(['%s'] * len(columns))})",
+                            rows,
+                        )
+                        conn.commit()
+                    except Exception as e:
+                        self._fail(table_name, f"load of chunk {index} failed: {e}")
+                        continue
+                    with self._lock:
+                        chunk_state = self._tables[table_name]["chunks"][index]
+                        chunk_state["rows_loaded"] += len(rows)
+                        chunk_state["segments_loaded"] += 1
+                        chunk_state["done"] = (chunk_state["dump_done"] and
+                                               chunk_state["segments_loaded"] == chunk_state["segments_dumped"])
+            finally:
+                if cursor is not None:
+                    try:
+                        cursor.execute("SET SESSION foreign_key_checks = 1")
+                        cursor.close()
+                    except Exception:
+                        pass
+
+    def _truncate(self, layout):
+        """Empties the target tables on one connection; a table that cannot be truncated is failed."""
+        with self.connect(False) as conn:
+            for table_name in layout:
+                if not conn:
+                    self._fail(table_name, "truncate failed: could not connect to the target database")
+                    continue
+                try:
+                    _execute(conn, f"TRUNCATE TABLE {quote_identifier(table_name)}")
+                except Exception as e:
+                    self._fail(table_name, f"truncate failed: {e}")
+
+    def _fail(self, table_name, error):
+        print(f"mydumper: table {table_name}: {error}")
+        with self._lock:
+            state = self._tables.setdefault(table_name, _table_state("failed"))
+            state["status"] = "failed"
+            state.setdefault("error", error)
+
+    def _is_failed(self, table_name):
+        with self._lock:
+            return self._tables.get(table_name, {}).get("status") == "failed"
+
+    def _on_side(self, use_source, fn, *args):
+        with self.connect(use_source) as conn:
+            if not conn:
+                side = "source" if use_source else "target"
+                raise ConnectionError(f"could not connect to the {side} database")
+            return fn(conn, *args)
+
+
+def _execute(conn, statement):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(statement)
+    finally:
+        cursor.close()
+
+
+def _drain(cursor, batch_rows):
+    try:
+        while cursor.fetchmany(batch_rows):
+            pass
+    except Exception:
+        pass  # Nothing left to read, or the connection is gone and the pool will discard it
+
+
+def _table_state(status, error=None):
+    state = {"status": status, "chunks": {}}
+    if error:
+        state["error"] = error
+    return state
+
+
+def _chunk_state(chunk):
+    return {"range": list(chunk) if chunk else None, "rows_dumped": 0, "rows_loaded": 0,
+            "segments_dumped": 0, "segments_loaded": 0, "dump_done": False, "done": False}
@@ -0,0 +1,432 @@
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from schema_compare import fetch_schema_snapshot, index_ddl
+from table_validation import quote_identifier
+
+# performance_schema timers count picoseconds
+PICOSECONDS = 1e12
+
+STATUS_COUNTERS = (
+    "Innodb_buffer_pool_read_requests", "Innodb_buffer_pool_reads", "Innodb_buffer_pool_wait_free",
+    "Innodb_buffer_pool_pages_total", "Innodb_buffer_pool_pages_free", "Innodb_buffer_pool_pages_dirty",
+    "Innodb_data_reads", "Innodb_data_writes", "Innodb_row_lock_waits", "Innodb_row_lock_time",
+    "Created_tmp_tables", "Created_tmp_disk_tables", "Select_full_join", "Sort_merge_passes",
+    "Questions", "Uptime",
+)
+# Point-in-time values; everything else in STATUS_COUNTERS only grows and is diffed when sampling
+STATUS_GAUGES = {"Innodb_buffer_pool_pages_total", "Innodb_buffer_pool_pages_free", "Innodb_buffer_pool_pages_dirty"}
+
+DIGEST_COUNTERS = ("count", "total_seconds", "rows_examined", "rows_sent", "no_index_used", "no_good_index_used",
+                   "tmp_disk_tables", "sort_merge_passes")
+
+SEVERITY_ORDER = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(?:`[^`]+`\.)?`([^`]+)`", re.IGNORECASE)
+
+MAX_STATEMENT_CHARS = 300
+
+
+def normalize_digest_text(text):
+    """Digest hashes differ between MySQL versions; the normalized text matches statements across them."""
+    return " ".join((text or "").split()).lower()
+
+
+def referenced_tables(digest_text):
+    return sorted(set(TABLE_REFERENCE.findall(digest_text or "")))
+
+
+def _fetch(conn, query, params=()):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def fetch_server_settings(conn):
+    row = _fetch(conn, "SELECT @@version, @@performance_schema, @@innodb_buffer_pool_size, "
+                       "@@innodb_io_capacity, @@log_output")[0]
+    return {"version": row[0], "performance_schema": bool(int(row[1] or 0)),
+            "innodb_buffer_pool_size": int(row[2] or 0), "innodb_io_capacity": int(row[3] or 0),
+            "log_output": row[4] or ""}
+
+
+def fetch_status(conn):
+    placeholders = ", ".join(["%s"] * len(STATUS_COUNTERS))
+    rows = _fetch(conn, f"SHOW GLOBAL STATUS WHERE Variable_name IN ({placeholders})", STATUS_COUNTERS)
+    return {name: int(value or 0) for name, value in rows}
+
+
+def fetch_digests(conn, schema, limit=200):
+    """A schema's statements from performance_schema, the `limit` with the most total latency (all for None)."""
+    digests = {}
+    query = """
+        SELECT digest, digest_text, count_star, sum_timer_wait, max_timer_wait, sum_rows_examined, sum_rows_sent,
+               sum_no_index_used, sum_no_good_index_used, sum_created_tmp_disk_tables, sum_sort_merge_passes
+        FROM performance_schema.events_statements_summary_by_digest
+        WHERE schema_name = %s AND digest_text IS NOT NULL
+        ORDER BY sum_timer_wait DESC
+    """
+    params = (schema,)
+    if limit is not None:
+        query += " LIMIT %s"
+        params += (limit,)
+    for row in _fetch(conn, query, params):
+        digests[row[0]] = {
+            "text": row[1],
+            "count": int(row[2] or 0),
+            "total_seconds": int(row[3] or 0) / PICOSECONDS,
+            "max_seconds": int(row[4] or 0) / PICOSECONDS,
+            "rows_examined": int(row[5] or 0),
+            "rows_sent": int(row[6] or 0),
+            "no_index_used": int(row[7] or 0),
+            "no_good_index_used": int(row[8] or 0),
+            "tmp_disk_tables": int(row[9] or 0),
+            "sort_merge_passes": int(row[10] or 0),
+        }
+    return digests
+
+
+def fetch_slow_log(conn, schema, limit=5):
+    """Slowest statements from mysql.slow_log; only available when log_output includes TABLE."""
+    return [
+        {"seconds": round(float(row[0].total_seconds() if hasattr(row[0], "total_seconds") else row[0]), 3),
+         "rows_examined": int(row[1] or 0), "statement": str(row[2])[:MAX_STATEMENT_CHARS], "at": row[3]}
+        for row in _fetch(conn, """
+            SELECT query_time, rows_examined, sql_text, start_time
+            FROM mysql.slow_log
+            WHERE db = %s
+            ORDER BY query_time DESC
+            LIMIT %s
+        """, (schema, limit))
+    ]
+
+
+def fetch_schema_bytes(conn, schema):
+    row = _fetch(conn, """
+        SELECT COALESCE(SUM(data_length + index_length), 0)
+        FROM information_schema.tables WHERE table_schema = %s
+    """, (schema,))[0]
+    return int(row[0] or 0)
+
+
+def diff_counters(after, before, counters, lifetime=()):
+    """
+    Counter increase between two snapshots; entries with no activity in between
+    are dropped. An entry missing from `before` is new, so all of its counts fall
+    in between; `before` must therefore be a complete snapshot. `lifetime` fields,
+    such as a maximum, cannot be windowed and are dropped from entries seen before.
+    """
+    delta = {}
+    for key, values in after.items():
+        previous = before.get(key)
+        if previous is None:
+            delta[key] = dict(values)
+            continue
+        changed = {name: value for name, value in values.items() if name not in lifetime}
+        for counter in counters:
+            changed[counter] = values[counter] - previous[counter]
+        if changed["count"] > 0:
+            delta[key] = changed
+    return delta
+
+
+class PerformanceAnalyzer:
+    """
+    Ranks performance problems on the target, using the source as the baseline.
+
+    Each side is read with a few queries: statement digests from
+    performance_schema, InnoDB buffer pool and I/O counters, server settings,
+    index definitions, and the slow log when it is written to a table. With
+    `sample_seconds`, counters are read twice and only the activity in between
+    is analyzed. Otherwise the figures cover everything since server startup,
+    which on a fresh target includes the migration load.
+
+    Statements are matched across sides by normalized digest text. Findings are:
+
+    - regressed statements, slower on the target by at least `regression_ratio`;
+    - indexes that exist on the source but not on the target;
+    - statements scanning without an index;
+    - a low buffer pool hit rate or free-page waits;
+    - on-disk temporary tables and row lock waits.
+
+    Each finding carries an estimated cost in seconds of statement time where
+    one can be estimated. The findings are ranked by severity, then cost.
+    """
+
+    def __init__(self, connect, schema, sample_seconds=0.0, max_digests=200, max_findings=20,
+                 regression_ratio=1.5, min_executions=10, hit_rate_warning=0.99, hit_rate_critical=0.95):
+        self.connect = connect
+        self.schema = schema
+        self.sample_seconds = max(0.0, sample_seconds or 0.0)
+        self.max_digests = max_digests
+        self.max_findings = max_findings
+        self.regression_ratio = regression_ratio
+        self.min_executions = max(1, min_executions)
+        self.hit_rate_warning = hit_rate_warning
+        self.hit_rate_critical = hit_rate_critical
+
+    def analyze(self, compare_source=True):
+        started = time.monotonic()
+        sides = [False, True] if compare_source else [False]
+        with ThreadPoolExecutor(len(sides), thread_name_prefix="perf-collect") as pool:
+            collected = dict(zip(sides, pool.map(self._collect, sides)))
+        target, source = collected[False], collected.get(True)
+
+        findings = []
+        findings += self._instrumentation_findings(target, source)
+        regressions, compared = self._regressions(target, source) if source else ([], 0)
+        findings += regressions
+        findings += self._index_findings(target, source)
+        findings += self._buffer_pool_findings(target, source)
+        findings += self._server_findings(target)
+        findings.sort(key=lambda f: (SEVERITY_ORDER[f["severity"]], -(f.get("impact_seconds") or 0)))
+        for rank, finding in enumerate(findings, 1):
+            finding["rank"] = rank
+
+        by_severity = {}
+        for finding in findings:
+            by_severity[finding["severity"]] = by_severity.get(finding["severity"], 0) + 1
+        return {
+            "schema": self.schema,
+            "window": f"last {self.sample_seconds}s" if self.sample_seconds else "since server startup",
+            "findings_total": len(findings),
+            "by_severity": by_severity,
+            "findings": findings[:self.max_findings],
+            "summary": {
+                "target": self._side_summary(target),
+                "source": self._side_summary(source) if source else None,
+                "statements_compared": compared,
+            },
+            "slow_queries": target["slow_queries"] or self._slowest_digests(target),
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+        }
+
+    def analyze_json(self, compare_source=True):
+        return json.dumps(self.analyze(compare_source), separators=(",", ":"), default=str)
+
+    # --- Collection ---
+
+    def _collect(self, use_source):
+        with self.connect(use_source) as conn:
+            if not conn:
+                side = "source" if use_source else "target"
+                raise ConnectionError(f"could not connect to the {side} database")
+            settings = fetch_server_settings(conn)
+            # A sampled run reads every digest, so one outside the top N at the first read is not taken as new
+            limit = None if self.sample_seconds else self.max_digests
+            digests = fetch_digests(conn, self.schema, limit) if settings["performance_schema"] else {}
+            status = fetch_status(conn)
+            if self.sample_seconds:
+                time.sleep(self.sample_seconds)
+                later_status = fetch_status(conn)
+                status = {name: value if name in STATUS_GAUGES else value - status.get(name, 0)
+                          for name, value in later_status.items()}
+                if settings["performance_schema"]:
+                    window = diff_counters(fetch_digests(conn, self.schema, None), digests, DIGEST_COUNTERS,
+                                           lifetime=("max_seconds",))
+                    top = sorted(window, key=lambda d: window[d]["total_seconds"], reverse=True)[:self.max_digests]
+                    digests = {d: window[d] for d in top}
+            slow_queries = []
+            if "TABLE" in settings["log_output"].upper():
+                try:
+                    slow_queries = fetch_slow_log(conn, self.schema)
+                except Exception:
+                    pass  # The slow log table needs SELECT on mysql.*, which the migration user may lack
+            return {
+                "settings": settings,
+                "status": status,
+                "digests": digests,
+                "indexes": {name: t["indexes"] for name, t in fetch_schema_snapshot(conn, self.schema).items()},
+                "schema_bytes": fetch_schema_bytes(conn, self.schema),
+                "slow_queries": slow_queries,
+            }
+
+    # --- Findings ---
+
+    def _instrumentation_findings(self, target, source):
+        findings = []
+        for side, data in (("target", target), ("source", source)):
+            if data is not None and not data["settings"]["performance_schema"]:
+                findings.append(_finding(
+                    "instrumentation", "medium" if side == "target" else "low", None,
+                    f"performance_schema is off on the {side}, so statement-level analysis is unavailable there.",
+                    "Set the performance_schema flag to on (Cloud SQL restarts the instance to apply it).",
+                    side=side))
+        return findings
+
+    def _regressions(self, target, source):
+        source_by_text = {normalize_digest_text(d["text"]): d for d in source["digests"].values()}
+        total = sum(d["total_seconds"] for d in target["digests"].values()) or 1.0
+        findings, compared = [], 0
+        for digest in target["digests"].values():
+            baseline = source_by_text.get(normalize_digest_text(digest["text"]))
+            if baseline is None or not baseline["count"] or digest["count"] < self.min_executions:
+                continue
+            compared += 1
+            target_avg = digest["total_seconds"] / digest["count"]
+            source_avg = baseline["total_seconds"] / baseline["count"]
+            if source_avg <= 0 or target_avg / source_avg < self.regression_ratio:
+                continue
+            ratio = target_avg / source_avg
+            impact = (target_avg - source_avg) * digest["count"]
+            share = impact / total
+            severity = "critical" if share >= 0.25 else "high" if ratio >= 3 or share >= 0.1 else "medium"
+            target_examined = digest["rows_examined"] / digest["count"]
+            source_examined = baseline["rows_examined"] / baseline["count"]
+            tables = referenced_tables(digest["text"])
+            if target_examined >= max(2 * source_examined, source_examined + 100):
+                advice = (f"The plan changed: rows examined per call grew from {source_examined:.0f} to "
+                          f"{target_examined:.0f}. Compare EXPLAIN on both sides, and check the indexes and "
+                          f"statistics (ANALYZE TABLE) of {', '.join(tables) or 'the tables involved'}.")
+            else:
+                advice = ("Rows examined per call are unchanged, so the time goes to I/O, locking or CPU; check the "
+                          "buffer pool findings and the instance tier.")
+            findings.append(_finding(
+                "regressed_statement", severity, impact,
+                f"{ratio:.1f}x slower on the target: {source_avg * 1000:.2f} ms -> {target_avg * 1000:.2f} ms "
+                f"per call over {digest['count']} calls.",
+                advice, statement=digest["text"][:MAX_STATEMENT_CHARS], tables=tables))
+        return findings, compared
+
+    def _index_findings(self, target, source):
+        """Source indexes missing on the target, then statements scanning without an index."""
+        findings = []
+        # Statement time per table, to estimate what a missing index costs
+        scan_seconds = {}
+        for digest in target["digests"].values():
+            if digest["no_index_used"] or digest["no_good_index_used"]:
+                for table in referenced_tables(digest["text"]):
+                    scan_seconds[table] = scan_seconds.get(table, 0.0) + digest["total_seconds"]
+        explained = set()
+        if source is not None:
+            for table, indexes in sorted(source["indexes"].items()):
+                target_indexes = target["indexes"].get(table)
+                if target_indexes is None:
+                    continue
+                target_columns = {json.dumps(i["columns"]) for i in target_indexes.values()}
+                for name, index in sorted(indexes.items()):
+                    if name in target_indexes or json.dumps(index["columns"]) in target_columns:
+                        continue
+                    explained.add(table)
+                    findings.append(_finding(
+                        "missing_index", "high", scan_seconds.get(table),
+                        f"Index {name} on {table} exists on the source but not on the target.",
+                        f"ALTER TABLE {quote_identifier(table)} ADD {index_ddl(name, index)};",
+                        tables=[table]))
+
+        total = sum(d["total_seconds"] for d in target["digests"].values()) or 1.0
+        for digest in target["digests"].values():
+            if digest["count"] < self.min_executions or not (digest["no_index_used"] or digest["no_good_index_used"]):
+                continue
+            examined = digest["rows_examined"] / digest["count"]
+            sent = max(digest["rows_sent"] / digest["count"], 1)
+            if examined < 1000 or examined / sent < 100:
+                continue
+            tables = referenced_tables(digest["text"])
+            if explained.intersection(tables):
+                continue
+            share = digest["total_seconds"] / total
+            findings.append(_finding(
+                "full_scan", "high" if share >= 0.1 else "medium", digest["total_seconds"],
+                f"Scans {examined:.0f} rows per call to return {sent:.0f}, over {digest['count']} calls "
+                f"({share:.0%} of statement time).",
+                f"Add an index on the filter and join columns of this statement on {', '.join(tables) or 'its tables'}.",
+                statement=digest["text"][:MAX_STATEMENT_CHARS], tables=tables))
+        return findings
+
+    def _buffer_pool_findings(self, target, source):
+        findings = []
+        status, settings = target["status"], target["settings"]
+        hit_rate = _hit_rate(status)
+        source_hit_rate = _hit_rate(source["status"]) if source else None
+        if hit_rate is not None and hit_rate < self.hit_rate_warning:
+            pool_bytes = settings["innodb_buffer_pool_size"]
+            detail = (f"Buffer pool hit rate is {hit_rate:.2%}"
+                      + (f" (source {source_hit_rate:.2%})" if source_hit_rate is not None else "")
+                      + f"; {status.get('Innodb_buffer_pool_reads', 0)} reads went to disk.")
+            if pool_bytes and target["schema_bytes"] > pool_bytes:
+                advice = (f"The schema ({_gib(target['schema_bytes'])}) is larger than the buffer pool "
+                          f"({_gib(pool_bytes)}); move to a tier with more memory, since Cloud SQL sizes the "
+                          "buffer pool from instance memory.")
+            else:
+                advice = ("The data fits in the buffer pool, so the cache may still be cold after the load; "
+                          "re-run with sample_seconds to measure current traffic before resizing.")
+            findings.append(_finding("buffer_pool_hit_rate",
+                                     "high" if hit_rate < self.hit_rate_critical else "medium", None, detail, advice))
+        if status.get("Innodb_buffer_pool_wait_free", 0) > 0:
+            findings.append(_finding(
+                "buffer_pool_wait_free", "medium", None,
+                f"Queries waited {status['Innodb_buffer_pool_wait_free']} times for a free buffer pool page.",
+                f"Page flushing is falling behind (innodb_io_capacity={settings['innodb_io_capacity']}); "
+                "increase storage size for more IOPS or raise innodb_io_capacity."))
+        return findings
+
+    def _server_findings(self, target):
+        findings = []
+        status = target["status"]
+        tmp, tmp_disk = status.get("Created_tmp_tables", 0), status.get("Created_tmp_disk_tables", 0)
+        if tmp_disk >= 100 and tmp_disk / max(tmp, 1) > 0.25:
+            findings.append(_finding(
+                "tmp_disk_tables", "low", None,
+                f"{tmp_disk} of {tmp} temporary tables went to disk.",
+                "Raise tmp_table_size and max_heap_table_size, or index the GROUP BY / ORDER BY columns."))
+        waits = status.get("Innodb_row_lock_waits", 0)
+        if waits:
+            average_ms = status.get("Innodb_row_lock_time", 0) / waits
+            if average_ms >= 50:
+                findings.append(_finding(
+                    "row_lock_waits", "medium", status.get("Innodb_row_lock_time", 0) / 1000,
+                    f"{waits} row lock waits averaging {average_ms:.0f} ms.",
+                    "Shorten transactions that update hot rows, or index their WHERE columns so fewer rows are locked."))
+        return findings
+
+    # --- Summaries ---
+
+    def _side_summary(self, data):
+        status = data["status"]
+        return {
+            "version": data["settings"]["version"],
+            "performance_schema": data["settings"]["performance_schema"],
+            "buffer_pool_bytes": data["settings"]["innodb_buffer_pool_size"],
+            "schema_bytes": data["schema_bytes"],
+            "buffer_pool_hit_rate": _rounded(_hit_rate(status), 5),
+            "statements": len(data["digests"]),
+            "statement_seconds": round(sum(d["total_seconds"] for d in data["digests"].values()), 3),
+            "questions": status.get("Questions"),
+        }
+
+    def _slowest_digests(self, data, limit=5):
+        slowest = sorted((d for d in data["digests"].values() if d["count"]),
+                         key=lambda d: d["total_seconds"] / d["count"], reverse=True)[:limit]
+        # A sampled digest that ran before the window has no max for the window alone
+        return [{"avg_ms": round(d["total_seconds"] / d["count"] * 1000, 2),
+                 "max_ms": round(d["max_seconds"] * 1000, 2) if "max_seconds" in d else None,
+                 "calls": d["count"], "statement": d["text"][:MAX_STATEMENT_CHARS]} for d in slowest]
+
+
+def _finding(kind, severity, impact_seconds, detail, recommendation, **extra):
+    finding = {"kind": kind, "severity": severity, "detail": detail, "recommendation": recommendation}
+    if impact_seconds is not None:
+        finding["impact_seconds"] = round(impact_seconds, 3)
+    finding.update(extra)
+    return finding
+
+
+def _hit_rate(status):
+    requests = status.get("Innodb_buffer_pool_read_requests", 0)
+    if not requests:
+        return None
+    return 1 - status.get("Innodb_buffer_pool_reads", 0) / requests
+
+
+def _rounded(value, digits):
+    return None if value is None else round(value, digits)
+
+
+def _gib(size):
+    return f"{size / 1024 ** 3:.1f} GiB"
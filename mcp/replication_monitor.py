@@ -0,0 +1,510 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import timedelta
+
+from chunked_checksum import describe_table, row_hash_expression
+from table_validation import HEARTBEAT_TABLE, quote_identifier
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class HeartbeatLagProbe:
+    """
+    Measures source-to-target replication lag with a heartbeat row.
+
+    Every `interval` seconds a sequence number is written to a one-row table on
+    the source, and the newest sequence number present on the target is read
+    back. The lag is how long the oldest heartbeat not yet on the target has
+    been waiting. Once the target has caught up, the lag is the time since the
+    last heartbeat the target has seen was written, which is at most one round
+    trip. Both times come from this process's clock, so clock skew between the
+    servers does not matter.
+
+    The heartbeat table is created on the source on first use. It reaches the
+    target through the replication being measured.
+    """
+
+    def __init__(self, connect, schema, interval=1.0, window_seconds=900.0, table=HEARTBEAT_TABLE,
+                 max_pending=100000):
+        self.connect = connect
+        self.schema = schema
+        self.interval = interval
+        self.window_seconds = window_seconds
+        self.table = table
+        self.max_pending = max_pending
+        self._seq = int(time.time() * 1000)
+        self._sent = OrderedDict()
+        self._samples = deque()
+        self._target_seq = None
+        self._current_lag = None
+        self._created = False
+        self._last_error = None
+        self._polls = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cdc-heartbeat", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll(self):
+        """Writes one heartbeat and reads the target's position."""
+        table = f"{quote_identifier(self.schema)}.{quote_identifier(self.table)}"
+        try:
+            with self.connect(True) as conn:
+                if not conn:
+                    raise ConnectionError("could not connect to the source database")
+                cursor = conn.cursor()
+                if not self._created:
+                    cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                                   "(id TINYINT NOT NULL PRIMARY KEY, seq BIGINT NOT NULL, written_at DATETIME(6) NOT NULL)")
+                    self._created = True
+                self._seq += 1
+                seq = self._seq
+                cursor.execute(f"INSERT INTO {table} (id, seq, written_at) VALUES (1, %s, NOW(6)) "
+                               "ON DUPLICATE KEY UPDATE seq = VALUES(seq), written_at = VALUES(written_at)", (seq,))
+                cursor.close()
+            with self._lock:
+                self._sent[seq] = time.monotonic()
+                while len(self._sent) > self.max_pending:
+                    self._sent.popitem(last=False)
+            with self.connect(False) as conn:
+                if not conn:
+                    raise ConnectionError("could not connect to the target database")
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT seq FROM {table} WHERE id = 1")
+                row = cursor.fetchone()
+                cursor.close()
+        except Exception as e:
+            with self._lock:
+                self._last_error = str(e)
+                self._update_waiting(time.monotonic())
+            return
+        observed = time.monotonic()
+        with self._lock:
+            self._polls += 1
+            self._last_error = None if row else "heartbeat row has not reached the target yet"
+            if row:
+                target_seq = int(row[0])
+                caught_up_at = None
+                while self._sent and next(iter(self._sent)) <= target_seq:
+                    _, caught_up_at = self._sent.popitem(last=False)
+                self._target_seq = target_seq
+                if not self._sent and caught_up_at is not None:
+                    self._current_lag = observed - caught_up_at
+            self._update_waiting(observed)
+            self._samples.append((time.time(), self._current_lag))
+            self._expire(time.time())
+
+    def _update_waiting(self, now):
+        if self._sent:
+            self._current_lag = now - next(iter(self._sent.values()))
+
+    def status(self):
+        with self._lock:
+            self._expire(time.time())
+            lags = sorted(lag for _, lag in self._samples if lag is not None)
+            return {
+                "heartbeat_table": self.table,
+                "interval_seconds": self.interval,
+                "current_lag_seconds": _rounded(self._current_lag),
+                "p50_seconds": _rounded(percentile(lags, 50)),
+                "p95_seconds": _rounded(percentile(lags, 95)),
+                "p99_seconds": _rounded(percentile(lags, 99)),
+                "max_seconds": _rounded(lags[-1] if lags else None),
+                "samples": len(lags),
+                "window_seconds": self.window_seconds,
+                "source_seq": self._seq,
+                "target_seq": self._target_seq,
+                "unreplicated_heartbeats": len(self._sent),
+                "polls": self._polls,
+                "error": self._last_error,
+                "monitoring": self.running,
+            }
+
+    def _expire(self, now):
+        while self._samples and self._samples[0][0] < now - self.window_seconds:
+            self._samples.popleft()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.interval)
+
+
+class DeltaValidator:
+    """
+    Re-checks only the rows changed since a watermark while CDC replication runs.
+
+    Tables are covered when they have a DATETIME/TIMESTAMP column named in
+    `watermark_columns` (e.g. updated_at) that leads an index. Each cycle reads
+    the source rows changed after the table's cursor, in (watermark, primary
+    key) order and at most `batch_rows` at a time. It stops at `horizon_seconds` before
+    the source's clock, so rows are read only after their transactions have
+    committed. The same keys are then fetched from the target, and only keys
+    and CRC32 row hashes travel.
+
+    A row that differs is kept pending and re-checked on both sides each cycle,
+    since replication may simply not have delivered it yet. It counts as
+    mismatched only when it still differs, with no further change on the
+    source, after `settle_seconds`. Cursors are saved in `cursors` (a
+    CheckpointStore), so a restart resumes from them.
+
+    Deletes leave no watermark, so they are only caught for rows that are
+    already pending.
+    """
+
+    def __init__(self, connect, schema, watermark_columns=("updated_at",), interval=30.0, batch_rows=5000,
+                 max_batches=20, horizon_seconds=5.0, lookback_seconds=900.0, settle_seconds=60.0,
+                 max_pending=10000, max_examples=20, cursors=None):
+        self.connect = connect
+        self.schema = schema
+        self.watermark_columns = [c.lower() for c in watermark_columns]
+        self.interval = interval
+        self.batch_rows = max(1, batch_rows)
+        self.max_batches = max(1, max_batches)
+        self.horizon_seconds = horizon_seconds
+        self.lookback_seconds = lookback_seconds
+        self.settle_seconds = settle_seconds
+        self.max_pending = max_pending
+        self.max_examples = max_examples
+        self.cursors = cursors
+        self._tables = None
+        self._uncovered = {}
+        self._state = {}
+        self._pending = {}
+        self._totals = {"verified_rows": 0, "first_check_mismatches": 0, "converged_rows": 0,
+                        "pending_overflow": 0}
+        self._cycles = 0
+        self._last_cycle = None
+        self._last_error = None
+        self._lock = threading.Lock()
+        self._cycle_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cdc-delta", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll(self):
+        """Runs one validation cycle over every covered table."""
+        with self._cycle_lock:
+            started = time.monotonic()
+            try:
+                if self._tables is None:
+                    self._tables = self._on_side(True, self._discover)
+                horizon = self._on_side(True, _source_now) - timedelta(seconds=self.horizon_seconds)
+                for table in sorted(self._tables):
+                    self._check_table(table, horizon)
+                self._recheck_pending()
+            except Exception as e:
+                with self._lock:
+                    self._last_error = str(e)
+                return
+            with self._lock:
+                self._cycles += 1
+                self._last_error = None
+                self._last_cycle = {"seconds": round(time.monotonic() - started, 3), "finished_at": time.time()}
+
+    def status(self):
+        with self._lock:
+            now = time.monotonic()
+            pending = list(self._pending.items())
+            mismatched = [(key, p) for key, p in pending if now - p["first_seen"] >= self.settle_seconds]
+            tables = {}
+            for table, state in sorted(self._state.items()):
+                tables[table] = {
+                    "watermark": state["watermark"],
+                    "cursor": state["cursor"][0],
+                    "caught_up": state["caught_up"],
+                    "verified_rows": state["verified"],
+                }
+            return dict(
+                self._totals,
+                tables_covered=len(tables),
+                tables_not_covered=dict(self._uncovered),
+                pending_rows=len(pending) - len(mismatched),
+                mismatched_rows=len(mismatched),
+                examples=[{"table": key[0], "key": list(key[1]), "issue": p["issue"],
+                           "seconds": round(now - p["first_seen"], 1)}
+                          for key, p in mismatched[:self.max_examples]],
+                caught_up=bool(tables) and all(t["caught_up"] for t in tables.values()),
+                settle_seconds=self.settle_seconds,
+                cycles=self._cycles,
+                last_cycle=self._last_cycle,
+                error=self._last_error,
+                monitoring=self.running,
+                tables=tables,
+            )
+
+    def _discover(self, conn):
+        """Finds tables with an indexed watermark column and their primary key columns."""
+        placeholders = ", ".join(["%s"] * len(self.watermark_columns))
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT t.table_name, c.column_name, s.column_name
+                FROM information_schema.tables t
+                LEFT JOIN information_schema.columns c
+                  ON c.table_schema = t.table_schema AND c.table_name = t.table_name
+                 AND LOWER(c.column_name) IN ({placeholders}) AND c.data_type IN ('datetime', 'timestamp')
+                LEFT JOIN information_schema.statistics s
+                  ON s.table_schema = c.table_schema AND s.table_name = c.table_name
+                 AND s.column_name = c.column_name AND s.seq_in_index = 1
+                WHERE t.table_schema = %s AND t.table_type = 'BASE TABLE' AND t.table_name <> %s
+            """, (*self.watermark_columns, self.schema, HEARTBEAT_TABLE))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        candidates, uncovered = {}, {}
+        for table, column, indexed in rows:
+            if column is None:
+                uncovered.setdefault(table, "no watermark column")
+            elif indexed is None:
+                uncovered.setdefault(table, f"watermark column {column} is not indexed")
+            else:
+                candidates[table] = column
+                uncovered.pop(table, None)
+        tables = {}
+        for table, column in candidates.items():
+            key_columns = _primary_key(conn, self.schema, table)
+            if not key_columns:
+                uncovered[table] = "no primary key"
+                continue
+            _, _, columns = describe_table(conn, self.schema, table)
+            tables[table] = {"watermark": column, "key": key_columns, "hash": row_hash_expression(columns)}
+        with self._lock:
+            self._uncovered = {t: r for t, r in uncovered.items() if t not in tables}
+        return tables
+
+    def _check_table(self, table, horizon):
+        spec = self._tables[table]
+        state = self._state.get(table)
+        if state is None:
+            saved = self.cursors.get_cursor(f"delta:{self.schema}.{table}") if self.cursors else None
+            start = saved or [str(horizon - timedelta(seconds=self.lookback_seconds)), None]
+            state = {"watermark": spec["watermark"], "cursor": _resume_cursor(start, len(spec["key"])),
+                     "caught_up": False, "verified": 0}
+            with self._lock:
+                self._state[table] = state
+        width = len(spec["key"])
+        name, watermark = quote_identifier(table), quote_identifier(spec["watermark"])
+        keys = ", ".join(quote_identifier(c) for c in spec["key"])
+        select = f"SELECT {keys}, {watermark}, {spec['hash']} FROM {name} WHERE "
+        order = f" AND {watermark} <= %s ORDER BY {watermark}, {keys} LIMIT {self.batch_rows}"
+        # The watermark bound alone lets MySQL range-scan the index; the row comparison then skips
+        # the rows at that exact watermark already read, by the full primary key
+        after = f"{watermark} >= %s AND ({watermark}, {keys}) > (" + ", ".join(["%s"] * (width + 1)) + ")"
+
+        for _ in range(self.max_batches):
+            position, last_key = state["cursor"]
+            if last_key is None:
+                query, params = select + f"{watermark} > %s" + order, (position, horizon)
+            else:
+                query, params = select + after + order, (position, position, *last_key, horizon)
+            rows = self._on_side(True, _fetch_rows, query, params)
+            changed = [(tuple(r[:width]), r[width], r[width + 1]) for r in rows]
+            if changed:
+                target = self._on_side(False, _fetch_hashes, spec, table, [r[0] for r in changed])
+                now = time.monotonic()
+                mismatched = 0
+                with self._lock:
+                    for row_key, _, digest in changed:
+                        if int(digest) in target.get(row_key, ()):
+                            continue
+                        mismatched += 1
+                        self._add_pending(table, row_key, now, "missing on target" if row_key not in target
+                                          else "row differs")
+                    self._totals["verified_rows"] += len(changed)
+                    self._totals["first_check_mismatches"] += mismatched
+                    state["verified"] += len(changed)
+                    state["cursor"] = (str(changed[-1][1]), changed[-1][0])
+                if self.cursors is not None:
+                    position, last_key = state["cursor"]
+                    self.cursors.save_cursor(f"delta:{self.schema}.{table}", [position, list(last_key)])
+            if len(changed) < self.batch_rows:
+                state["caught_up"] = True
+                return
+        # More changes than this cycle may read; the rest wait for the next cycle
+        state["caught_up"] = False
+
+    def _add_pending(self, table, row_key, now, issue):
+        if (table, row_key) in self._pending:
+            return
+        if len(self._pending) >= self.max_pending:
+            self._totals["pending_overflow"] += 1
+            return
+        self._pending[(table, row_key)] = {"first_seen": now, "issue": issue, "source": None}
+
+    def _recheck_pending(self):
+        with self._lock:
+            by_table = {}
+            for table, row_key in self._pending:
+                by_table.setdefault(table, []).append(row_key)
+        for table, keys in by_table.items():
+            spec = self._tables.get(table)
+            if spec is None:
+                continue
+            for i in range(0, len(keys), self.batch_rows):
+                batch = keys[i:i + self.batch_rows]
+                source = self._on_side(True, _fetch_hashes, spec, table, batch)
+                target = self._on_side(False, _fetch_hashes, spec, table, batch)
+                with self._lock:
+                    for row_key in batch:
+                        source_hashes, target_hashes = source.get(row_key, []), target.get(row_key, [])
+                        pending = self._pending.get((table, row_key))
+                        if pending is None:
+                            continue
+                        if sorted(source_hashes) == sorted(target_hashes):
+                            del self._pending[(table, row_key)]
+                            self._totals["converged_rows"] += 1
+                            continue
+                        pending["issue"] = ("missing on target" if not target_hashes else
+                                            "deleted on source" if not source_hashes else "row differs")
+                        # A row still being written on the source is in flight, not stuck; restart its clock
+                        if pending.get("source") is not None and pending["source"] != sorted(source_hashes):
+                            pending["first_seen"] = time.monotonic()
+                        pending["source"] = sorted(source_hashes)
+
+    def _on_side(self, use_source, fn, *args):
+        with self.connect(use_source) as conn:
+            if not conn:
+                side = "source" if use_source else "target"
+                raise ConnectionError(f"could not connect to the {side} database")
+            return fn(conn, *args)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.interval)
+
+
+def cutover_readiness(lag, delta, dms=None, max_lag_seconds=5.0, min_samples=10):
+    """
+    Combines heartbeat lag, delta validation and (optionally) DMS job status
+    into (ready, blockers), where blockers explain every unmet condition.
+    """
+    blockers = []
+    if dms is not None:
+        if dms.get("state") in ("FAILED", "STOPPED", "DELETED"):
+            blockers.append(f"DMS job is {dms.get('state')}")
+        elif dms.get("phase") != "CDC":
+            blockers.append(f"DMS job is in phase {dms.get('phase') or dms.get('state')}, not CDC")
+    if lag["samples"] < min_samples:
+        blockers.append(f"only {lag['samples']} heartbeat lag samples so far (need {min_samples})")
+    if lag["error"]:
+        blockers.append(f"heartbeat: {lag['error']}")
+    if lag["current_lag_seconds"] is None or lag["current_lag_seconds"] > max_lag_seconds:
+        blockers.append(f"current lag {lag['current_lag_seconds']}s exceeds {max_lag_seconds}s")
+    elif lag["p95_seconds"] is not None and lag["p95_seconds"] > max_lag_seconds:
+        blockers.append(f"p95 lag {lag['p95_seconds']}s exceeds {max_lag_seconds}s")
+    if delta["error"]:
+        blockers.append(f"delta validation: {delta['error']}")
+    if delta["cycles"] == 0:
+        blockers.append("delta validation has not completed a cycle")
+    elif not delta["caught_up"]:
+        blockers.append("delta validation has a backlog of changed rows")
+    if delta["mismatched_rows"]:
+        blockers.append(f"{delta['mismatched_rows']} changed rows still differ after {delta['settle_seconds']}s")
+    if delta["pending_overflow"]:
+        blockers.append(f"{delta['pending_overflow']} differing rows were not tracked (pending limit reached)")
+    return not blockers, blockers
+
+
+def _rounded(value):
+    return None if value is None else round(value, 3)
+
+
+def _source_now(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT NOW(6)")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def _fetch_rows(conn, query, params):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _primary_key(conn, schema, table):
+    """Returns the table's primary key columns in key order, or [] when it has none."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT column_name FROM information_schema.key_column_usage
+            WHERE table_schema = %s AND table_name = %s AND constraint_name = 'PRIMARY'
+            ORDER BY ordinal_position
+        """, (schema, table))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _resume_cursor(saved, width):
+    """Turns a saved [position, key values] cursor into (position, key tuple)."""
+    position, last_key = saved
+    if last_key is not None and not isinstance(last_key, (list, tuple)):
+        last_key = [last_key]
+    if last_key is not None and len(last_key) != width:
+        # Saved before the key changed shape; re-reading the rows at this watermark is harmless
+        last_key = None
+    return position, None if last_key is None else tuple(last_key)
+
+
+def _fetch_hashes(conn, spec, table, keys):
+    """Returns {primary key tuple: [row hashes]} for the given primary key tuples."""
+    columns = [quote_identifier(c) for c in spec["key"]]
+    if len(columns) == 1:
+        match = f"{columns[0]} IN (" + ", ".join(["%s"] * len(keys)) + ")"
+    else:
+        row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        match = "(" + ", ".join(columns) + ") IN (" + ", ".join([row] * len(keys)) + ")"
+    query = f"SELECT {', '.join(columns)}, {spec['hash']} FROM {quote_identifier(table)} WHERE {match}"
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, tuple(value for key in keys for value in key))
+        rows = {}
+        width = len(columns)
+        for row in cursor.fetchall():
+            rows.setdefault(tuple(row[:width]), []).append(int(row[width]))
+        return rows
+    finally:
+        cursor.close()
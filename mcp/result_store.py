@@ -0,0 +1,126 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+DIGEST_TOP_N = (10, 5, 2, 0)
+
+
+class ResultStore:
+    """
+    Server-side store for tool outputs that are too large to hand to an LLM.
+
+    `compact(tool_name, output)` returns small outputs unchanged. A larger
+    output is stored under a handle derived from its content (so repeated
+    identical results share one entry) and replaced by a digest of at most
+    `max_chars` characters that keeps scalar fields and the first items of every
+    list, with counts. `fetch(handle, page)` returns the full output a page at a
+    time. Entries expire after `ttl` seconds and the least recently used ones are
+    evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_chars=4000, page_items=50, max_entries=256, ttl=3600.0):
+        self.max_chars = max(200, max_chars)
+        self.page_items = max(1, page_items)
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compact(self, tool_name, output):
+        if not isinstance(output, str) or len(output) <= self.max_chars:
+            return output
+        handle = hashlib.sha1(f"{tool_name}\0{output}".encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            self._entries[handle] = (time.monotonic() + self.ttl, tool_name, output)
+            self._entries.move_to_end(handle)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return json.dumps(self._digest(handle, tool_name, output), separators=(",", ":"), default=str)
+
+    def fetch(self, handle, page=1, key=None):
+        """
+        Returns one page of a stored output. For JSON results, `key` names a list
+        field (e.g. "results" or "ddl") to page through `page_items` items at a
+        time; otherwise the raw text is paged in `max_chars` slices.
+        """
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[handle]
+                entry = None
+            if entry is None:
+                raise KeyError(f"result handle '{handle}' is unknown or has expired")
+            self._entries.move_to_end(handle)
+        _, tool_name, output = entry
+        page = max(1, page)
+        if key is not None:
+            data = _parse(output)
+            items = data.get(key) if isinstance(data, dict) else None
+            if not isinstance(items, list):
+                raise KeyError(f"result '{handle}' has no list field '{key}'")
+            pages = max(1, -(-len(items) // self.page_items))
+            start = (page - 1) * self.page_items
+            body = {"handle": handle, "tool": tool_name, "key": key, "page": page, "pages": pages,
+                    "total_items": len(items), "items": items[start:start + self.page_items]}
+            return json.dumps(body, separators=(",", ":"), default=str)
+        pages = max(1, -(-len(output) // self.max_chars))
+        start = (page - 1) * self.max_chars
+        body = {"handle": handle, "tool": tool_name, "page": page, "pages": pages,
+                "text": output[start:start + self.max_chars]}
+        return json.dumps(body, separators=(",", ":"))
+
+    def _digest(self, handle, tool_name, output):
+        envelope = {
+            "handle": handle,
+            "tool": tool_name,
+            "truncated": True,
+            "full_chars": len(output),
+            "hint": f"Call fetch_result with handle '{handle}' (and a list 'key' for JSON results) for details.",
+        }
+        data = _parse(output)
+        if data is None:
+            envelope["text_pages"] = -(-len(output) // self.max_chars)
+            envelope["head"] = output[:self.max_chars // 2]
+            return envelope
+        budget = self.max_chars - len(json.dumps(envelope, default=str)) - 20
+        # Show fewer items per list until the digest fits
+        for top_n in DIGEST_TOP_N:
+            digest = _summarize(data, top_n)
+            if len(json.dumps(digest, separators=(",", ":"), default=str)) <= budget:
+                envelope["digest"] = digest
+                return envelope
+        envelope["head"] = output[:budget]
+        return envelope
+
+
+def _parse(output):
+    try:
+        return json.loads(output)
+    except ValueError:
+        return None
+
+
+def _summarize(value, top_n, depth=0):
+    """Keeps scalars, replaces each large list or mapping by its size plus its first `top_n` items."""
+    if isinstance(value, dict):
+        # Per-table mappings can be as large as any list
+        if depth > 3 or (depth > 0 and len(value) > max(top_n, 20)):
+            first = list(value.items())[:top_n] if depth <= 3 else []
+            return {"keys": len(value), "first": {k: _summarize(v, top_n, depth + 1) for k, v in first}}
+        return {k: _summarize(v, top_n, depth + 1) for k, v in value.items()}
+    if isinstance(value, list):
+        if len(value) <= top_n and depth > 0 and all(not isinstance(v, (dict, list)) for v in value):
+            return value
+        summary = {"count": len(value)}
+        # Validation-style rows: surface the mismatches rather than whatever happens to come first
+        if value and all(isinstance(v, dict) and "match" in v for v in value):
+            mismatched = [v for v in value if not v["match"]]
+            summary["mismatched"] = len(mismatched)
+            value = mismatched or value
+        summary["first"] = [_summarize(v, top_n, depth + 1) for v in value[:top_n]]
+        return summary
+    if isinstance(value, str) and len(value) > 200:
+        return value[:200] + "..."
+    return value
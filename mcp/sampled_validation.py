@@ -0,0 +1,294 @@
+import json
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import NormalDist
+
+from checkpoint_store import fetch_table_fingerprints
+from chunked_checksum import CHUNKABLE_KEY_TYPES, describe_table, row_hash_expression
+from table_validation import INTERNAL_TABLES, query_table_property, quote_identifier
+
+SAMPLING_METHODS = ("random", "stratified")
+
+# Sparse keys need more candidates per row found; past this many rounds the sample stays short
+MAX_SAMPLING_ROUNDS = 6
+MAX_CANDIDATE_FACTOR = 20
+
+
+def required_sample_size(mismatch_rate, confidence=0.95):
+    """Rows to sample so that a table with `mismatch_rate` bad rows shows at least one with `confidence`."""
+    return max(1, math.ceil(math.log(1 - confidence) / math.log(1 - mismatch_rate)))
+
+
+def mismatch_rate_upper_bound(mismatched, sampled, confidence=0.95):
+    """
+    One-sided upper bound on the table's mismatch rate. With no mismatches this
+    is the exact binomial bound 1 - (1 - confidence)^(1/n) (about 3/n at 95%);
+    otherwise the Wilson score bound.
+    """
+    if sampled == 0:
+        return 1.0
+    if mismatched == 0:
+        return 1 - (1 - confidence) ** (1 / sampled)
+    z = NormalDist().inv_cdf(confidence)
+    p = mismatched / sampled
+    centre = p + z * z / (2 * sampled)
+    margin = z * math.sqrt(p * (1 - p) / sampled + z * z / (4 * sampled * sampled))
+    return min(1.0, (centre + margin) / (1 + z * z / sampled))
+
+
+class SampledValidator:
+    """
+    Statistical go/no-go validation for tables too large to count or checksum
+    in full.
+
+    First, the TABLE_ROWS estimates of both sides are compared for all tables
+    in one information_schema query per side. Tables whose estimates differ by
+    more than `estimate_tolerance` are flagged; with `exact_checks` they also
+    get an exact COUNT(*).
+
+    Then every table with an integer leading primary key is sampled. Candidate
+    keys are drawn uniformly from the key range ("random") or evenly from
+    `strata` equal key ranges ("stratified"). The same candidates are fetched
+    from both sides in batched `IN (...)` queries that return only the key and
+    a CRC32 row hash. A candidate that exists on either side counts as a
+    sampled row, so extra target rows are caught as well as missing ones.
+    Drawing continues until `sample_rows` rows are found.
+
+    Each table reports the mismatches found and an upper bound, at
+    `confidence`, on the fraction of rows that differ.
+    """
+
+    def __init__(self, connect, schema, sample_rows=3000, method="random", strata=20, batch_rows=500,
+                 confidence=0.95, estimate_tolerance=0.25, exact_checks=True, max_examples=20,
+                 source_concurrency=4, target_concurrency=8, seed=None):
+        if method not in SAMPLING_METHODS:
+            raise ValueError(f"sampling method must be one of {', '.join(SAMPLING_METHODS)}")
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+        self.connect = connect
+        self.schema = schema
+        self.sample_rows = max(1, sample_rows)
+        self.method = method
+        self.strata = max(1, strata)
+        self.batch_rows = max(1, batch_rows)
+        self.confidence = confidence
+        self.estimate_tolerance = estimate_tolerance
+        self.exact_checks = exact_checks
+        self.max_examples = max_examples
+        self.source_concurrency = max(1, source_concurrency)
+        self.target_concurrency = max(1, target_concurrency)
+        self.seed = seed if seed is not None else random.randrange(2 ** 31)
+
+    def run(self, tables=None):
+        """Returns a report dict with failed tables first, then tables that need an exact check."""
+        started = time.monotonic()
+        with ThreadPoolExecutor(self.source_concurrency, thread_name_prefix="sample-src") as source_pool, \
+                ThreadPoolExecutor(self.target_concurrency, thread_name_prefix="sample-tgt") as target_pool, \
+                ThreadPoolExecutor(self.source_concurrency, thread_name_prefix="sample-table") as table_pool:
+            source_listing = source_pool.submit(self._on_side, True, fetch_table_fingerprints, self.schema)
+            target_listing = target_pool.submit(self._on_side, False, fetch_table_fingerprints, self.schema)
+            source_stats, target_stats = source_listing.result(), target_listing.result()
+            names = sorted(source_stats)
+            missing = []
+            if tables:
+                wanted = set(tables)
+                names = [t for t in names if t in wanted]
+                # A misspelled table must show up as a failure, not vanish from an all-passed report
+                missing = [{"table": t, "verdict": "fail", "match": False, "error": "table missing on source"}
+                           for t in sorted(wanted.difference(source_stats))]
+            else:
+                names = [t for t in names if t not in INTERNAL_TABLES]
+            futures = [
+                table_pool.submit(self._validate_table, source_pool, target_pool, table,
+                                  source_stats[table], target_stats.get(table))
+                for table in names
+            ]
+            results = missing + [f.result() for f in futures]
+
+        order = {"fail": 0, "check_exact": 1, "pass": 2}
+        results.sort(key=lambda r: (order[r["verdict"]], r["table"]))
+        counts = {verdict: sum(1 for r in results if r["verdict"] == verdict) for verdict in order}
+        return {
+            "schema": self.schema,
+            "mode": "sampled",
+            "method": self.method,
+            "confidence": self.confidence,
+            "seed": self.seed,
+            "tables": len(results),
+            "passed": counts["pass"],
+            "failed": counts["fail"],
+            "check_exact": counts["check_exact"],
+            "sampled_rows": sum(r.get("sampled_rows", 0) for r in results),
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+            "results": results,
+        }
+
+    def run_json(self, tables=None):
+        return json.dumps(self.run(tables), separators=(",", ":"), default=str)
+
+    def _validate_table(self, source_pool, target_pool, table, source_stats, target_stats):
+        if target_stats is None:
+            return {"table": table, "verdict": "fail", "match": False, "error": "table missing on target"}
+        source_estimate, target_estimate = int(source_stats[1] or 0), int(target_stats[1] or 0)
+        result = {
+            "table": table,
+            "verdict": "pass",
+            "match": True,
+            "source_rows_estimate": source_estimate,
+            "target_rows_estimate": target_estimate,
+        }
+        divergence = abs(source_estimate - target_estimate) / max(source_estimate, target_estimate, 1)
+        if divergence > self.estimate_tolerance:
+            result["verdict"] = "check_exact"
+            result["estimate_divergence"] = round(divergence, 4)
+
+        try:
+            self._sample_table(result, source_pool, target_pool, table, max(source_estimate, target_estimate))
+        except Exception as e:
+            result["verdict"] = "check_exact" if result["verdict"] == "pass" else result["verdict"]
+            result["sample_error"] = str(e)
+
+        if self.exact_checks and result["verdict"] == "check_exact":
+            source_count = source_pool.submit(self._on_side, True, query_table_property, table, "row_count")
+            target_count = target_pool.submit(self._on_side, False, query_table_property, table, "row_count")
+            try:
+                exact = {"source": source_count.result(), "target": target_count.result()}
+                exact["match"] = exact["source"] == exact["target"]
+                result["row_count"] = exact
+                # A matching exact count settles an estimate divergence, unless the sample could not run
+                if not exact["match"]:
+                    result["verdict"] = "fail"
+                elif "sample_error" not in result:
+                    result["verdict"] = "pass"
+            except Exception as e:
+                result["row_count_error"] = str(e)
+        result["match"] = result["verdict"] == "pass"
+        return result
+
+    def _sample_table(self, result, source_pool, target_pool, table, estimated_rows):
+        # Through the source pool like every other source query, so the source sees at most source_concurrency
+        describe = source_pool.submit(self._on_side, True, describe_table, self.schema, table)
+        key_column, key_type, columns = describe.result()
+        if key_column is None or key_type not in CHUNKABLE_KEY_TYPES:
+            raise ValueError(f"sampled mode needs an integer leading primary key on '{table}'")
+        source_bounds = source_pool.submit(self._on_side, True, _key_bounds, table, key_column)
+        target_bounds = target_pool.submit(self._on_side, False, _key_bounds, table, key_column)
+        bounds = [b for b in (source_bounds.result(), target_bounds.result()) if b[0] is not None]
+        result.update(key=key_column, sampled_rows=0, mismatched_rows=0, examples=[])
+        if not bounds:
+            result["exhaustive"] = True
+            result["mismatch_rate_upper_bound"] = 0.0
+            return
+        low, high = int(min(b[0] for b in bounds)), int(max(b[1] for b in bounds))
+        span = high - low + 1
+
+        query = (f"SELECT {quote_identifier(key_column)}, {row_hash_expression(columns)} "
+                 f"FROM {quote_identifier(table)} WHERE {quote_identifier(key_column)} IN ")
+        # Per-table seeds keep a rerun with the same seed on the same keys
+        rng = random.Random(f"{self.seed}:{table}")
+        density = min(1.0, max(estimated_rows, 1) / span)
+        drawn = set()
+        rounds = 0
+        while result["sampled_rows"] < self.sample_rows and len(drawn) < span and rounds < MAX_SAMPLING_ROUNDS:
+            rounds += 1
+            wanted = self.sample_rows - result["sampled_rows"]
+            # Capped so a very sparse key range gives a short sample rather than millions of candidates
+            count = min(span - len(drawn), math.ceil(wanted / density * 1.2), self.sample_rows * MAX_CANDIDATE_FACTOR)
+            candidates = self._draw(rng, low, high, count, drawn)
+            drawn.update(candidates)
+            batches = [candidates[i:i + self.batch_rows] for i in range(0, len(candidates), self.batch_rows)]
+            pairs = [(source_pool.submit(self._on_side, True, _fetch_hashes, query, batch),
+                      target_pool.submit(self._on_side, False, _fetch_hashes, query, batch)) for batch in batches]
+            found = 0
+            for source_future, target_future in pairs:
+                source_rows, target_rows = source_future.result(), target_future.result()
+                for key in source_rows.keys() | target_rows.keys():
+                    source_hashes, target_hashes = source_rows.get(key, []), target_rows.get(key, [])
+                    sampled = max(len(source_hashes), len(target_hashes))
+                    found += sampled
+                    if sorted(source_hashes) != sorted(target_hashes):
+                        result["mismatched_rows"] += sampled
+                        if len(result["examples"]) < self.max_examples:
+                            result["examples"].append({
+                                "key": key,
+                                "issue": "missing on target" if not target_hashes else
+                                         "extra on target" if not source_hashes else "row differs",
+                            })
+            result["sampled_rows"] += found
+            # Re-estimate how many candidates hit a row, so the next round asks for about enough
+            density = max(found / max(len(candidates), 1), 1 / span)
+
+        exhaustive = len(drawn) >= span
+        sampled, mismatched = result["sampled_rows"], result["mismatched_rows"]
+        result["exhaustive"] = exhaustive
+        if exhaustive:
+            result["mismatch_rate_upper_bound"] = round(mismatched / sampled, 6) if sampled else 0.0
+        else:
+            bound = mismatch_rate_upper_bound(mismatched, sampled, self.confidence)
+            result["mismatch_rate_upper_bound"] = round(bound, 6)
+            result["mismatched_rows_upper_bound"] = math.ceil(bound * max(estimated_rows, sampled))
+        if sampled < self.sample_rows and not exhaustive:
+            result["short_sample"] = True
+        if mismatched:
+            result["verdict"] = "fail"
+            result["mismatch_rate"] = round(mismatched / sampled, 6)
+
+    def _draw(self, rng, low, high, count, drawn):
+        """Draws up to `count` distinct keys in [low, high] that were not drawn before."""
+        if count <= 0:
+            return []
+        if self.method == "stratified":
+            strata = min(self.strata, count)
+            width = (high - low + 1) / strata
+            ranges = [(low + math.floor(i * width), low + math.floor((i + 1) * width) - 1) for i in range(strata)]
+            per_stratum = [count // strata + (1 if i < count % strata else 0) for i in range(strata)]
+        else:
+            ranges, per_stratum = [(low, high)], [count]
+        keys = []
+        for (start, end), wanted in zip(ranges, per_stratum):
+            available = end - start + 1
+            picked = set()
+            # Rejection sampling while the range is sparse in drawn keys; enumerate once it is nearly used up
+            if available - sum(1 for k in drawn if start <= k <= end) <= wanted * 2:
+                pool = [k for k in range(start, end + 1) if k not in drawn]
+                picked.update(rng.sample(pool, min(wanted, len(pool))))
+            else:
+                while len(picked) < wanted:
+                    key = rng.randint(start, end)
+                    if key not in drawn:
+                        picked.add(key)
+            keys.extend(sorted(picked))
+        return keys
+
+    def _on_side(self, use_source, fn, *args):
+        with self.connect(use_source) as conn:
+            if not conn:
+                side = "source" if use_source else "target"
+                raise ConnectionError(f"could not connect to the {side} database")
+            return fn(conn, *args)
+
+
+def _key_bounds(conn, table, key_column):
+    key = quote_identifier(key_column)
+    cursor = conn.cursor()
+    try:
+        # MIN/MAX on the primary key are index lookups, not scans
+        cursor.execute(f"SELECT MIN({key}), MAX({key}) FROM {quote_identifier(table)}")
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def _fetch_hashes(conn, query, keys):
+    """Returns {key: [row hashes]} for the keys present; composite keys can return several rows per key."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query + "(" + ", ".join(["%s"] * len(keys)) + ")", tuple(keys))
+        rows = {}
+        for key, digest in cursor.fetchall():
+            rows.setdefault(int(key), []).append(int(digest))
+        return rows
+    finally:
+        cursor.close()
@@ -0,0 +1,351 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from table_validation import INTERNAL_TABLES, quote_identifier
+
+# Kept in sync with the SELECT lists below
+_COLUMN_FIELDS = ("type", "nullable", "default", "extra", "collation", "generation")
+
+
+def _fetch(conn, query, params):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def probe_schema_version(conn, schema):
+    """
+    Cheap summary of a schema's DDL state, used to decide whether a cached
+    snapshot can be reused. Table DML does not change it. Column and index
+    definitions are folded into checksums because an in-place ALTER (ADD INDEX,
+    MODIFY to another type or charset) leaves create_time unchanged.
+    """
+    rows = _fetch(conn, """
+        SELECT COUNT(*), MAX(create_time),
+               SUM(CRC32(CONCAT_WS('#', table_name, IFNULL(create_time, ''), IFNULL(engine, ''),
+                                   IFNULL(table_collation, '')))),
+               (SELECT COUNT(*) FROM information_schema.columns WHERE table_schema = %s),
+               (SELECT SUM(CRC32(CONCAT_WS('#', table_name, column_name, ordinal_position, column_type,
+                                           is_nullable, IFNULL(collation_name, ''), IFNULL(column_default, ''),
+                                           extra)))
+                FROM information_schema.columns WHERE table_schema = %s),
+               (SELECT SUM(CRC32(CONCAT_WS('#', table_name, index_name, seq_in_index, non_unique,
+                                           IFNULL(column_name, ''), IFNULL(sub_part, ''), index_type)))
+                FROM information_schema.statistics WHERE table_schema = %s),
+               (SELECT SUM(CRC32(CONCAT_WS('#', table_name, constraint_name, column_name,
+                                           referenced_table_name, referenced_column_name)))
+                FROM information_schema.key_column_usage
+                WHERE table_schema = %s AND referenced_table_name IS NOT NULL)
+        FROM information_schema.tables
+        WHERE table_schema = %s AND table_type = 'BASE TABLE'
+    """, (schema, schema, schema, schema, schema))
+    return json.dumps(list(rows[0]) if rows else [], default=str)
+
+
+def fetch_schema_snapshot(conn, schema):
+    """
+    Reads every base table's definition with four bulk information_schema queries
+    and returns {table: definition}. Definitions are plain dicts, ordered so that
+    equal schemas serialize identically.
+    """
+    tables = {}
+    for name, engine, collation in _fetch(conn, """
+        SELECT table_name, engine, table_collation
+        FROM information_schema.tables
+        WHERE table_schema = %s AND table_type = 'BASE TABLE'
+    """, (schema,)):
+        tables[name] = {"options": {"engine": engine, "collation": collation},
+                        "columns": {}, "indexes": {}, "foreign_keys": {}}
+
+    for row in _fetch(conn, """
+        SELECT table_name, column_name, column_type, is_nullable, column_default, extra,
+               collation_name, generation_expression
+        FROM information_schema.columns
+        WHERE table_schema = %s
+        ORDER BY table_name, ordinal_position
+    """, (schema,)):
+        table = tables.get(row[0])
+        if table is not None:
+            table["columns"][row[1]] = dict(zip(_COLUMN_FIELDS, (
+                row[2], row[3] == "YES", row[4], (row[5] or "").replace("DEFAULT_GENERATED", "").strip(),
+                row[6], row[7] or None)))
+
+    for name, index_name, non_unique, column, sub_part, index_type in _fetch(conn, """
+        SELECT table_name, index_name, non_unique, column_name, sub_part, index_type
+        FROM information_schema.statistics
+        WHERE table_schema = %s
+        ORDER BY table_name, index_name, seq_in_index
+    """, (schema,)):
+        table = tables.get(name)
+        if table is None:
+            continue
+        index = table["indexes"].setdefault(
+            index_name, {"unique": not int(non_unique), "type": index_type, "columns": []})
+        # Functional indexes (MySQL 8) have no column name
+        index["columns"].append([column, sub_part])
+
+    for name, constraint, column, ref_table, ref_column in _fetch(conn, """
+        SELECT table_name, constraint_name, column_name, referenced_table_name, referenced_column_name
+        FROM information_schema.key_column_usage
+        WHERE table_schema = %s AND referenced_table_name IS NOT NULL
+        ORDER BY table_name, constraint_name, ordinal_position
+    """, (schema,)):
+        table = tables.get(name)
+        if table is None:
+            continue
+        fk = table["foreign_keys"].setdefault(constraint, {"columns": [], "references": ref_table,
+                                                           "referenced_columns": []})
+        fk["columns"].append(column)
+        fk["referenced_columns"].append(ref_column)
+    return tables
+
+
+def table_signature(definition):
+    return hashlib.sha1(json.dumps(definition, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class SchemaSnapshot:
+    """A schema's table definitions plus a signature per table."""
+
+    def __init__(self, tables, version):
+        self.tables = tables
+        self.version = version
+        self.signatures = {name: table_signature(definition) for name, definition in tables.items()}
+        self.taken = time.monotonic()
+
+
+class SchemaSnapshotCache:
+    """
+    Snapshots per endpoint, reused while the endpoint's schema version probe is
+    unchanged and the snapshot is younger than `ttl` seconds.
+    """
+
+    def __init__(self, ttl=600.0):
+        self.ttl = ttl
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint, version):
+        with self._lock:
+            snapshot = self._snapshots.get(endpoint)
+        if snapshot is None or snapshot.version != version or time.monotonic() - snapshot.taken > self.ttl:
+            return None
+        return snapshot
+
+    def put(self, endpoint, snapshot):
+        with self._lock:
+            self._snapshots[endpoint] = snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshots.clear()
+
+
+class SchemaComparer:
+    """
+    Compares the source and target schemas.
+
+    Both sides are read concurrently, each with a handful of bulk queries, and
+    every table is reduced to a signature hash. Tables are matched by name and
+    only those whose signatures differ are diffed column by column, so the cost
+    is linear in the number of tables and the report holds only differences,
+    each with the DDL that would bring the target in line with the source.
+    Statements that would drop target objects are emitted commented out.
+    `connect(use_source)` must return a context manager yielding a connection,
+    or None on failure.
+    """
+
+    def __init__(self, connect, schema, cache=None):
+        self.connect = connect
+        self.schema = schema
+        self.cache = cache
+
+    def compare(self, tables=None, refresh=False):
+        started = time.monotonic()
+        with ThreadPoolExecutor(2, thread_name_prefix="schema-snapshot") as pool:
+            source_future = pool.submit(self._snapshot, True, refresh)
+            target_future = pool.submit(self._snapshot, False, refresh)
+            (source, source_cached), (target, target_cached) = source_future.result(), target_future.result()
+
+        names = set(source.tables) | set(target.tables)
+        if tables:
+            names &= set(tables)
+        else:
+            names -= INTERNAL_TABLES
+        report = {
+            "source_tables": len(source.tables),
+            "target_tables": len(target.tables),
+            "matching": 0,
+            "missing_in_target": [],
+            "extra_in_target": [],
+            "differing": [],
+            "ddl": [],
+            "snapshots": {"source": "cached" if source_cached else "fresh",
+                          "target": "cached" if target_cached else "fresh"},
+        }
+        for name in sorted(names):
+            if name not in target.tables:
+                report["missing_in_target"].append(name)
+                report["ddl"].append(create_table_ddl(name, source.tables[name]))
+            elif name not in source.tables:
+                report["extra_in_target"].append(name)
+                report["ddl"].append(f"-- DROP TABLE {quote_identifier(name)};")
+            elif source.signatures[name] == target.signatures[name]:
+                report["matching"] += 1
+            else:
+                diff, ddl = diff_table(name, source.tables[name], target.tables[name])
+                report["differing"].append(diff)
+                report["ddl"].extend(ddl)
+        report["compatible"] = not (report["missing_in_target"] or report["differing"])
+        report["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        return report
+
+    def compare_json(self, tables=None, refresh=False):
+        return json.dumps(self.compare(tables, refresh), separators=(",", ":"), default=str)
+
+    def _snapshot(self, use_source, refresh):
+        endpoint = "source" if use_source else "target"
+        with self.connect(use_source) as conn:
+            if not conn:
+                raise ConnectionError(f"could not connect to the {endpoint} database")
+            version = probe_schema_version(conn, self.schema)
+            if self.cache is not None and not refresh:
+                snapshot = self.cache.get(endpoint, version)
+                if snapshot is not None:
+                    return snapshot, True
+            snapshot = SchemaSnapshot(fetch_schema_snapshot(conn, self.schema), version)
+        if self.cache is not None:
+            self.cache.put(endpoint, snapshot)
+        return snapshot, False
+
+
+def column_ddl(name, column):
+    parts = [quote_identifier(name), column["type"]]
+    if column["collation"]:
+        parts.append(f"COLLATE {column['collation']}")
+    if column["generation"]:
+        kind = "STORED" if "STORED" in column["extra"].upper() else "VIRTUAL"
+        parts.append(f"GENERATED ALWAYS AS ({column['generation']}) {kind}")
+    parts.append("NULL" if column["nullable"] else "NOT NULL")
+    default = column["default"]
+    if default is not None and not column["generation"]:
+        parts.append(f"DEFAULT {_default_literal(default)}")
+    extra = column["extra"]
+    if extra and not column["generation"]:
+        parts.append(extra)
+    return " ".join(parts)
+
+
+def _default_literal(default):
+    text = str(default)
+    upper = text.upper()
+    if upper.startswith(("CURRENT_TIMESTAMP", "NOW(", "(")) or upper == "NULL":
+        return text
+    return "'" + text.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def index_ddl(name, index):
+    columns = ", ".join(
+        (quote_identifier(column) + (f"({sub_part})" if sub_part else "")) if column else "(/* expression */)"
+        for column, sub_part in index["columns"]
+    )
+    if name == "PRIMARY":
+        return f"PRIMARY KEY ({columns})"
+    kind = {"FULLTEXT": "FULLTEXT KEY", "SPATIAL": "SPATIAL KEY"}.get(index["type"])
+    kind = kind or ("UNIQUE KEY" if index["unique"] else "KEY")
+    return f"{kind} {quote_identifier(name)} ({columns})"
+
+
+def foreign_key_ddl(name, fk):
+    columns = ", ".join(quote_identifier(c) for c in fk["columns"])
+    referenced = ", ".join(quote_identifier(c) for c in fk["referenced_columns"])
+    return (f"CONSTRAINT {quote_identifier(name)} FOREIGN KEY ({columns}) "
+            f"REFERENCES {quote_identifier(fk['references'])} ({referenced})")
+
+
+def create_table_ddl(name, table):
+    lines = [column_ddl(column, spec) for column, spec in table["columns"].items()]
+    lines += [index_ddl(index, spec) for index, spec in table["indexes"].items()]
+    lines += [foreign_key_ddl(fk, spec) for fk, spec in table["foreign_keys"].items()]
+    options = table["options"]
+    suffix = ""
+    if options["engine"]:
+        suffix += f" ENGINE={options['engine']}"
+    if options["collation"]:
+        suffix += f" DEFAULT COLLATE={options['collation']}"
+    return f"CREATE TABLE {quote_identifier(name)} (\n  " + ",\n  ".join(lines) + f"\n){suffix};"
+
+
+def _diff_members(source, target):
+    missing = [name for name in source if name not in target]
+    extra = [name for name in target if name not in source]
+    changed = [name for name in source if name in target and source[name] != target[name]]
+    return missing, extra, changed
+
+
+def diff_table(name, source, target):
+    """Returns (difference report, ALTER statements) for a table present on both sides."""
+    diff = {"table": name}
+    # Changed foreign keys are dropped in a statement of their own first; MySQL
+    # rejects dropping and re-adding a constraint of the same name in one ALTER
+    before = []
+    clauses = []
+    dropped = []
+
+    missing, extra, changed = _diff_members(source["columns"], target["columns"])
+    if missing or extra or changed:
+        diff["columns"] = {
+            "missing_in_target": missing,
+            "extra_in_target": extra,
+            "changed": [{"column": c, "source": _changed_fields(source["columns"][c], target["columns"][c]),
+                         "target": _changed_fields(target["columns"][c], source["columns"][c])}
+                        for c in changed],
+        }
+        order = list(source["columns"])
+        for column in missing:
+            position = order.index(column)
+            after = f"AFTER {quote_identifier(order[position - 1])}" if position else "FIRST"
+            clauses.append(f"ADD COLUMN {column_ddl(column, source['columns'][column])} {after}")
+        clauses += [f"MODIFY COLUMN {column_ddl(c, source['columns'][c])}" for c in changed]
+        dropped += [f"DROP COLUMN {quote_identifier(c)}" for c in extra]
+
+    missing, extra, changed = _diff_members(source["indexes"], target["indexes"])
+    if missing or extra or changed:
+        diff["indexes"] = {"missing_in_target": missing, "extra_in_target": extra, "changed": changed}
+        for index in changed:
+            clauses.append("DROP PRIMARY KEY" if index == "PRIMARY" else f"DROP INDEX {quote_identifier(index)}")
+        clauses += [f"ADD {index_ddl(i, source['indexes'][i])}" for i in missing + changed]
+        dropped += ["DROP PRIMARY KEY" if i == "PRIMARY" else f"DROP INDEX {quote_identifier(i)}" for i in extra]
+
+    missing, extra, changed = _diff_members(source["foreign_keys"], target["foreign_keys"])
+    if missing or extra or changed:
+        diff["foreign_keys"] = {"missing_in_target": missing, "extra_in_target": extra, "changed": changed}
+        before += [f"DROP FOREIGN KEY {quote_identifier(fk)}" for fk in changed]
+        clauses += [f"ADD {foreign_key_ddl(fk, source['foreign_keys'][fk])}" for fk in missing + changed]
+        dropped += [f"DROP FOREIGN KEY {quote_identifier(fk)}" for fk in extra]
+
+    if source["options"] != target["options"]:
+        diff["options"] = {"source": source["options"], "target": target["options"]}
+        if source["options"]["engine"] != target["options"]["engine"] and source["options"]["engine"]:
+            clauses.append(f"ENGINE={source['options']['engine']}")
+        if source["options"]["collation"] != target["options"]["collation"] and source["options"]["collation"]:
+            clauses.append(f"DEFAULT COLLATE={source['options']['collation']}")
+
+    ddl = []
+    if before:
+        ddl.append(f"ALTER TABLE {quote_identifier(name)} " + ", ".join(before) + ";")
+    if clauses:
+        ddl.append(f"ALTER TABLE {quote_identifier(name)} " + ", ".join(clauses) + ";")
+    if dropped:
+        ddl.append(f"-- ALTER TABLE {quote_identifier(name)} " + ", ".join(dropped) + ";")
+    return diff, ddl
+
+
+def _changed_fields(column, other):
+    return {field: value for field, value in column.items() if other.get(field) != value}
@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SecretCache:
+    """
+    TTL cache of secret values.
+
+    `fetch(secret_id)` is the blocking lookup, normally one RPC on a shared
+    Secret Manager client. `prefetch` fetches a set of secrets concurrently, so
+    startup costs one round trip instead of one per secret. A background thread
+    refreshes every cached secret at `refresh_interval`, so rotated credentials
+    are picked up without a restart; `on_change(secret_id, value)` is called when
+    a refreshed value differs. If a refresh fails, the last good value is kept.
+    """
+
+    def __init__(self, fetch, ttl=300.0, refresh_interval=None, max_workers=8, on_change=None):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval if refresh_interval is not None else ttl / 2
+        self.max_workers = max_workers
+        self.on_change = on_change
+        self._values = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher = None
+
+    def prefetch(self, secret_ids):
+        """Fetches the secrets concurrently and returns {secret_id: value}; raises if any fetch fails."""
+        secret_ids = list(dict.fromkeys(secret_ids))
+        with ThreadPoolExecutor(max(1, min(self.max_workers, len(secret_ids)))) as executor:
+            values = dict(zip(secret_ids, executor.map(self.fetch, secret_ids)))
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for secret_id, value in values.items():
+                self._values[secret_id] = (expires, value)
+        return values
+
+    def get(self, secret_id):
+        with self._lock:
+            entry = self._values.get(secret_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        try:
+            return self._refresh_one(secret_id)
+        except Exception:
+            if entry is None:
+                raise
+            print(f"Warning: could not refresh secret '{secret_id}'; using the cached value.")
+            return entry[1]
+
+    def refresh(self):
+        """Re-fetches every cached secret concurrently."""
+        with self._lock:
+            secret_ids = list(self._values)
+        if not secret_ids:
+            return
+        with ThreadPoolExecutor(max(1, min(self.max_workers, len(secret_ids)))) as executor:
+            for secret_id, error in zip(secret_ids, executor.map(self._try_refresh, secret_ids)):
+                if error is not None:
+                    print(f"Warning: could not refresh secret '{secret_id}': {error}")
+
+    def start(self):
+        if self._refresher is None and self.refresh_interval > 0:
+            self._refresher = threading.Thread(target=self._refresh_loop, name="secret-refresh", daemon=True)
+            self._refresher.start()
+
+    def close(self):
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=5)
+            self._refresher = None
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+    def _try_refresh(self, secret_id):
+        try:
+            self._refresh_one(secret_id)
+        except Exception as e:
+            return e
+        return None
+
+    def _refresh_one(self, secret_id):
+        value = self.fetch(secret_id)
+        with self._lock:
+            previous = self._values.get(secret_id)
+            self._values[secret_id] = (time.monotonic() + self.ttl, value)
+        if previous is not None and previous[1] != value and self.on_change is not None:
+            self.on_change(secret_id, value)
+        return value
@@ -0,0 +1,105 @@
+import os
+import shutil
+
+
+class ShardStorage:
+    """
+    Where exported shards are written. Writers are streamed: bytes go to the
+    backend as they are produced instead of being staged as a whole file first.
+    """
+
+    def open_writer(self, name):
+        """Returns a binary, writable file-like object for a new shard."""
+        raise NotImplementedError
+
+    def open_reader(self, name):
+        """Returns a binary, readable file-like object for an existing shard."""
+        raise NotImplementedError
+
+    def uri(self, name):
+        """Returns the URI an importer should read the shard from."""
+        raise NotImplementedError
+
+    def delete(self, name):
+        raise NotImplementedError
+
+    def abort(self, name, writer):
+        """Discards a shard whose writer was not completed, so no truncated shard is left behind."""
+        try:
+            writer.close()
+        finally:
+            self.delete(name)
+
+
+class LocalStorage(ShardStorage):
+    """Stores shards under a local directory; stands in for GCS in tests."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _path(self, name):
+        path = os.path.abspath(os.path.join(self.root, name))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"shard name '{name}' escapes the storage root")
+        return path
+
+    def open_writer(self, name):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(path, 'wb')
+
+    def open_reader(self, name):
+        return open(self._path(name), 'rb')
+
+    def uri(self, name):
+        return self._path(name)
+
+    def delete(self, name):
+        path = self._path(name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+class GCSStorage(ShardStorage):
+    """
+    Stores shards in a GCS bucket. Each writer is a resumable upload that sends
+    `chunk_size` parts as the shard is produced, so several shards can upload
+    concurrently without touching local disk.
+    """
+
+    def __init__(self, bucket_name, prefix="", chunk_size=8 * 1024 * 1024, client=None):
+        # Imported lazily so the server only needs google-cloud-storage when GCS is used
+        from google.cloud import storage
+
+        self.client = client or storage.Client()
+        self.bucket = self.client.bucket(bucket_name)
+        self.bucket_name = bucket_name
+        self.prefix = prefix.strip('/')
+        # Resumable upload parts must be multiples of 256 KiB
+        self.chunk_size = max(256 * 1024, chunk_size // (256 * 1024) * (256 * 1024))
+
+    def _blob_name(self, name):
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    def open_writer(self, name):
+        blob = self.bucket.blob(self._blob_name(name), chunk_size=self.chunk_size)
+        return blob.open('wb', ignore_flush=True)
+
+    def open_reader(self, name):
+        return self.bucket.blob(self._blob_name(name)).open('rb')
+
+    def uri(self, name):
+        return f"gs://{self.bucket_name}/{self._blob_name(name)}"
+
+    def abort(self, name, writer):
+        # Closing would finalize the resumable upload as a truncated object; an unfinished
+        # session creates no object and expires on its own
+        self.delete(name)
+
+    def delete(self, name):
+        blob_name = self._blob_name(name)
+        blobs = list(self.client.list_blobs(self.bucket, prefix=blob_name))
+        for blob in blobs:
+            blob.delete()
@@ -0,0 +1,146 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from checkpoint_store import combine_fingerprints, fetch_table_fingerprints
+
+VALIDATION_CHECKS = ("row_count", "checksum")
+
+# Written by the CDC lag probe on the source every second, so it never matches mid-replication
+HEARTBEAT_TABLE = "_migration_heartbeat"
+# Tables the migration tooling itself creates in the migrated schema; left out of every table listing
+INTERNAL_TABLES = frozenset({HEARTBEAT_TABLE})
+
+
+def quote_identifier(name):
+    """Quotes a MySQL identifier so table names with backticks or spaces are safe to interpolate."""
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def query_table_property(conn, table_name, check):
+    """Runs COUNT(*) or CHECKSUM TABLE on one table and returns the scalar result."""
+    cursor = conn.cursor()
+    try:
+        if check == "checksum":
+            cursor.execute(f"CHECKSUM TABLE {quote_identifier(table_name)}")
+            row = cursor.fetchone()
+            if row is None or row[1] is None:
+                # CHECKSUM TABLE reports a NULL checksum instead of failing for missing tables
+                raise LookupError(f"table '{table_name}' does not exist")
+            return row[1]
+        cursor.execute(f"SELECT COUNT(*) FROM {quote_identifier(table_name)}")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+class BulkValidator:
+    """
+    Validates every table of a schema in one call.
+
+    Source and target queries run on separate bounded worker pools, so the
+    legacy primary never sees more than `source_concurrency` validation queries
+    at once regardless of how many run against Cloud SQL. `connect(use_source)`
+    must return a context manager yielding a connection, or None on failure.
+
+    With a `checkpoints` store, tables that previously matched and whose
+    source and target statistics are unchanged are reported from the store
+    instead of being queried again.
+    """
+
+    def __init__(self, connect, schema, source_concurrency=4, target_concurrency=8, checkpoints=None):
+        self.connect = connect
+        self.schema = schema
+        self.checkpoints = checkpoints
+        self.source_concurrency = max(1, source_concurrency)
+        self.target_concurrency = max(1, target_concurrency)
+
+    def run(self, checks=VALIDATION_CHECKS, tables=None):
+        """Returns a report dict with mismatched and failed tables listed first."""
+        started = time.monotonic()
+        checks = [c for c in checks if c in VALIDATION_CHECKS] or list(VALIDATION_CHECKS)
+        with ThreadPoolExecutor(self.source_concurrency, thread_name_prefix="validate-src") as source_pool, \
+                ThreadPoolExecutor(self.target_concurrency, thread_name_prefix="validate-tgt") as target_pool:
+            # information_schema.tables doubles as the table listing and the fingerprint source
+            source_listing = source_pool.submit(self._on_side, True, fetch_table_fingerprints, self.schema)
+            target_listing = target_pool.submit(self._on_side, False, fetch_table_fingerprints, self.schema)
+            source_stats = source_listing.result()
+            target_stats = target_listing.result()
+            pending = []
+            if tables:
+                wanted = set(tables)
+                source_tables = [t for t in sorted(source_stats) if t in wanted]
+                # A misspelled table must show up as a failure, not vanish from an all-matched report
+                pending += [(t, None, "table missing on source") for t in sorted(wanted.difference(source_stats))]
+            else:
+                source_tables = sorted(t for t in source_stats if t not in INTERNAL_TABLES)
+
+            for table in source_tables:
+                if table not in target_stats:
+                    pending.append((table, None, "table missing on target"))
+                    continue
+                fingerprint = combine_fingerprints(source_stats[table], target_stats[table])
+                futures = {}
+                for check in checks:
+                    cached = self.checkpoints.get_table_result(table, check, fingerprint) if self.checkpoints else None
+                    if cached is not None and cached["match"]:
+                        futures[check] = cached
+                        continue
+                    futures[check] = (source_pool.submit(self._on_side, True, query_table_property, table, check),
+                                      target_pool.submit(self._on_side, False, query_table_property, table, check))
+                pending.append((table, fingerprint, futures))
+
+            results = [self._collect(table, fingerprint, futures) for table, fingerprint, futures in pending]
+
+        results.sort(key=lambda r: (r["match"], r["table"]))
+        skipped = sum(1 for r in results if r.get("unchanged"))
+        mismatched = sum(1 for r in results if not r["match"] and "error" not in r)
+        errors = sum(1 for r in results if "error" in r)
+        return {
+            "schema": self.schema,
+            "checks": checks,
+            "tables": len(results),
+            "matched": len(results) - mismatched - errors,
+            "mismatched": mismatched,
+            "errors": errors,
+            "skipped_unchanged": skipped,
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+            "results": results,
+        }
+
+    def run_json(self, checks=VALIDATION_CHECKS, tables=None):
+        return json.dumps(self.run(checks, tables), separators=(",", ":"), default=str)
+
+    def _on_side(self, use_source, fn, *args):
+        with self.connect(use_source) as conn:
+            if not conn:
+                side = "source" if use_source else "target"
+                raise ConnectionError(f"could not connect to the {side} database")
+            return fn(conn, *args)
+
+    def _collect(self, table, fingerprint, futures):
+        if isinstance(futures, str):
+            return {"table": table, "match": False, "error": futures}
+        result = {"table": table, "match": True}
+        unchanged = True
+        for check, outcome in futures.items():
+            if isinstance(outcome, dict):
+                result[check] = outcome
+                continue
+            unchanged = False
+            source_future, target_future = outcome
+            try:
+                source_value = source_future.result()
+                target_value = target_future.result()
+            except Exception as e:
+                result["match"] = False
+                result["error"] = f"{check}: {e}"
+                continue
+            matched = source_value == target_value
+            result[check] = {"source": source_value, "target": target_value, "match": matched}
+            result["match"] = result["match"] and matched
+            if self.checkpoints:
+                self.checkpoints.save_table_result(table, check, fingerprint, result[check], matched)
+        if unchanged:
+            result["unchanged"] = True
+        return result
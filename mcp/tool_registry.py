@@ -0,0 +1,282 @@
+import ast
+import time
+
+_JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+
+class ToolError(Exception):
+    """Raised for unknown tools and for arguments that do not match a tool's schema."""
+
+
+class Tool:
+    """A callable MCP tool with a JSON-schema description of its arguments."""
+
+    def __init__(self, name, func, parameters=None, description="", read_only=False, long_running=False,
+                 cache_ttl=None, invalidates_cache=False):
+        self.name = name
+        self.func = func
+        self.parameters = parameters or {"type": "object", "properties": {}}
+        self.description = description
+        # Read-only tools may run concurrently with each other in a batch
+        self.read_only = read_only
+        self.long_running = long_running
+        # Seconds an output may be served from the result cache; None disables caching
+        self.cache_ttl = cache_ttl
+        # Tools that change data (migrations) flush the cache before and after running
+        self.invalidates_cache = invalidates_cache
+
+    @property
+    def positional(self):
+        """Argument names in declaration order, used to bind positional arguments."""
+        return list(self.parameters.get("properties", {}))
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "description": self.description,
+            "parameters": self.parameters,
+            "read_only": self.read_only,
+            "long_running": self.long_running,
+            "cache_ttl": self.cache_ttl,
+        }
+
+
+class ToolRegistry:
+    """
+    Name-to-tool mapping with argument validation.
+
+    Dispatch is a dict lookup. Arguments are bound positionally in schema
+    order or by name, coerced from strings where the schema asks for a number,
+    boolean or array (LLM callers often quote everything), and checked against
+    the schema before the tool runs.
+    """
+
+    def __init__(self, cache=None, observer=None):
+        self._tools = {}
+        self.cache = cache
+        # observer(tool_name, seconds, failed) is told about every call to a known tool
+        self.observer = observer
+
+    def register(self, name, func, parameters=None, description="", read_only=False, long_running=False,
+                 cache_ttl=None, invalidates_cache=False):
+        if name in self._tools:
+            raise ValueError(f"Tool '{name}' is already registered")
+        if cache_ttl is not None and not read_only:
+            # A cached output would skip the tool's side effects on every hit
+            raise ValueError(f"Tool '{name}' must be read-only to have a cache_ttl")
+        self._tools[name] = Tool(name, func, parameters, description, read_only, long_running,
+                                 cache_ttl, invalidates_cache)
+        return func
+
+    def tool(self, name, **options):
+        """Decorator form of `register`."""
+        def decorator(func):
+            return self.register(name, func, **options)
+        return decorator
+
+    def get(self, name):
+        tool = self._tools.get(name)
+        if tool is None:
+            raise ToolError(f"Tool '{name}' is not recognized.")
+        return tool
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def names(self):
+        return list(self._tools)
+
+    def describe(self):
+        return [tool.describe() for tool in self._tools.values()]
+
+    def call(self, name, config, args=(), kwargs=None, use_cache=True):
+        """Validates the arguments and runs the tool, serving cacheable tools from the cache."""
+        tool = self.get(name)
+        if self.observer is None:
+            return self._call(tool, config, args, kwargs, use_cache)
+        started = time.perf_counter()
+        failed = True
+        try:
+            output = self._call(tool, config, args, kwargs, use_cache)
+            failed = isinstance(output, str) and output.startswith("Error")
+            return output
+        finally:
+            self.observer(name, time.perf_counter() - started, failed)
+
+    def _call(self, tool, config, args, kwargs, use_cache):
+        name = tool.name
+        arguments = bind_arguments(tool, args, kwargs or {})
+        if self.cache is None:
+            return tool.func(config, **arguments)
+        if tool.invalidates_cache:
+            self.cache.invalidate()
+            try:
+                return tool.func(config, **arguments)
+            finally:
+                self.cache.invalidate()
+        if tool.cache_ttl is None:
+            return tool.func(config, **arguments)
+        key = self.cache.key(name, arguments)
+        if use_cache:
+            hit, output = self.cache.get(key)
+            if hit:
+                return output
+        output = tool.func(config, **arguments)
+        # Error strings are not cached, so a transient failure is retried on the next call
+        if not (isinstance(output, str) and output.startswith("Error")):
+            self.cache.put(key, output, tool.cache_ttl)
+        return output
+
+    def call_batch(self, calls, config, executor):
+        """
+        Runs a list of (name, args, kwargs) calls and returns their outputs in order.
+        Consecutive read-only calls run concurrently on `executor`; any other call
+        waits for everything before it and runs alone, so side effects keep their order.
+        """
+        results = [None] * len(calls)
+        pending = []
+
+        def drain():
+            for index, future in pending:
+                results[index] = _output_of(future.result)
+            pending.clear()
+
+        for index, (name, args, kwargs) in enumerate(calls):
+            tool = self._tools.get(name)
+            if tool is not None and tool.read_only:
+                pending.append((index, executor.submit(self.call, name, config, args, kwargs)))
+                continue
+            drain()
+            results[index] = _output_of(lambda: self.call(name, config, args, kwargs))
+        drain()
+        return results
+
+
+def _output_of(thunk):
+    # One failing call must not lose the outputs of the rest of the batch
+    try:
+        return thunk()
+    except Exception as e:
+        return f"Error: {e}"
+
+
+def bind_arguments(tool, args, kwargs):
+    """Maps positional and keyword arguments onto a tool's schema and validates them."""
+    properties = tool.parameters.get("properties", {})
+    names = tool.positional
+    bound = {}
+    for value in args:
+        # Legacy callers pass options as 'key=value' strings, e.g. checksum_table('t', 'mode=chunked')
+        if isinstance(value, str):
+            key, sep, option = value.partition('=')
+            if sep and key in properties and key not in bound and key not in kwargs:
+                bound[key] = option
+                continue
+        remaining = [n for n in names if n not in bound and n not in kwargs]
+        if not remaining:
+            raise ToolError(f"{tool.name}() got too many positional arguments")
+        bound[remaining[0]] = value
+    for key, value in kwargs.items():
+        if key in bound:
+            raise ToolError(f"{tool.name}() got multiple values for argument '{key}'")
+        bound[key] = value
+    return validate_arguments(tool.name, tool.parameters, bound)
+
+
+def validate_arguments(tool_name, schema, arguments):
+    """Checks arguments against a small JSON-schema subset, applying defaults and coercions."""
+    properties = schema.get("properties", {})
+    if schema.get("additionalProperties", False) is False:
+        unknown = [k for k in arguments if k not in properties]
+        if unknown:
+            raise ToolError(f"{tool_name}() got unexpected argument(s): {', '.join(unknown)}")
+    validated = {}
+    for name, spec in properties.items():
+        # An explicit null for an optional argument means "not given"; required ones must be nullable
+        if name not in arguments or (arguments[name] is None and name not in schema.get("required", [])
+                                     and not spec.get("nullable", False)):
+            if name in schema.get("required", []):
+                raise ToolError(f"{tool_name}() missing required argument '{name}'")
+            if "default" in spec:
+                validated[name] = spec["default"]
+            continue
+        validated[name] = _coerce(tool_name, name, spec, arguments[name])
+    return validated
+
+
+def _coerce(tool_name, name, spec, value):
+    expected = spec.get("type")
+    if value is not None and isinstance(value, str) and expected in ("integer", "number", "boolean", "array"):
+        text = value.strip()
+        try:
+            if expected == "integer":
+                value = int(text)
+            elif expected == "number":
+                value = float(text)
+            elif expected == "boolean":
+                if text.lower() not in ("true", "false", "1", "0", "yes", "no"):
+                    raise ValueError(text)
+                value = text.lower() in ("true", "1", "yes")
+            else:
+                value = [item.strip() for item in text.split(';') if item.strip()]
+        except ValueError:
+            raise ToolError(f"{tool_name}() argument '{name}' must be of type {expected}")
+    if isinstance(value, tuple):
+        value = list(value)
+    if value is None and spec.get("nullable", False):
+        return None
+    python_type = _JSON_TYPES.get(expected)
+    # bool is a subclass of int, so it is rejected explicitly for numeric arguments
+    if python_type and (not isinstance(value, python_type) or
+                        (expected in ("integer", "number") and isinstance(value, bool))):
+        raise ToolError(f"{tool_name}() argument '{name}' must be of type {expected}")
+    if "enum" in spec and value not in spec["enum"]:
+        raise ToolError(f"{tool_name}() argument '{name}' must be one of {spec['enum']}")
+    if expected == "array" and "items" in spec:
+        value = [_coerce(tool_name, name, spec["items"], item) for item in value]
+    if expected in ("integer", "number"):
+        if "minimum" in spec and value < spec["minimum"]:
+            raise ToolError(f"{tool_name}() argument '{name}' must be at least {spec['minimum']}")
+        if "maximum" in spec and value > spec["maximum"]:
+            raise ToolError(f"{tool_name}() argument '{name}' must be at most {spec['maximum']}")
+        if "exclusiveMinimum" in spec and value <= spec["exclusiveMinimum"]:
+            raise ToolError(f"{tool_name}() argument '{name}' must be greater than {spec['exclusiveMinimum']}")
+        if "exclusiveMaximum" in spec and value >= spec["exclusiveMaximum"]:
+            raise ToolError(f"{tool_name}() argument '{name}' must be less than {spec['exclusiveMaximum']}")
+    return value
+
+
+def parse_tool_code(tool_code):
+    """
+    Parses a Python-style call such as `checksum_table("a,b", mode="chunked")` into
+    (name, args, kwargs). Arguments must be literals, so quotes and commas inside
+    table names survive intact. Bare names, as in the legacy `get_row_count(users)`
+    or `checksum_table(orders, mode=chunked)`, are taken as strings.
+    """
+    code = tool_code.strip()
+    try:
+        node = ast.parse(code, mode='eval').body
+        # Agents sometimes wrap the call in print(...)
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'print'
+                and len(node.args) == 1 and isinstance(node.args[0], ast.Call)):
+            node = node.args[0]
+        if isinstance(node, ast.Name):
+            return node.id, [], {}
+        if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name):
+            raise ToolError(f"Invalid tool_code format: {tool_code!r}")
+        args = [_argument_value(arg) for arg in node.args]
+        kwargs = {kw.arg: _argument_value(kw.value) for kw in node.keywords if kw.arg}
+        return node.func.id, args, kwargs
+    except (SyntaxError, ValueError) as e:
+        raise ToolError(f"Invalid tool_code format: {e}")
+
+
+def _argument_value(node):
+    return node.id if isinstance(node, ast.Name) else ast.literal_eval(node)
@@ -0,0 +1,83 @@
+import contextlib
+import os
+import sys
+import zlib
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# The MCP modules import each other by bare name, the way mcp_server.py runs them
+for path in (ROOT, os.path.join(ROOT, 'mcp'), os.path.join(ROOT, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from standins import SQLiteStandIn, SyntheticSchema
+
+# The synthetic tables' columns; the SQLite stand-in has no information_schema.columns to read them from
+SYNTHETIC_COLUMNS = ["id", "account_id", "amount", "created_at", "payload"]
+
+
+@pytest.fixture
+def synthetic():
+    return SyntheticSchema(tables=3, rows=2500, widths=(64, 512))
+
+
+@pytest.fixture
+def standin(tmp_path, synthetic):
+    standin = SQLiteStandIn(str(tmp_path / "db"))
+    standin.prepare(synthetic)
+    return standin
+
+
+class BitXor:
+    def __init__(self):
+        self.value = None
+
+    def step(self, value):
+        if value is not None:
+            self.value = (self.value or 0) ^ int(value)
+
+    def finalize(self):
+        return self.value
+
+
+def add_row_hash_functions(raw):
+    """Registers the MySQL functions the row hash and chunk queries use on a sqlite3 connection."""
+    raw.create_function("CRC32", 1, lambda v: None if v is None else zlib.crc32(str(v).encode()))
+    raw.create_function("CONCAT", -1, lambda *v: None if None in v else "".join(str(x) for x in v))
+    raw.create_function("CONCAT_WS", -1, lambda sep, *v: sep.join(str(x) for x in v if x is not None))
+    raw.create_aggregate("BIT_XOR", 1, BitXor)
+
+
+def sqlite_row_hash_expression(columns):
+    """row_hash_expression() for SQLite, where ISNULL is a postfix operator rather than a function."""
+    quoted = [f"`{c}`" for c in columns]
+    null_markers = ", ".join(f"({c} IS NULL)" for c in quoted)
+    return f"CRC32(CONCAT_WS('#', {', '.join(quoted)}, CONCAT({null_markers})))"
+
+
+@pytest.fixture
+def connect(standin):
+    """A `connect(use_source)` callable in the shape the pipelines and validators take."""
+    @contextlib.contextmanager
+    def connect(use_source):
+        conn = standin.connect(use_source)
+        add_row_hash_functions(conn.raw)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    return connect
+
+
+def synthetic_layout(synthetic):
+    """What describe_schema returns for the synthetic tables."""
+    return {name: ("id", "bigint", list(SYNTHETIC_COLUMNS)) for name, _, _ in synthetic.layout()}
+
+
+def count_rows(standin, use_source, table_name):
+    conn = standin.connect(use_source)
+    try:
+        return conn.raw.execute(f"SELECT COUNT(*) FROM `{table_name}`").fetchone()[0]
+    finally:
+        conn.close()
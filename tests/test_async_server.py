@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+
+from async_server import MAX_HEADER_COUNT, AsyncMCPServer
+
+
+def exchange(raw_requests, handle_request=lambda request_data: {"output": request_data}, **kwargs):
+    """Sends raw HTTP requests to a server on a free port and returns everything it wrote back."""
+    server = AsyncMCPServer(handle_request, lambda request_data: request_data.get("tool", ""), **kwargs)
+
+    async def run():
+        listener = await asyncio.start_server(server._serve_connection, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"".join(raw_requests))
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return response.decode("latin-1")
+
+    try:
+        return asyncio.run(run())
+    finally:
+        server.executor.shutdown(wait=False)
+
+
+def post(body, headers=b""):
+    return (b"POST / HTTP/1.1\r\nContent-Length: " + str(len(body)).encode() + b"\r\n" + headers + b"\r\n" + body)
+
+
+def test_answers_keep_alive_requests_in_order():
+    response = exchange([
+        post(b'{"tool": "a"}'),
+        b"GET /healthz HTTP/1.1\r\n\r\n",
+        post(b'{"tool": "b"}', b"Connection: close\r\n"),
+    ])
+
+    assert response.count("HTTP/1.1 200 OK") == 3
+    bodies = [part.split("\r\n\r\n", 1)[1] for part in response.split("HTTP/1.1 ")[1:]]
+    assert [json.loads(bodies[0]), bodies[1], json.loads(bodies[2])] == [
+        {"output": {"tool": "a"}}, "ok", {"output": {"tool": "b"}}]
+
+
+def test_rejects_a_chunked_body_instead_of_dispatching_it_empty():
+    calls = []
+    response = exchange([b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+                         b'd\r\n{"tool": "a"}\r\n0\r\n\r\n'], handle_request=calls.append)
+
+    assert response.startswith("HTTP/1.1 501 Not Implemented")
+    assert "Connection: close" in response
+    assert calls == []
+
+
+def test_a_post_needs_a_content_length():
+    response = exchange([b"POST / HTTP/1.1\r\n\r\n"])
+
+    assert response.startswith("HTTP/1.1 411 Length Required")
+
+
+@pytest.mark.parametrize("headers", [
+    b"".join(b"X-Header-%d: 1\r\n" % i for i in range(MAX_HEADER_COUNT + 1)),
+    b"X-Large: " + b"a" * 40000 + b"\r\nX-Larger: " + b"b" * 40000 + b"\r\n",
+])
+def test_caps_the_number_and_size_of_headers(headers):
+    response = exchange([b"GET /healthz HTTP/1.1\r\n" + headers + b"\r\n"])
+
+    assert response.startswith("HTTP/1.1 431 Request Header Fields Too Large")
+
+
+def test_malformed_and_oversized_requests_get_a_client_error(monkeypatch):
+    assert exchange([b"GARBAGE\r\n\r\n"]).startswith("HTTP/1.1 400 Bad Request")
+    assert exchange([b"POST / HTTP/1.1\r\nContent-Length: -5\r\n\r\n"]).startswith("HTTP/1.1 400 Bad Request")
+
+    monkeypatch.setattr("async_server.MAX_REQUEST_BYTES", 10)
+    assert exchange([post(b'{"tool": "too long"}')]).startswith("HTTP/1.1 413")
+
+
+def test_long_running_tools_return_a_job():
+    response = exchange([post(b'{"tool": "migrate"}', b"Connection: close\r\n")], long_running=["migrate"])
+
+    assert response.startswith("HTTP/1.1 202 Accepted")
+    job = json.loads(response.split("\r\n\r\n", 1)[1])
+    assert job["status_url"] == f"/jobs/{job['job_id']}"
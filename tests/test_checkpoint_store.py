@@ -0,0 +1,121 @@
+import pytest
+
+from checkpoint_store import CheckpointStore, combine_fingerprints, fetch_table_fingerprints
+from table_validation import BulkValidator
+
+MATCHED = {"source": 10, "target": 10, "match": True}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "state" / "checkpoints.db")
+
+
+def test_results_survive_a_restart(path):
+    store = CheckpointStore(path)
+    store.save_table_result("orders", "row_count", "fp1", MATCHED, True)
+    store.save_chunk_result("orders", "fp1", (1, 100), (99, 12345), (99, 12345))
+    store.save_cursor("app-log", {"timestamp": "2026-01-01T00:00:00Z", "seen": ["a"]})
+    store.close()
+
+    reopened = CheckpointStore(path)
+
+    assert reopened.get_table_result("orders", "row_count", "fp1") == MATCHED
+    assert reopened.get_chunk_results("orders", "fp1") == {(1, 100): ((99, 12345), (99, 12345))}
+    assert reopened.get_cursor("app-log") == {"timestamp": "2026-01-01T00:00:00Z", "seen": ["a"]}
+    reopened.close()
+
+
+def test_results_recorded_under_another_fingerprint_are_not_reused(path):
+    store = CheckpointStore(path)
+    store.save_table_result("orders", "row_count", "fp1", MATCHED, True)
+    store.save_chunk_result("orders", "fp1", (1, 100), (99, 1), (99, 1))
+
+    assert store.get_table_result("orders", "row_count", "fp2") is None
+    assert store.get_table_result("orders", "checksum", "fp1") is None
+    assert store.get_chunk_results("orders", "fp2") == {}
+    store.close()
+
+
+def test_tables_without_a_fingerprint_are_never_checkpointed(path):
+    store = CheckpointStore(path)
+    store.save_table_result("orders", "row_count", None, MATCHED, True)
+    store.save_chunk_result("orders", None, (1, 100), (99, 1), (99, 1))
+
+    assert store.get_table_result("orders", "row_count", None) is None
+    assert store.get_chunk_results("orders", None) == {}
+    store.close()
+
+
+def test_a_table_result_drops_chunks_from_older_fingerprints(path):
+    store = CheckpointStore(path)
+    store.save_chunk_result("orders", "fp1", (1, 100), (99, 1), (99, 1))
+    store.save_chunk_result("orders", "fp2", (1, 100), (99, 2), (99, 2))
+
+    store.save_table_result("orders", "chunked_checksum", "fp2", MATCHED, True)
+
+    assert store.get_chunk_results("orders", "fp1") == {}
+    assert list(store.get_chunk_results("orders", "fp2")) == [(1, 100)]
+    store.close()
+
+
+def test_clear_forgets_one_table_or_all(path):
+    store = CheckpointStore(path)
+    for table in ("orders", "customers"):
+        store.save_table_result(table, "row_count", "fp", MATCHED, True)
+
+    store.clear("orders")
+    assert store.get_table_result("orders", "row_count", "fp") is None
+    assert store.get_table_result("customers", "row_count", "fp") == MATCHED
+
+    store.clear()
+    assert store.get_table_result("customers", "row_count", "fp") is None
+    store.close()
+
+
+def test_fingerprints_need_an_update_time_on_both_sides():
+    source = ("2026-01-01 00:00:00", 10, 16384)
+
+    assert combine_fingerprints(source, source) == combine_fingerprints(list(source), list(source))
+    assert combine_fingerprints(source, ("2026-01-01 00:00:01", 10, 16384)) != combine_fingerprints(source, source)
+    assert combine_fingerprints(source, (None, 10, 16384)) is None
+    assert combine_fingerprints(source, None) is None
+
+
+def test_reads_fingerprints_from_table_statistics(standin):
+    conn = standin.connect(True)
+    try:
+        everything = fetch_table_fingerprints(conn, "bench")
+        one = fetch_table_fingerprints(conn, "bench", "bench_0001")
+    finally:
+        conn.close()
+
+    assert sorted(everything) == ["bench_0000", "bench_0001", "bench_0002"]
+    assert one == {"bench_0001": everything["bench_0001"]}
+    assert everything["bench_0001"][1] == 2500
+
+
+def touch(standin, use_source, table_name, update_time):
+    conn = standin.connect(use_source)
+    try:
+        conn.raw.execute("UPDATE information_schema.tables SET update_time = ? WHERE table_name = ?",
+                         (update_time, table_name))
+        conn.raw.commit()
+    finally:
+        conn.close()
+
+
+def test_reruns_skip_only_unchanged_tables_that_matched(standin, synthetic, connect, path):
+    standin.prepare(synthetic, mismatched_tables=["bench_0002"])
+    store = CheckpointStore(path)
+    BulkValidator(connect, "bench", checkpoints=store).run()
+
+    touch(standin, False, "bench_0001", "2999-01-01 00:00:00")
+    rerun = BulkValidator(connect, "bench", checkpoints=store).run()
+    unchanged = {r["table"]: r.get("unchanged", False) for r in rerun["results"]}
+
+    # bench_0001 changed on the target and bench_0002 did not match, so both are queried again
+    assert unchanged == {"bench_0000": True, "bench_0001": False, "bench_0002": False}
+    assert rerun["skipped_unchanged"] == 1
+    assert rerun["mismatched"] == 1
+    store.close()
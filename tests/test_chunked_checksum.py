@@ -0,0 +1,93 @@
+import pytest
+
+import chunked_checksum
+from checkpoint_store import CheckpointStore
+from chunked_checksum import ChunkedChecksum
+from conftest import sqlite_row_hash_expression
+
+COLUMNS = ["id", "amount"]
+
+
+@pytest.fixture
+def skewed(standin, monkeypatch):
+    """A table with 300 dense keys and a handful far out, the shape arithmetic key ranges get wrong."""
+    keys = list(range(1, 301)) + [10 ** 9 + i for i in range(5)]
+    for use_source in (True, False):
+        conn = standin.connect(use_source)
+        conn.raw.execute("CREATE TABLE skewed (id INTEGER PRIMARY KEY, amount INTEGER)")
+        conn.raw.executemany("INSERT INTO skewed VALUES (?, ?)", [(k, k % 97) for k in keys])
+        conn.raw.commit()
+        conn.close()
+    monkeypatch.setattr(chunked_checksum, "describe_table", lambda conn, schema, table: ("id", "bigint", COLUMNS))
+    monkeypatch.setattr(chunked_checksum, "row_hash_expression", sqlite_row_hash_expression)
+    return keys
+
+
+@pytest.fixture
+def hashed_chunks(monkeypatch):
+    """Records the (start, end, source or target rows) of every chunk hash."""
+    chunks = []
+    chunk_hash = chunked_checksum._chunk_hash
+
+    def recording_chunk_hash(conn, query, chunk):
+        result = chunk_hash(conn, query, chunk)
+        chunks.append((chunk[0], chunk[1], result[0]))
+        return result
+    monkeypatch.setattr(chunked_checksum, "_chunk_hash", recording_chunk_hash)
+    return chunks
+
+
+def execute(standin, use_source, statement):
+    conn = standin.connect(use_source)
+    conn.raw.execute(statement)
+    conn.raw.commit()
+    conn.close()
+
+
+def test_chunks_follow_the_keys_not_the_key_range(skewed, connect, hashed_chunks):
+    report = ChunkedChecksum(connect, "bench", chunk_rows=100).compare("skewed")
+
+    assert report["match"] and report["complete"]
+    assert report["chunks"] == 4
+    assert report["source_rows"] == report["target_rows"] == len(skewed)
+    assert sorted({(start, end) for start, end, _ in hashed_chunks}) == [
+        (1, 101), (101, 201), (201, 10 ** 9), (10 ** 9, 10 ** 9 + 5)]
+    assert max(rows for _, _, rows in hashed_chunks) <= 100
+
+
+def test_narrows_a_difference_inside_the_dense_keys(standin, skewed, connect):
+    execute(standin, False, "DELETE FROM skewed WHERE id = 150")
+
+    report = ChunkedChecksum(connect, "bench", chunk_rows=100, split_factor=4).compare("skewed")
+
+    assert not report["match"]
+    assert report["mismatched_ranges"] == [{"from": 150, "to": 150, "source_rows": 1, "target_rows": 0}]
+
+
+def test_target_rows_outside_the_source_keys_are_covered(standin, skewed, connect):
+    execute(standin, False, "INSERT INTO skewed VALUES (-7, 1), (2000000000, 1)")
+
+    report = ChunkedChecksum(connect, "bench", chunk_rows=100).compare("skewed")
+
+    assert (report["source_rows"], report["target_rows"]) == (len(skewed), len(skewed) + 2)
+    assert {r["from"] for r in report["mismatched_ranges"]} >= {-7}
+    assert max(r["to"] for r in report["mismatched_ranges"]) == 2000000000
+
+
+def test_resumes_after_the_chunks_already_compared(standin, skewed, connect, tmp_path, hashed_chunks, monkeypatch):
+    # The stand-in has no statistics for this table, so give it a fingerprint that stays the same
+    monkeypatch.setattr(chunked_checksum, "fetch_table_fingerprints",
+                        lambda conn, schema, table: {table: ("2026-01-01 00:00:00", 305, 4096)})
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+
+    first = ChunkedChecksum(connect, "bench", chunk_rows=100, max_chunk_queries=2, checkpoints=store).compare("skewed")
+    assert not first["complete"]
+    assert first["unchecked_ranges"] == [{"from": 201, "to": 10 ** 9 + 4}]
+
+    hashed_chunks.clear()
+    second = ChunkedChecksum(connect, "bench", chunk_rows=100, checkpoints=store).compare("skewed")
+
+    assert second["complete"] and second["match"]
+    assert second["resumed_chunks"] == 2
+    assert sorted({(start, end) for start, end, _ in hashed_chunks}) == [(201, 10 ** 9), (10 ** 9, 10 ** 9 + 5)]
+    store.close()
@@ -0,0 +1,188 @@
+import threading
+
+import pytest
+
+import connection_pool
+from connection_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(connection_pool, "time", clock)
+    return clock
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.closed = False
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise ConnectionError("server has gone away")
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class Factory:
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self):
+        self.opened.append(FakeConnection(len(self.opened)))
+        return self.opened[-1]
+
+
+@pytest.fixture
+def factory():
+    return Factory()
+
+
+def test_reuses_the_most_recently_returned_connection(factory, clock):
+    pool = ConnectionPool(factory, max_size=2)
+
+    with pool.connection() as first, pool.connection() as second:
+        assert first is not second
+    with pool.connection() as again:
+        assert again is first
+
+    assert len(factory.opened) == 2
+    # Each return rolls back whatever the borrower left open
+    assert first.rollbacks == 2
+    assert pool.stats() == {"name": "pool", "max_size": 2, "idle": 2, "in_use": 0, "created": 2, "discarded": 0}
+
+
+def test_checkout_times_out_when_every_connection_is_in_use(factory):
+    pool = ConnectionPool(factory, max_size=1, name="source")
+    held = pool.acquire()
+
+    with pytest.raises(PoolTimeoutError, match="pool 'source'"):
+        pool.acquire(timeout=0.05)
+
+    pool.release(held)
+    assert pool.acquire(timeout=0.05) is held
+
+
+def test_a_waiting_caller_gets_the_connection_once_it_is_returned(factory):
+    pool = ConnectionPool(factory, max_size=1)
+    held = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire(timeout=5)))
+    waiter.start()
+
+    pool.release(held)
+    waiter.join(5)
+
+    assert got == [held]
+    assert len(factory.opened) == 1
+
+
+def test_a_connection_that_died_during_a_query_is_discarded(factory, clock):
+    pool = ConnectionPool(factory, max_size=1)
+
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.alive = False
+            raise RuntimeError("Lost connection to MySQL server during query")
+
+    assert conn.closed
+    with pool.connection() as replacement:
+        assert replacement is not conn
+    assert pool.stats()["discarded"] == 1
+
+
+def test_a_failed_query_on_a_live_connection_keeps_it(factory, clock):
+    pool = ConnectionPool(factory, max_size=1)
+
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            raise RuntimeError("Unknown column 'x'")
+
+    with pool.connection() as again:
+        assert again is conn
+
+
+def test_idle_connections_are_health_checked_after_the_validation_interval(factory, clock):
+    pool = ConnectionPool(factory, max_size=1, validation_interval=5.0)
+    with pool.connection() as conn:
+        pass
+    conn.alive = False
+
+    # Recently returned connections are trusted without a round trip
+    clock.now = 4.0
+    with pool.connection() as again:
+        assert again is conn
+
+    clock.now = 10.0
+    with pool.connection() as replacement:
+        assert replacement is not conn
+    assert conn.closed
+
+
+def test_connections_idle_too_long_are_evicted(factory, clock):
+    pool = ConnectionPool(factory, max_size=2, max_idle_seconds=60.0)
+    with pool.connection() as old:
+        pass
+    clock.now = 50.0
+    with pool.connection() as fresh:
+        assert fresh is old
+    clock.now = 100.0
+
+    assert pool.evict_idle() == 0
+    clock.now = 111.0
+    assert pool.evict_idle() == 1
+    assert old.closed
+
+
+def test_a_connection_that_cannot_be_reset_is_not_reused(factory, clock):
+    def reset(conn):
+        raise RuntimeError("rollback failed")
+    pool = ConnectionPool(factory, max_size=1, reset=reset)
+
+    with pool.connection() as conn:
+        pass
+
+    assert conn.closed
+    assert pool.stats()["idle"] == 0
+
+
+def test_a_failing_factory_gives_the_slot_back(clock):
+    def factory():
+        raise ConnectionError("access denied")
+    pool = ConnectionPool(factory, max_size=1)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            pool.acquire(timeout=0.05)
+
+    assert pool.stats()["in_use"] == 0
+
+
+def test_closing_closes_idle_connections_and_later_returns(factory, clock):
+    pool = ConnectionPool(factory, max_size=2)
+    held = pool.acquire()
+    idle = pool.acquire()
+    pool.release(idle)
+
+    pool.close()
+    assert idle.closed and not held.closed
+    pool.release(held)
+
+    assert held.closed
+    with pytest.raises(PoolTimeoutError, match="is closed"):
+        pool.acquire()
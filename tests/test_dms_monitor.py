@@ -0,0 +1,121 @@
+import pytest
+
+import dms_monitor
+from dms_monitor import DmsJobMonitor, FakeDmsBackend
+
+SOURCE = (1000, 10000)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return 1700000000.0 + self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(dms_monitor, "time", clock)
+    return clock
+
+
+def progress(*samples):
+    """A measure_target() returning the given (rows, bytes) one poll at a time."""
+    samples = iter(samples)
+    return lambda: next(samples)
+
+
+def poll_every(monitor, clock, seconds, polls):
+    for _ in range(polls):
+        monitor.poll()
+        clock.now += seconds
+
+
+def test_derives_rates_progress_and_eta(clock):
+    backend = FakeDmsBackend([{"name": "job", "state": "RUNNING", "phase": "FULL_DUMP"}])
+    monitor = DmsJobMonitor(backend, progress((0, 0), (100, 1000), (200, 2000)), lambda: SOURCE)
+
+    poll_every(monitor, clock, 10, 3)
+    status = monitor.status()
+
+    assert status["state"] == "RUNNING"
+    assert status["phase"] == "FULL_DUMP"
+    assert (status["target_rows"], status["target_bytes"]) == (200, 2000)
+    assert (status["source_rows"], status["source_bytes"]) == SOURCE
+    assert status["rows_per_second"] == 10.0
+    assert status["bytes_per_second"] == 100.0
+    assert status["progress"] == 0.2
+    assert status["eta_seconds"] == 80
+
+
+def test_rates_cover_only_the_rate_window(clock):
+    backend = FakeDmsBackend([{"state": "RUNNING"}])
+    # Fast at first, then slow; the window only sees the slow part
+    monitor = DmsJobMonitor(backend, progress((0, 0), (500, 5000), (510, 5100), (520, 5200)), lambda: SOURCE,
+                            rate_window=15)
+
+    poll_every(monitor, clock, 10, 4)
+
+    assert monitor.status()["bytes_per_second"] == 10.0
+
+
+def test_no_eta_once_the_job_replicates_changes(clock):
+    backend = FakeDmsBackend([{"state": "RUNNING", "phase": "FULL_DUMP"}, {"state": "RUNNING", "phase": "CDC"}])
+    monitor = DmsJobMonitor(backend, progress((0, 0), (100, 1000)), lambda: SOURCE)
+
+    monitor.poll()
+    clock.now += 10
+    monitor.poll()
+    status = monitor.status()
+
+    assert status["phase"] == "CDC"
+    assert status["bytes_per_second"] == 100.0
+    assert "eta_seconds" not in status
+
+
+def test_measures_the_source_every_few_polls(clock):
+    measured = []
+
+    def measure_source():
+        measured.append(clock.now)
+        return SOURCE
+    monitor = DmsJobMonitor(FakeDmsBackend([{"state": "RUNNING"}]), lambda: (0, 0), measure_source, source_every=3)
+
+    poll_every(monitor, clock, 1, 7)
+
+    assert measured == [0, 3, 6]
+
+
+def test_a_failed_poll_keeps_the_last_good_sample(clock):
+    samples = iter([(100, 1000)])
+
+    def measure_target():
+        sample = next(samples, None)
+        if sample is None:
+            raise ConnectionError("could not connect to the target database")
+        return sample
+    monitor = DmsJobMonitor(FakeDmsBackend([{"state": "RUNNING"}]), measure_target, lambda: SOURCE)
+
+    poll_every(monitor, clock, 10, 2)
+    status = monitor.status()
+
+    assert status["polls"] == 1
+    assert status["target_bytes"] == 1000
+    assert status["last_poll_error"] == "could not connect to the target database"
+
+
+def test_stops_polling_at_a_terminal_state():
+    backend = FakeDmsBackend([{"state": "RUNNING"}, {"state": "COMPLETED"}])
+    monitor = DmsJobMonitor(backend, lambda: (0, 0), lambda: SOURCE, poll_interval=0.01)
+
+    monitor.start()
+    monitor._thread.join(timeout=5)
+
+    assert not monitor.running
+    assert backend.calls == 2
+    assert monitor.status()["state"] == "COMPLETED"
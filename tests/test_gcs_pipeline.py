@@ -0,0 +1,169 @@
+import contextlib
+import datetime
+import gzip
+import os
+import re
+
+import pytest
+
+import gcs_pipeline
+from conftest import synthetic_layout
+from gcs_pipeline import ExportImportPipeline, encode_row, format_time
+from shard_storage import LocalStorage
+
+FIELD = re.compile(rb'\\N|"((?:[^"\\]|\\.)*)"|([^,]*)')
+UNESCAPES = {b'\\\\': b'\\', b'\\"': b'"', b'\\n': b'\n', b'\\r': b'\r', b'\\0': b'\x00'}
+
+
+def parse_row(line):
+    """Reads one shard line the way LOAD DATA ... ENCLOSED BY '"' ESCAPED BY '\\' does."""
+    values, position = [], 0
+    while True:
+        match = FIELD.match(line, position)
+        if match.group(0) == b'\\N':
+            values.append(None)
+        elif match.group(1) is not None:
+            values.append(re.sub(rb'\\.', lambda m: UNESCAPES[m.group(0)], match.group(1)).decode('utf-8'))
+        else:
+            values.append(match.group(2).decode('ascii'))
+        position = match.end()
+        if position == len(line):
+            return values
+        position += 1
+
+
+class SQLiteImporter:
+    """Loads shards into the stand-in's target, in place of LOAD DATA or gcloud sql import."""
+
+    def __init__(self, standin):
+        self.standin = standin
+        self.imported = []
+
+    def import_shard(self, storage, shard_name, table_name, columns):
+        with storage.open_reader(shard_name) as compressed, gzip.GzipFile(fileobj=compressed) as rows:
+            batch = [parse_row(line) for line in rows.read().splitlines()]
+        conn = self.standin.connect(False)
+        try:
+            conn.raw.executemany(f"INSERT INTO `{table_name}` ({', '.join(columns)}) "
+                                 f"VALUES ({', '.join(['?'] * len(columns))})", batch)
+        finally:
+            conn.close()
+        self.imported.append(shard_name)
+
+
+@pytest.fixture(autouse=True)
+def layout(monkeypatch, synthetic):
+    monkeypatch.setattr(gcs_pipeline, "describe_schema", lambda conn, schema: synthetic_layout(synthetic))
+
+
+@pytest.fixture
+def empty_target(standin, synthetic):
+    conn = standin.connect(False)
+    try:
+        for name, _, _ in synthetic.layout():
+            conn.raw.execute(f"DELETE FROM `{name}`")
+    finally:
+        conn.close()
+
+
+def table_rows(standin, use_source, table_name):
+    conn = standin.connect(use_source)
+    try:
+        return conn.raw.execute(f"SELECT * FROM `{table_name}` ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def shard_files(root):
+    return sorted(os.path.relpath(os.path.join(d, f), root) for d, _, files in os.walk(root) for f in files)
+
+
+@pytest.mark.usefixtures("empty_target")
+def test_exports_and_imports_every_table_through_local_storage(standin, connect, synthetic, tmp_path):
+    importer = SQLiteImporter(standin)
+    storage = LocalStorage(str(tmp_path / "shards"))
+    pipeline = ExportImportPipeline(connect, "bench", storage, importer, export_workers=2, chunk_rows=1000,
+                                    shard_bytes=16 * 1024, batch_rows=200, prefix="run")
+
+    report = pipeline.run()
+
+    assert report["tables_done"] == synthetic.tables
+    assert report["rows_exported"] == synthetic.total_rows
+    # Small shards roll over within a chunk
+    assert report["shards_imported"] == report["shards_written"] > synthetic.tables * 3
+    for name, _, _ in synthetic.layout():
+        assert table_rows(standin, False, name) == table_rows(standin, True, name)
+    assert shard_files(str(tmp_path / "shards")) == []
+
+
+class FailingConnection:
+    """Fails the second fetch of any query on `table_name`, after a shard has been started."""
+
+    def __init__(self, conn, table_name):
+        self.conn = conn
+        self.table_name = table_name
+
+    def cursor(self):
+        cursor = self.conn.cursor()
+        fetchmany, fetches = cursor.fetchmany, []
+
+        def failing_fetchmany(size=1):
+            if cursor.query and f"`{self.table_name}`" in cursor.query:
+                fetches.append(size)
+                if len(fetches) == 2:
+                    raise RuntimeError("connection lost")
+            return fetchmany(size)
+
+        execute = cursor.execute
+
+        def recording_execute(query, params=()):
+            cursor.query = query
+            return execute(query, params)
+
+        cursor.query = None
+        cursor.execute, cursor.fetchmany = recording_execute, failing_fetchmany
+        return cursor
+
+
+@pytest.mark.usefixtures("empty_target")
+def test_a_failed_export_leaves_no_partial_shard(standin, synthetic, tmp_path):
+    failing = synthetic.layout()[0][0]
+
+    @contextlib.contextmanager
+    def connect(use_source):
+        conn = standin.connect(use_source)
+        try:
+            yield FailingConnection(conn, failing)
+        finally:
+            conn.close()
+
+    importer = SQLiteImporter(standin)
+    storage = LocalStorage(str(tmp_path / "shards"))
+    pipeline = ExportImportPipeline(connect, "bench", storage, importer, export_workers=1, chunk_rows=100000,
+                                    batch_rows=500, prefix="run", keep_shards=True)
+
+    report = pipeline.run()
+
+    assert report["tables"][failing]["status"] == "failed"
+    assert "export of chunk 0 failed" in report["tables"][failing]["error"]
+    assert report["tables_done"] == synthetic.tables - 1
+    assert not any(f"/{failing}/" in name for name in importer.imported)
+    assert not any(name.startswith(os.path.join("run", failing)) for name in shard_files(str(tmp_path / "shards")))
+
+
+@pytest.mark.parametrize("value, text", [
+    (datetime.timedelta(hours=26), "26:00:00"),
+    (datetime.timedelta(seconds=-1), "-00:00:01"),
+    (datetime.timedelta(hours=-838, minutes=-59, seconds=-59), "-838:59:59"),
+    (datetime.timedelta(seconds=5, microseconds=250), "00:00:05.000250"),
+    (datetime.timedelta(0), "00:00:00"),
+])
+def test_formats_time_values_as_mysql_does(value, text):
+    assert format_time(value) == text
+
+
+def test_encodes_values_for_load_data():
+    row = (1, None, "a,\"b\"\\\n", datetime.timedelta(hours=-1), b"\x00")
+
+    assert encode_row(row) == b'1,\\N,"a,\\"b\\"\\\\\\n","-01:00:00","\\0"\n'
+    assert parse_row(encode_row(row)[:-1]) == ["1", None, "a,\"b\"\\\n", "-01:00:00", "\x00"]
@@ -0,0 +1,119 @@
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("google.cloud.secretmanager")
+
+from tools import gemini_client
+from tools.gemini_client import FakeBackend, GeminiClient, RateLimitedError, ResponseCache, to_gemini_contents
+
+MESSAGES = [
+    {"role": "system", "content": "You are the Schema Agent."},
+    {"role": "user", "content": "Compare the schemas."},
+]
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    """Records the backoff attempts instead of sleeping."""
+    attempts = []
+
+    def backoff(attempt):
+        attempts.append(attempt)
+        return 0.0
+    monkeypatch.setattr(gemini_client, "_backoff", backoff)
+    return attempts
+
+
+def rate_limited(times, text="ok"):
+    """A responder that answers 429 `times` times before returning `text`."""
+    calls = []
+
+    def responder(contents, system):
+        calls.append(contents)
+        if len(calls) <= times:
+            raise RateLimitedError("429 resource exhausted")
+        return text
+    return responder
+
+
+def client(backend, **kwargs):
+    kwargs.setdefault("cache", ResponseCache())
+    return GeminiClient(backend=backend, requests_per_minute=6000, **kwargs)
+
+
+def test_converts_autogen_messages():
+    contents, system = to_gemini_contents([
+        {"role": "system", "content": "a"},
+        {"role": "user", "content": "b"},
+        {"role": "user", "content": "c"},
+        {"role": "assistant", "content": "d"},
+        {"role": "system", "content": "e"},
+        {"role": "user", "content": ""},
+    ])
+
+    assert contents == [{"role": "user", "parts": ["b", "c"]}, {"role": "model", "parts": ["d"]}]
+    assert system == "a\n\ne"
+
+
+def test_answers_repeated_conversations_from_the_cache():
+    backend = FakeBackend()
+    gemini = client(backend)
+
+    first = gemini(MESSAGES)
+    second = gemini(MESSAGES + [{"role": "assistant", "content": "trailing model turn"}])
+    other = gemini([{"role": "user", "content": "Something else."}])
+
+    assert first == second == "echo: Compare the schemas."
+    assert other == "echo: Something else."
+    assert len(backend.calls) == 2
+    assert backend.calls[0] == ([{"role": "user", "parts": ["Compare the schemas."]}], "You are the Schema Agent.")
+
+
+def test_disk_cache_survives_a_new_client(tmp_path):
+    backend = FakeBackend()
+    client(backend, cache=ResponseCache(directory=str(tmp_path)))(MESSAGES)
+
+    answer = client(backend, cache=ResponseCache(directory=str(tmp_path)))(MESSAGES)
+
+    assert answer == "echo: Compare the schemas."
+    assert len(backend.calls) == 1
+
+
+def test_disk_cache_keeps_the_newest_entries(tmp_path):
+    cache = ResponseCache(directory=str(tmp_path), max_disk_entries=2)
+    for i in range(4):
+        cache.put(f"key{i}", f"value{i}")
+
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_backs_off_while_rate_limited(backoffs):
+    backend = FakeBackend(responder=rate_limited(2))
+
+    assert client(backend)(MESSAGES) == "ok"
+    assert backoffs == [0, 1]
+    assert len(backend.calls) == 3
+
+
+def test_gives_up_after_max_retries(backoffs):
+    backend = FakeBackend(responder=rate_limited(10))
+
+    answer = client(backend, max_retries=2)(MESSAGES)
+
+    assert answer == "Error calling Gemini API: 429 resource exhausted"
+    assert backoffs == [0, 1]
+    assert len(backend.calls) == 3
+
+
+def test_does_not_cache_errors(backoffs):
+    backend = FakeBackend(responder=rate_limited(1))
+    gemini = client(backend, max_retries=0)
+
+    assert gemini(MESSAGES).startswith("Error calling Gemini API")
+    assert gemini(MESSAGES) == "ok"
+
+
+def test_backoff_grows_and_is_capped():
+    assert 0.5 <= gemini_client._backoff(0) <= 1.0
+    assert 4.0 <= gemini_client._backoff(3) <= 8.0
+    assert 16.0 <= gemini_client._backoff(20) <= 32.0
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from tools.graph_runner import ParallelGraphRunner, format_timings, timings_json
+
+
+def step(output, seconds=0.0, seen=None):
+    """A coroutine node that sleeps, records the messages it got, and returns `output`."""
+    async def run(messages, *item):
+        if seen is not None:
+            seen.append(messages)
+        await asyncio.sleep(seconds)
+        return output
+    return run
+
+
+def failing(message, seconds=0.0):
+    async def run(messages):
+        await asyncio.sleep(seconds)
+        raise RuntimeError(message)
+    return run
+
+
+def diamond(**runs):
+    """env -> (a, b) -> join, the shape of the migration workflow."""
+    runner = ParallelGraphRunner()
+    runner.add_node("env", runs.get("env", step("env")))
+    runner.add_node("a", runs.get("a", step("a")), ["env"])
+    runner.add_node("b", runs.get("b", step("b")), ["env"])
+    runner.add_node("join", runs.get("join", step("join")), ["a", "b"])
+    return runner
+
+
+def test_orders_nodes_by_dependency():
+    runner = ParallelGraphRunner()
+    runner.add_node("last", step("x"), ["middle", "first"])
+    runner.add_node("middle", step("x"), ["first"])
+    runner.add_node("first", step("x"))
+    runner.add_node("other", step("x"))
+
+    assert runner.topological_order() == ["first", "other", "middle", "last"]
+
+
+def test_rejects_unknown_dependencies_cycles_and_duplicates():
+    runner = ParallelGraphRunner()
+    runner.add_node("a", step("a"), ["missing"])
+    with pytest.raises(ValueError, match="unknown node.*missing"):
+        runner.run("go")
+
+    runner = ParallelGraphRunner()
+    runner.add_node("a", step("a"), ["b"])
+    runner.add_node("b", step("b"), ["a"])
+    runner.add_node("c", step("c"))
+    with pytest.raises(ValueError, match="cycle among: a, b"):
+        runner.topological_order()
+
+    with pytest.raises(ValueError, match="already defined"):
+        runner.add_node("a", step("a"))
+
+
+def test_runs_independent_branches_concurrently():
+    runner = diamond(a=step("a", 0.3), b=step("b", 0.3))
+
+    started = time.monotonic()
+    report = runner.run("go")
+
+    assert time.monotonic() - started < 0.5
+    assert all(r["status"] == "succeeded" for r in report["nodes"].values())
+    assert report["nodes"]["b"]["start"] < report["nodes"]["a"]["end"]
+
+
+def test_a_join_gets_the_outputs_of_all_its_ancestors():
+    seen = []
+    runner = diamond(a=step("from a", 0.1), join=step("done", seen=seen))
+
+    report = runner.run("go")
+
+    assert report["nodes"]["join"]["output"] == "done"
+    assert seen == [[
+        {"role": "user", "content": "go"},
+        {"role": "user", "name": "env", "content": "env"},
+        {"role": "user", "name": "b", "content": "b"},
+        {"role": "user", "name": "a", "content": "from a"},
+    ]]
+
+
+def test_a_failure_skips_only_the_nodes_downstream():
+    runner = diamond(a=failing("tool call failed"))
+    runner.add_node("side", step("side"), ["b"])
+
+    nodes = runner.run("go")["nodes"]
+
+    assert nodes["a"] == dict(nodes["a"], status="failed", reason="tool call failed")
+    assert nodes["join"] == {"status": "skipped", "reason": "dependency a did not succeed"}
+    assert nodes["side"]["status"] == "succeeded"
+
+
+def test_skips_propagate_through_the_whole_subgraph():
+    runner = diamond(env=failing("no terraform output"))
+
+    nodes = runner.run("go")["nodes"]
+
+    assert [nodes[n]["status"] for n in ("env", "a", "b", "join")] == ["failed", "skipped", "skipped", "skipped"]
+    assert nodes["join"]["reason"] == "dependency a did not succeed"
+
+
+def test_fans_out_over_items_and_joins_the_outputs():
+    items = []
+
+    async def validate(messages, group):
+        items.append(group)
+        await asyncio.sleep(0.2)
+        return f"validated {group}"
+    runner = ParallelGraphRunner()
+    runner.add_node("validate", validate, fan_out=["a,b", "c", "d"])
+
+    started = time.monotonic()
+    record = runner.run("go")["nodes"]["validate"]
+
+    assert time.monotonic() - started < 0.4
+    assert sorted(items) == ["a,b", "c", "d"]
+    assert record["branches"] == 3
+    assert record["output"] == "validated a,b\n\nvalidated c\n\nvalidated d"
+
+
+def test_a_timeout_abandons_the_node_and_skips_downstream():
+    runner = diamond(a=step("a", 5.0))
+    runner.nodes["a"].timeout = 0.2
+
+    started = time.monotonic()
+    nodes = runner.run("go")["nodes"]
+
+    assert time.monotonic() - started < 1.0
+    assert nodes["a"]["status"] == "timed_out"
+    assert nodes["a"]["reason"] == "exceeded 0.2s"
+    assert nodes["b"]["status"] == "succeeded"
+    assert nodes["join"]["status"] == "skipped"
+
+
+def test_a_blocking_node_times_out_without_being_stopped():
+    release = threading.Event()
+    finished = threading.Event()
+
+    def blocking(messages):
+        release.wait(5)
+        finished.set()
+        return "late"
+    runner = ParallelGraphRunner(default_timeout=0.2)
+    runner.add_node("slow", blocking)
+    runner.add_node("after", step("after"), ["slow"])
+
+    started = time.monotonic()
+    nodes = runner.run("go")["nodes"]
+
+    # The report does not wait for the abandoned worker thread, which runs on until its call returns
+    assert time.monotonic() - started < 1.0
+    assert nodes["slow"]["status"] == "timed_out"
+    assert nodes["after"]["status"] == "skipped"
+    assert not finished.is_set()
+    release.set()
+    assert finished.wait(5)
+
+
+def test_reports_the_critical_path():
+    runner = diamond(a=step("a", 0.05), b=step("b", 0.3))
+    runner.add_node("side", step("side"), ["env"])
+
+    report = runner.run("go")
+
+    assert report["critical_path"] == ["env", "b", "join"]
+    assert report["wall_seconds"] >= report["nodes"]["join"]["end"]
+
+
+def test_formats_timings_without_outputs():
+    report = diamond(a=failing("boom", 0.1)).run("go")
+
+    table = format_timings(report)
+    data = json.loads(timings_json(report))
+
+    assert table.splitlines()[0].split() == ["node", "status", "start", "end", "seconds"]
+    assert "critical path: env -> a" in table
+    assert "output" not in data["nodes"]["env"]
+    assert data["nodes"]["join"]["status"] == "skipped"
@@ -0,0 +1,172 @@
+import os
+
+import pytest
+
+from checkpoint_store import CheckpointStore
+from log_monitor import CloudLoggingApi, CloudLoggingSource, FileLogSource, LogMonitor, classify
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    yield store
+    store.close()
+
+
+def append(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+
+
+@pytest.mark.parametrize("line, verdict", [
+    ("2024-01-01T00:00:00Z 0 [ERROR] [MY-012345] InnoDB: Assertion failure in thread", ("crash", "critical")),
+    ("[ERROR] Too many connections", ("out_of_resources", "critical")),
+    ("[Note] Deadlock found when trying to get lock", ("deadlock", "high")),
+    ("[Warning] Aborted connection 12 to db", ("aborted_connection", "medium")),
+    ("# Query_time: 12.5  Lock_time: 0.0 Rows_sent: 1", ("slow_query", "medium")),
+    ("# Query_time: 0.5  Lock_time: 0.0 Rows_sent: 1", None),
+    ("[Note] Server ready for connections", None),
+])
+def test_classifies_lines(line, verdict):
+    assert classify(line) == verdict
+
+
+def test_reads_only_complete_lines(tmp_path):
+    path = str(tmp_path / "error.log")
+    append(path, "[ERROR] one\n[ERROR] tw")
+    source = FileLogSource("mysql", path)
+
+    lines, cursor = source.read(None)
+    assert lines == ["[ERROR] one"]
+
+    append(path, "o\n")
+    lines, cursor = source.read(cursor)
+    assert lines == ["[ERROR] two"]
+    assert source.read(cursor) == ([], cursor)
+
+
+def test_rereads_a_replaced_file(tmp_path):
+    path = str(tmp_path / "error.log")
+    append(path, "[ERROR] before rotation\n")
+    source = FileLogSource("mysql", path)
+    _, cursor = source.read(None)
+
+    os.rename(path, path + ".1")
+    append(path, "[ERROR] after\n")
+
+    assert source.read(cursor)[0] == ["[ERROR] after"]
+
+
+def test_a_restarted_monitor_resumes_from_its_saved_cursor(tmp_path, store):
+    path = str(tmp_path / "error.log")
+    append(path, "[ERROR] first\n[Note] fine\n")
+    monitor = LogMonitor([FileLogSource("mysql", path)], cursors=store)
+    assert monitor.poll() == 1
+    assert [a["line"] for a in monitor.drain()["new_anomalies"]] == ["[ERROR] first"]
+
+    append(path, "[ERROR] second\n")
+    restarted = LogMonitor([FileLogSource("mysql", path)], cursors=store)
+    assert restarted.poll() == 1
+    report = restarted.drain()
+
+    assert [a["line"] for a in report["new_anomalies"]] == ["[ERROR] second"]
+    assert report["lines_scanned"] == 1
+    assert store.get_cursor("mysql")["offset"] == os.path.getsize(path)
+
+
+def test_drain_returns_each_anomaly_once(tmp_path):
+    path = str(tmp_path / "error.log")
+    append(path, "".join(f"[ERROR] line {i}\n" for i in range(5)))
+    monitor = LogMonitor([FileLogSource("mysql", path)])
+    monitor.poll()
+
+    first = monitor.drain(max_anomalies=3)
+    second = monitor.drain(max_anomalies=3)
+
+    assert [a["line"] for a in first["new_anomalies"]] == ["[ERROR] line 0", "[ERROR] line 1", "[ERROR] line 2"]
+    assert first["more_pending"] == 2
+    assert [a["line"] for a in second["new_anomalies"]] == ["[ERROR] line 3", "[ERROR] line 4"]
+    assert monitor.drain()["new_anomalies"] == []
+    assert second["counters"] == {"error": {"total": 5, "recent": 5}}
+
+
+def test_a_failing_source_is_reported_without_losing_its_cursor(tmp_path, store):
+    class BrokenSource:
+        name = "dms"
+
+        def read(self, cursor):
+            raise RuntimeError("403 Forbidden")
+
+    store.save_cursor("dms", {"timestamp": "2024-01-01T00:00:00Z", "insert_ids": []})
+    monitor = LogMonitor([BrokenSource()], cursors=store)
+
+    assert monitor.poll() == 0
+    assert monitor.drain()["sources"] == {"dms": "error: 403 Forbidden"}
+    assert store.get_cursor("dms") == {"timestamp": "2024-01-01T00:00:00Z", "insert_ids": []}
+
+
+def entry(timestamp, insert_id, message, severity="ERROR"):
+    return {"timestamp": timestamp, "insertId": insert_id, "severity": severity, "jsonPayload": {"message": message}}
+
+
+def test_cloud_logging_resumes_after_the_entries_already_seen():
+    requests = []
+    pages = iter([
+        [entry("2024-01-01T00:00:01Z", "a", "first"), entry("2024-01-01T00:00:02Z", "b", "second")],
+        # Entries at the cursor timestamp come back again, since the filter uses >=
+        [entry("2024-01-01T00:00:02Z", "b", "second"), entry("2024-01-01T00:00:02Z", "c", "third")],
+    ])
+
+    def list_entries(log_filter, page_size):
+        requests.append((log_filter, page_size))
+        return next(pages)
+    source = CloudLoggingSource("dms_logs", list_entries, "severity>=WARNING", limit=100)
+
+    lines, cursor = source.read(None)
+    assert lines == ["ERROR first", "ERROR second"]
+    assert cursor == {"timestamp": "2024-01-01T00:00:02Z", "insert_ids": ["b"]}
+
+    lines, cursor = source.read(cursor)
+    assert lines == ["ERROR third"]
+    assert cursor == {"timestamp": "2024-01-01T00:00:02Z", "insert_ids": ["b", "c"]}
+    assert requests[1] == ('(severity>=WARNING) AND timestamp>="2024-01-01T00:00:02Z"', 100)
+    # Without a cursor only the last hour is read
+    assert requests[0][0].startswith('(severity>=WARNING) AND timestamp>="')
+
+
+class FakeResponse:
+    def __init__(self, body, status=200):
+        self.body = body
+        self.status = status
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(f"{self.status} Client Error")
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.posts = []
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append((url, json))
+        return self.responses.pop(0)
+
+
+def test_lists_entries_through_the_logging_api():
+    session = FakeSession(FakeResponse({"entries": [entry("t", "a", "x")]}), FakeResponse({}),
+                          FakeResponse({}, status=403))
+    api = CloudLoggingApi("my-project", session=session)
+
+    assert api.list_entries("severity>=WARNING", 50) == [entry("t", "a", "x")]
+    assert api.list_entries("severity>=WARNING", 50) == []
+    with pytest.raises(RuntimeError, match="403"):
+        api.list_entries("severity>=WARNING", 50)
+    assert session.posts[0] == ("https://logging.googleapis.com/v2/entries:list", {
+        "resourceNames": ["projects/my-project"], "filter": "severity>=WARNING",
+        "orderBy": "timestamp asc", "pageSize": 50,
+    })
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+pytest.importorskip("autogen_ext.tools.mcp")
+pytest.importorskip("google.cloud.secretmanager")
+
+import mcp_server
+from mcp_server import MCPRequestHandler
+from result_store import ResultStore
+from tool_registry import ToolRegistry
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    """A registry with one small and one large read-only tool in place of the database tools."""
+    tools = ToolRegistry()
+    tools.register("small", lambda config: "ok", read_only=True)
+    tools.register("large", lambda config: json.dumps({"results": [{"table": f"t{i}", "match": True}
+                                                                   for i in range(100)]}), read_only=True)
+    monkeypatch.setattr(mcp_server, "TOOLS", tools)
+    monkeypatch.setattr(mcp_server, "RESULTS", ResultStore(max_chars=400))
+    monkeypatch.setattr(MCPRequestHandler, "server_config", {"batch_workers": 2})
+    return tools
+
+
+def test_answers_both_request_forms(tools):
+    assert MCPRequestHandler.handle_request({"tool": "small", "arguments": {}}) == {"output": "ok"}
+    assert MCPRequestHandler.handle_request({"tool_code": "small()"}) == {"output": "ok"}
+    assert MCPRequestHandler.handle_request({"tool": "small", "arguments": ["x"]}) == {
+        "output": "Error: 'arguments' must be a JSON object"}
+
+
+def test_a_batch_returns_one_output_or_error_per_call(tools):
+    outputs = MCPRequestHandler.handle_request({"calls": [
+        {"tool": "small"},
+        {"tool_code": "small("},
+        "not a request",
+        {"tool": "missing"},
+        {"tool": "large"},
+        {"tool": "large", "full": True},
+    ]})["outputs"]
+
+    assert outputs[0] == "ok"
+    assert outputs[1].startswith("Error: Invalid tool_code format")
+    assert outputs[2].startswith("Error: ")
+    assert outputs[3] == "Error: Tool 'missing' is not recognized."
+    assert json.loads(outputs[4])["truncated"] is True
+    assert len(json.loads(outputs[5])["results"]) == 100
+
+
+def test_calls_must_be_a_list(tools):
+    assert MCPRequestHandler.handle_request({"calls": {"tool": "small"}}) == {
+        "outputs": ["Error: 'calls' must be a list of tool requests."]}
@@ -0,0 +1,166 @@
+import contextlib
+
+import pytest
+
+import migration_planner
+from migration_planner import MigrationPlanner
+
+MB = 1000 * 1000
+
+
+def table_stats(rows=1000000, avg_row_bytes=100, index_bytes=None, lob_columns=0, chunkable=True):
+    data_bytes = rows * avg_row_bytes
+    return {"rows": rows, "avg_row_bytes": avg_row_bytes, "data_bytes": data_bytes,
+            "index_bytes": data_bytes if index_bytes is None else index_bytes,
+            "lob_columns": lob_columns, "columns": 4, "key": "id" if chunkable else None, "chunkable": chunkable}
+
+
+class Target:
+    """A target connection that answers the write probe's statements."""
+
+    def __init__(self, read_only):
+        self.read_only = read_only
+        self.statements = []
+        self.row = None
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=()):
+        self.statements.append(query.split()[0] + " " + query.split()[1])
+        self.row = (int(self.read_only),)
+
+    def executemany(self, query, rows):
+        self.statements.append("INSERT")
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def planner():
+    return MigrationPlanner(lambda use_source: contextlib.nullcontext(object()), "app",
+                            workers=4, load_workers=4, chunk_rows=100000, probe_seconds=0.01)
+
+
+def test_index_heavy_tables_on_a_slow_source_take_the_gcs_path(planner):
+    # Streaming rebuilds the indexes as slowly as the source reads; CSV export is read-bound without them
+    plan = planner._plan_table("events", table_stats(), read_rate=1 * MB, write_rate=100 * MB)
+
+    assert (plan["strategy"], plan["parallelism"]) == ("gcs", 4)
+    assert (plan["predicted_seconds"], plan["alternative_seconds"]) == (27.5, 51.0)
+
+
+def test_a_fast_source_streams_the_same_table(planner):
+    plan = planner._plan_table("events", table_stats(), read_rate=100 * MB, write_rate=100 * MB)
+
+    assert (plan["strategy"], plan["reason"]) == ("mydumper", "fastest predicted path")
+    assert plan["predicted_seconds"] == 1.5
+
+
+def test_lob_heavy_tables_always_stream(planner):
+    stats = table_stats(rows=20000, avg_row_bytes=16384, lob_columns=2)
+
+    plan = planner._plan_table("documents", stats, read_rate=1 * MB, write_rate=100 * MB)
+
+    assert plan["strategy"] == "mydumper"
+    assert plan["reason"].startswith("LOB-heavy rows")
+    assert plan["predicted_seconds"] > plan["alternative_seconds"]
+
+
+def test_tables_without_an_integer_key_are_copied_on_one_connection(planner):
+    plan = planner._plan_table("sessions", table_stats(index_bytes=0, chunkable=False),
+                               read_rate=10 * MB, write_rate=10 * MB)
+
+    assert (plan["strategy"], plan["parallelism"]) == ("mydumper", 1)
+    assert plan["reason"].endswith("no integer primary key, so it is copied on a single connection")
+
+
+@pytest.fixture
+def schema(planner, monkeypatch):
+    stats = {"events": table_stats(), "customers": table_stats(rows=1000, index_bytes=0),
+             "documents": table_stats(rows=20000, avg_row_bytes=16384, lob_columns=2)}
+    monkeypatch.setattr(migration_planner, "fetch_table_stats", lambda conn, schema: stats)
+    monkeypatch.setattr(planner, "probe", lambda stats: {
+        "workers": 2, "seconds": 0.01, "source_read_bytes_per_second": 2 * MB,
+        "target_write_bytes_per_second": 200 * MB})
+    return stats
+
+
+def test_plans_each_table_and_recommends_the_migration_calls(planner, schema):
+    summary = planner.plan()["summary"]
+
+    assert summary["database_strategy"] == "per_table"
+    assert {s: v["tables"] for s, v in summary["by_strategy"].items()} == {"mydumper": 2, "gcs": 1}
+    assert summary["recommended_calls"] == [
+        {"tool": "migrate_mydumper", "arguments": {"tables": ["documents", "customers"],
+                                                   "dump_workers": 4, "load_workers": 4}},
+        {"tool": "migrate_gcs", "arguments": {"tables": ["events"], "export_workers": 4}},
+    ]
+    # The two paths run side by side, so the slower one sets the total
+    assert summary["predicted_seconds"] == max(v["predicted_seconds"] for v in summary["by_strategy"].values())
+
+
+def test_plans_only_the_requested_tables(planner, schema):
+    plan = planner.plan(tables=["customers"])
+
+    assert [p["table"] for p in plan["tables"]] == ["customers"]
+    assert list(plan["summary"]["by_strategy"]) == ["mydumper"]
+
+
+def test_recommends_dms_when_the_copy_outlasts_the_downtime(planner, schema):
+    predicted = planner.plan()["summary"]["predicted_seconds"]
+
+    within = planner.plan(max_downtime_seconds=predicted)["summary"]
+    beyond = planner.plan(max_downtime_seconds=predicted - 1)["summary"]
+
+    assert within["database_strategy"] == "per_table"
+    assert beyond["database_strategy"] == "dms"
+    assert beyond["recommended_calls"] == [{"tool": "migrate_dms", "arguments": {}}]
+    assert beyond["reason"].startswith(f"predicted copy time {predicted}s exceeds")
+
+
+def probing_planner(target):
+    planner = MigrationPlanner(lambda use_source: contextlib.nullcontext(object() if use_source else target), "app",
+                               probe_seconds=0.01, probe_workers=2)
+    planner._read_probe = lambda conn, table_name, stats: (4 * MB, 1.0)
+    return planner
+
+
+def test_a_read_only_target_is_not_written_to():
+    target = Target(read_only=True)
+
+    probe = probing_planner(target).probe({"events": table_stats()})
+
+    assert probe["source_read_bytes_per_second"] == 8 * MB
+    assert probe["target_write_bytes_per_second"] == "unmeasured"
+    assert probe["note"].startswith("target is read-only")
+    assert set(target.statements) == {"SELECT @@global.read_only"}
+
+
+def test_a_writable_target_is_probed_in_a_temporary_table():
+    target = Target(read_only=False)
+
+    probe = probing_planner(target).probe({"events": table_stats()})
+
+    assert isinstance(probe["target_write_bytes_per_second"], int)
+    assert "note" not in probe
+    assert "INSERT" in target.statements
+    assert target.statements[-1] == "DROP TEMPORARY"
+
+
+def test_an_unmeasured_write_rate_is_assumed_equal_to_the_read_rate(planner, monkeypatch):
+    monkeypatch.setattr(migration_planner, "fetch_table_stats", lambda conn, schema: {"events": table_stats()})
+    rates = []
+    monkeypatch.setattr(planner, "probe", lambda stats: {
+        "workers": 2, "seconds": 0.01, "source_read_bytes_per_second": 2 * MB,
+        "target_write_bytes_per_second": "unmeasured"})
+    monkeypatch.setattr(planner, "_plan_table", lambda name, s, read_rate, write_rate: rates.append(
+        (read_rate, write_rate)) or {"table": name, "data_bytes": 0, "strategy": "mydumper", "predicted_seconds": 0})
+
+    planner.plan()
+
+    assert rates == [(1 * MB, 1 * MB)]
@@ -0,0 +1,82 @@
+import pytest
+
+import mydumper_pipeline
+from conftest import count_rows, synthetic_layout
+from mydumper_pipeline import DumpLoadPipeline
+
+
+@pytest.fixture(autouse=True)
+def layout(monkeypatch, synthetic):
+    monkeypatch.setattr(mydumper_pipeline, "describe_schema", lambda conn, schema: synthetic_layout(synthetic))
+
+
+def empty_target(standin, synthetic):
+    conn = standin.connect(False)
+    try:
+        for name, _, _ in synthetic.layout():
+            conn.raw.execute(f"DELETE FROM `{name}`")
+    finally:
+        conn.close()
+
+
+def test_copies_every_table_in_key_range_chunks(standin, connect, synthetic):
+    empty_target(standin, synthetic)
+    pipeline = DumpLoadPipeline(connect, "bench", dump_workers=2, load_workers=2, chunk_rows=1000,
+                                batch_rows=300, queue_segments=2)
+
+    report = pipeline.run()
+
+    assert report["finished"]
+    assert report["tables_done"] == synthetic.tables
+    assert report["rows_loaded"] == synthetic.total_rows
+    for name, _, _ in synthetic.layout():
+        assert report["tables"][name]["chunks"] == 3
+        assert count_rows(standin, False, name) == synthetic.rows
+
+
+def test_truncates_the_target_before_loading(standin, connect, synthetic, monkeypatch):
+    # SQLite has no TRUNCATE TABLE
+    execute = mydumper_pipeline._execute
+    monkeypatch.setattr(mydumper_pipeline, "_execute",
+                        lambda conn, statement: execute(conn, statement.replace("TRUNCATE TABLE", "DELETE FROM")))
+    pipeline = DumpLoadPipeline(connect, "bench", dump_workers=2, load_workers=2, chunk_rows=1000,
+                                truncate_target=True)
+
+    report = pipeline.run()
+
+    assert report["tables_done"] == synthetic.tables
+    for name, _, _ in synthetic.layout():
+        assert count_rows(standin, False, name) == synthetic.rows
+
+
+def test_a_failing_load_fails_only_its_table(standin, connect, synthetic):
+    empty_target(standin, synthetic)
+    first = synthetic.layout()[0][0]
+    # A row already on the target makes the load of its chunk hit a duplicate key
+    conn = standin.connect(False)
+    try:
+        conn.raw.execute(f"INSERT INTO `{first}` (id, account_id, amount, created_at, payload) "
+                         "VALUES (1, 1, 0, '2024-01-01 00:00:00', 'x')")
+    finally:
+        conn.close()
+    pipeline = DumpLoadPipeline(connect, "bench", dump_workers=2, load_workers=1, chunk_rows=1000,
+                                queue_segments=1)
+
+    report = pipeline.run()
+
+    assert report["finished"]
+    assert report["tables"][first]["status"] == "failed"
+    assert "load of chunk" in report["tables"][first]["error"]
+    assert report["tables_done"] == synthetic.tables - 1
+
+
+def test_reports_requested_tables_missing_on_source(connect, synthetic):
+    first = synthetic.layout()[0][0]
+    pipeline = DumpLoadPipeline(connect, "bench", truncate_target=False)
+
+    report = pipeline.run(tables=["nope"])
+
+    assert report["tables"]["nope"] == {"status": "failed", "chunks": 0, "chunks_done": 0, "rows_dumped": 0,
+                                        "rows_loaded": 0, "error": "table not found on source",
+                                        "chunk_detail": []}
+    assert first not in report["tables"]
@@ -0,0 +1,266 @@
+import contextlib
+import copy
+import os
+
+import pytest
+
+import performance_analysis
+from performance_analysis import PerformanceAnalyzer, diff_counters, normalize_digest_text, referenced_tables
+
+PS = 10 ** 12
+GIB = 1024 ** 3
+
+ORDERS_BY_CUSTOMER = "SELECT * FROM `orders` WHERE `customer_id` = ?"
+USER_NAME = "SELECT `name` FROM `users` WHERE `id` = ?"
+EVENTS_BY_KIND = "SELECT * FROM `events` WHERE `kind` = ?"
+
+INDEXES = {
+    "orders": {
+        "PRIMARY": {"unique": True, "type": "BTREE", "columns": [["id", None]]},
+        "idx_customer": {"unique": False, "type": "BTREE", "columns": [["customer_id", None]]},
+    },
+    "events": {"PRIMARY": {"unique": True, "type": "BTREE", "columns": [["id", None]]}},
+    "users": {"PRIMARY": {"unique": True, "type": "BTREE", "columns": [["id", None]]}},
+}
+
+
+def digest(text, count, avg_seconds, rows_examined, rows_sent, no_index_used=0):
+    """A performance_schema digest row with per-call figures scaled by `count`."""
+    return [text, count, avg_seconds * count * PS, avg_seconds * PS, rows_examined * count, rows_sent * count,
+            no_index_used * count, 0, 0, 0]
+
+
+class FakeServer:
+    """
+    Answers the analyzer's queries the way one MySQL server would. Each
+    SHOW GLOBAL STATUS and digest read advances counters by `per_read`, so
+    sampled runs see activity in between.
+    """
+
+    def __init__(self, digests, status, performance_schema=True, buffer_pool_bytes=GIB, schema_bytes=GIB // 2,
+                 indexes=INDEXES, log_output="FILE", per_read=None):
+        self.digests = digests
+        self.status = dict(status)
+        self.performance_schema = performance_schema
+        self.buffer_pool_bytes = buffer_pool_bytes
+        self.schema_bytes = schema_bytes
+        self.indexes = indexes
+        self.log_output = log_output
+        self.per_read = per_read or {}
+        self.queries = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def answer(self, query, params):
+        self.queries.append(query)
+        if "@@version" in query:
+            return [("8.0.36", int(self.performance_schema), self.buffer_pool_bytes, 200, self.log_output)]
+        if query.startswith("SHOW GLOBAL STATUS"):
+            rows = [(name, value) for name, value in self.status.items() if name in params]
+            for name, step in self.per_read.items():
+                self.status[name] = self.status.get(name, 0) + step
+            return rows
+        if "events_statements_summary_by_digest" in query:
+            return [(f"d{i}", *row) for i, row in enumerate(self.digests)]
+        if "mysql.slow_log" in query:
+            raise PermissionError("SELECT command denied to user for table 'slow_log'")
+        if "information_schema.tables" in query:
+            return [(self.schema_bytes,)]
+        raise AssertionError(f"unexpected query: {query}")
+
+
+class FakeCursor:
+    def __init__(self, server):
+        self.server = server
+        self.rows = []
+
+    def execute(self, query, params=()):
+        self.rows = self.server.answer(" ".join(query.split()), params)
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+def analyzer(source, target, monkeypatch, **kwargs):
+    servers = {True: source, False: target}
+
+    @contextlib.contextmanager
+    def connect(use_source):
+        yield servers[use_source]
+    monkeypatch.setattr(performance_analysis, "fetch_schema_snapshot",
+                        lambda conn, schema: {t: {"indexes": i} for t, i in copy.deepcopy(conn.indexes).items()})
+    return PerformanceAnalyzer(connect, "app", **kwargs)
+
+
+HEALTHY_STATUS = {"Innodb_buffer_pool_read_requests": 100000, "Innodb_buffer_pool_reads": 10, "Questions": 9000}
+
+
+def test_ranks_a_missing_index_and_a_regression_above_the_rest(monkeypatch):
+    source = FakeServer([digest(ORDERS_BY_CUSTOMER, 1000, 0.002, 10, 10),
+                         digest(USER_NAME, 5000, 0.001, 1, 1)], HEALTHY_STATUS)
+    target_indexes = copy.deepcopy(INDEXES)
+    del target_indexes["orders"]["idx_customer"]
+    target = FakeServer([digest(ORDERS_BY_CUSTOMER, 1000, 0.02, 50000, 10, no_index_used=1),
+                         digest(USER_NAME, 5000, 0.001, 1, 1),
+                         digest(EVENTS_BY_KIND, 100, 0.05, 200000, 5, no_index_used=1)],
+                        {"Innodb_buffer_pool_read_requests": 100000, "Innodb_buffer_pool_reads": 7000,
+                         "Innodb_buffer_pool_wait_free": 5}, schema_bytes=5 * GIB, indexes=target_indexes)
+
+    report = analyzer(source, target, monkeypatch).analyze()
+    findings = report["findings"]
+
+    assert [f["rank"] for f in findings] == list(range(1, len(findings) + 1))
+    assert [(f["kind"], f["severity"]) for f in findings] == [
+        ("regressed_statement", "critical"),
+        ("missing_index", "high"),
+        ("full_scan", "high"),
+        ("buffer_pool_hit_rate", "high"),
+        ("buffer_pool_wait_free", "medium"),
+    ]
+    regression, missing, scan, hit_rate, _ = findings
+    assert regression["impact_seconds"] == pytest.approx(18.0)
+    assert "plan changed" in regression["recommendation"]
+    assert missing["recommendation"] == "ALTER TABLE `orders` ADD KEY `idx_customer` (`customer_id`);"
+    assert missing["impact_seconds"] == pytest.approx(20.0)
+    # The orders scan is explained by the missing index, so only the events scan is reported
+    assert scan["tables"] == ["events"]
+    assert "larger than the buffer pool" in hit_rate["recommendation"]
+    assert report["summary"]["statements_compared"] == 2
+    assert report["window"] == "since server startup"
+    assert report["slow_queries"][0]["statement"] == EVENTS_BY_KIND
+
+
+def test_a_regression_without_more_rows_examined_points_at_io(monkeypatch):
+    source = FakeServer([digest(USER_NAME, 5000, 0.001, 1, 1)], HEALTHY_STATUS)
+    target = FakeServer([digest(USER_NAME, 5000, 0.004, 1, 1)], HEALTHY_STATUS)
+
+    findings = analyzer(source, target, monkeypatch).analyze()["findings"]
+
+    assert len(findings) == 1
+    assert findings[0]["kind"] == "regressed_statement"
+    assert "unchanged" in findings[0]["recommendation"]
+
+
+def test_statements_run_too_rarely_are_not_compared(monkeypatch):
+    source = FakeServer([digest(USER_NAME, 5, 0.001, 1, 1)], HEALTHY_STATUS)
+    target = FakeServer([digest(USER_NAME, 5, 0.01, 1, 1)], HEALTHY_STATUS)
+
+    report = analyzer(source, target, monkeypatch).analyze()
+
+    assert report["findings"] == []
+    assert report["summary"]["statements_compared"] == 0
+
+
+def test_reports_missing_instrumentation(monkeypatch):
+    source = FakeServer([], HEALTHY_STATUS)
+    target = FakeServer([], HEALTHY_STATUS, performance_schema=False)
+
+    report = analyzer(source, target, monkeypatch).analyze()
+
+    assert [(f["kind"], f["side"]) for f in report["findings"]] == [("instrumentation", "target")]
+    assert not any("summary_by_digest" in q for q in target.queries)
+
+
+def test_sampling_analyzes_only_the_activity_in_between(monkeypatch):
+    # Since startup the hit rate is poor, but during the sample every read was served from memory
+    status = {"Innodb_buffer_pool_read_requests": 100000, "Innodb_buffer_pool_reads": 20000}
+    target = FakeServer([], status, per_read={"Innodb_buffer_pool_read_requests": 5000})
+
+    report = analyzer(None, target, monkeypatch, sample_seconds=0.01).analyze(compare_source=False)
+
+    assert report["window"] == "last 0.01s"
+    assert report["findings"] == []
+    assert report["summary"]["target"]["buffer_pool_hit_rate"] == 1.0
+    assert report["summary"]["source"] is None
+
+
+def test_an_unreadable_slow_log_falls_back_to_digests(monkeypatch):
+    target = FakeServer([digest(USER_NAME, 10, 0.002, 1, 1)], HEALTHY_STATUS, log_output="FILE,TABLE")
+
+    report = analyzer(None, target, monkeypatch).analyze(compare_source=False)
+
+    assert any("mysql.slow_log" in q for q in target.queries)
+    assert report["slow_queries"] == [{"avg_ms": 2.0, "max_ms": 2.0, "calls": 10, "statement": USER_NAME}]
+
+
+def test_diffs_digest_counters():
+    before = {"a": {"count": 10, "total_seconds": 1.0, "max_seconds": 0.9},
+              "b": {"count": 5, "total_seconds": 1.0, "max_seconds": 0.2}}
+    after = {"a": {"count": 15, "total_seconds": 1.5, "max_seconds": 0.9},
+             "b": {"count": 5, "total_seconds": 1.0, "max_seconds": 0.2},
+             "c": {"count": 1, "total_seconds": 0.1, "max_seconds": 0.1}}
+
+    # "a"'s maximum may predate the window, so it is dropped; "c" first ran in the window, so all of it counts
+    assert diff_counters(after, before, ("count", "total_seconds"), lifetime=("max_seconds",)) == {
+        "a": {"count": 5, "total_seconds": 0.5},
+        "c": {"count": 1, "total_seconds": 0.1, "max_seconds": 0.1},
+    }
+
+
+def test_sampling_reads_every_digest_and_windows_the_statements(monkeypatch):
+    # USER_NAME is outside the top digest by lifetime latency, so a LIMITed first read would miss it
+    target = FakeServer([digest(EVENTS_BY_KIND, 100, 0.05, 1, 1), digest(USER_NAME, 5000, 0.001, 1, 1)],
+                        HEALTHY_STATUS)
+    reads = iter([target.digests,
+                  [digest(EVENTS_BY_KIND, 100, 0.05, 1, 1), digest(USER_NAME, 5010, 0.001, 1, 1),
+                   digest(ORDERS_BY_CUSTOMER, 4, 0.002, 1, 1)]])
+    answer = target.answer
+
+    def answer_with_new_digests(query, params):
+        if "events_statements_summary_by_digest" in query:
+            assert "LIMIT" not in query
+            target.digests = next(reads)
+        return answer(query, params)
+    target.answer = answer_with_new_digests
+
+    report = analyzer(None, target, monkeypatch, sample_seconds=0.01, max_digests=1).analyze(compare_source=False)
+
+    assert report["summary"]["target"]["statements"] == 1
+    assert report["slow_queries"] == [{"avg_ms": 1.0, "max_ms": None, "calls": 10, "statement": USER_NAME}]
+
+
+def test_matches_statements_by_normalized_text():
+    assert normalize_digest_text("SELECT  *\nFROM `t`") == normalize_digest_text("select * from `t`")
+    assert referenced_tables("SELECT * FROM `app`.`orders` JOIN `users` ON ...") == ["orders", "users"]
+
+
+@pytest.mark.skipif(not os.environ.get("BENCH_MYSQL_HOST"), reason="needs a MySQL server (BENCH_MYSQL_HOST)")
+def test_analyzes_the_mysql_standin():
+    pytest.importorskip("mysql.connector")
+    from standins import MySQLStandIn, SyntheticSchema
+    options = {
+        "host": os.environ["BENCH_MYSQL_HOST"],
+        "port": int(os.environ.get("BENCH_MYSQL_PORT", "3306")),
+        "user": os.environ.get("BENCH_MYSQL_USER", "root"),
+        "password": os.environ.get("BENCH_MYSQL_PASSWORD", ""),
+    }
+    standin = MySQLStandIn("bench_tests", options)
+    standin.prepare(SyntheticSchema(tables=2, rows=2000))
+    conn = standin.connect(False)
+    cursor = conn.cursor()
+    for account in range(20):
+        # No index on account_id, so every call scans the table
+        cursor.execute("SELECT COUNT(*) FROM `bench_0000` WHERE `account_id` = %s", (account,))
+        cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    @contextlib.contextmanager
+    def connect(use_source):
+        conn = standin.connect(use_source)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    report = PerformanceAnalyzer(connect, "bench_tests").analyze()
+
+    assert report["summary"]["target"]["version"]
+    assert report["summary"]["target"]["schema_bytes"] > 0
+    assert [f["rank"] for f in report["findings"]] == list(range(1, len(report["findings"]) + 1))
+    if report["summary"]["target"]["performance_schema"]:
+        assert report["summary"]["target"]["statements"] > 0
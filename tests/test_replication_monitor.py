@@ -0,0 +1,289 @@
+import contextlib
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import replication_monitor
+from checkpoint_store import CheckpointStore
+from replication_monitor import DeltaValidator, HeartbeatLagProbe, _resume_cursor, cutover_readiness
+from standins import MySQLDialectConnection
+
+SOURCE_NOW = datetime(2026, 1, 1, 1, 0, 0)
+ORDERS = {"watermark": "updated_at", "key": ["region", "id"], "hash": "(`amount` * 7 + `id`)"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return 1700000000.0 + self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(replication_monitor, "time", clock)
+    return clock
+
+
+class Replica:
+    """A source and a target `orders` table in memory, keyed on (region, id)."""
+
+    def __init__(self):
+        self.sides = {}
+        for use_source in (True, False):
+            raw = sqlite3.connect(":memory:", check_same_thread=False)
+            raw.execute("CREATE TABLE orders (region INTEGER, id INTEGER, updated_at TEXT, amount INTEGER, "
+                        "PRIMARY KEY (region, id))")
+            self.sides[use_source] = raw
+
+    @contextlib.contextmanager
+    def connect(self, use_source):
+        yield MySQLDialectConnection(self.sides[use_source], "app")
+
+    def write(self, rows, sides=(True, False)):
+        for use_source in sides:
+            self.sides[use_source].executemany("INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?)", rows)
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    monkeypatch.setattr(replication_monitor, "_source_now", lambda conn: SOURCE_NOW)
+    return Replica()
+
+
+def validator(replica, **kwargs):
+    delta = DeltaValidator(replica.connect, "app", **kwargs)
+    # The in-memory tables have no information_schema to discover them from
+    delta._tables = {"orders": dict(ORDERS)}
+    return delta
+
+
+def test_pages_through_changes_and_resumes_from_the_saved_cursor(replica, tmp_path, clock):
+    # Several rows share a watermark, so paging must continue within it by the composite key
+    replica.write([(1, i, "2026-01-01 00:50:00", i) for i in range(5)] + [(2, 0, "2026-01-01 00:51:00", 9)])
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+
+    first = validator(replica, batch_rows=2, cursors=store)
+    first.poll()
+    status = first.status()
+
+    assert (status["verified_rows"], status["cycles"], status["caught_up"]) == (6, 1, True)
+    assert store.get_cursor("delta:app.orders") == ["2026-01-01 00:51:00", [2, 0]]
+
+    replica.write([(2, 1, "2026-01-01 00:52:00", 1)])
+    restarted = validator(replica, batch_rows=2, cursors=store)
+    restarted.poll()
+
+    assert restarted.status()["verified_rows"] == 1
+    store.close()
+
+
+def test_a_backlog_larger_than_one_cycle_is_not_caught_up(replica, clock):
+    replica.write([(1, i, "2026-01-01 00:50:00", i) for i in range(5)])
+    delta = validator(replica, batch_rows=2, max_batches=2)
+
+    delta.poll()
+    assert (delta.status()["verified_rows"], delta.status()["caught_up"]) == (4, False)
+    delta.poll()
+    assert (delta.status()["verified_rows"], delta.status()["caught_up"]) == (5, True)
+
+
+def test_changes_inside_the_horizon_wait_for_the_next_cycle(replica, clock):
+    replica.write([(1, 1, "2026-01-01 00:59:58", 1)])
+
+    delta = validator(replica, horizon_seconds=5)
+    delta.poll()
+
+    assert delta.status()["verified_rows"] == 0
+
+
+def test_an_unreplicated_row_is_pending_until_it_settles(replica, clock):
+    replica.write([(1, 1, "2026-01-01 00:50:00", 1)])
+    replica.write([(1, 2, "2026-01-01 00:50:00", 2)], sides=(True,))
+    delta = validator(replica, settle_seconds=60)
+
+    delta.poll()
+    assert (delta.status()["pending_rows"], delta.status()["mismatched_rows"]) == (1, 0)
+    assert delta.status()["first_check_mismatches"] == 1
+
+    clock.now = 61
+    delta.poll()
+    status = delta.status()
+
+    assert (status["pending_rows"], status["mismatched_rows"]) == (0, 1)
+    assert status["examples"] == [{"table": "orders", "key": [1, 2], "issue": "missing on target", "seconds": 61.0}]
+
+
+def test_a_pending_row_converges_once_replicated(replica, clock):
+    replica.write([(1, 1, "2026-01-01 00:50:00", 1)], sides=(True,))
+    replica.write([(1, 1, "2026-01-01 00:50:00", 5)], sides=(False,))
+    delta = validator(replica)
+    delta.poll()
+    assert delta.status()["pending_rows"] == 1
+
+    replica.write([(1, 1, "2026-01-01 00:50:00", 1)], sides=(False,))
+    delta.poll()
+    status = delta.status()
+
+    assert (status["pending_rows"], status["mismatched_rows"], status["converged_rows"]) == (0, 0, 1)
+
+
+def test_a_row_still_changing_on_the_source_restarts_its_settle_clock(replica, clock):
+    replica.write([(1, 1, "2026-01-01 00:50:00", 1)], sides=(True,))
+    delta = validator(replica, settle_seconds=60)
+    delta.poll()
+
+    clock.now = 50
+    replica.sides[True].execute("UPDATE orders SET amount = 2")
+    delta.poll()
+    clock.now = 100
+
+    assert (delta.status()["pending_rows"], delta.status()["mismatched_rows"]) == (1, 0)
+    clock.now = 111
+    assert delta.status()["mismatched_rows"] == 1
+
+
+def test_rows_beyond_max_pending_are_counted_as_overflow(replica, clock):
+    replica.write([(1, i, "2026-01-01 00:50:00", i) for i in range(3)], sides=(True,))
+    delta = validator(replica, max_pending=1)
+
+    delta.poll()
+    status = delta.status()
+
+    assert (status["pending_rows"], status["pending_overflow"]) == (1, 2)
+
+
+def test_a_failed_cycle_is_reported(replica, clock):
+    delta = validator(replica)
+    replica.sides[True].execute("DROP TABLE orders")
+
+    delta.poll()
+
+    assert delta.status()["cycles"] == 0
+    assert "no such table" in delta.status()["error"]
+
+
+def test_resumes_cursors_saved_in_older_shapes():
+    assert _resume_cursor(["2026-01-01", 5], 1) == ("2026-01-01", (5,))
+    assert _resume_cursor(["2026-01-01", [1, 2]], 2) == ("2026-01-01", (1, 2))
+    assert _resume_cursor(["2026-01-01", 5], 2) == ("2026-01-01", None)
+    assert _resume_cursor(["2026-01-01", None], 2) == ("2026-01-01", None)
+
+
+class HeartbeatServers:
+    """Source and target that answer the probe's heartbeat statements; writes reach the target unless `lagging`."""
+
+    def __init__(self, clock, write_seconds=0.1):
+        self.clock = clock
+        self.write_seconds = write_seconds
+        self.target_seq = None
+        self.lagging = False
+        self.target_down = False
+
+    @contextlib.contextmanager
+    def connect(self, use_source):
+        yield None if self.target_down and not use_source else HeartbeatCursor(self)
+
+
+class HeartbeatCursor:
+    def __init__(self, servers):
+        self.servers = servers
+        self.row = None
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=()):
+        if query.startswith("INSERT"):
+            self.servers.clock.now += self.servers.write_seconds
+            if not self.servers.lagging:
+                self.servers.target_seq = params[0]
+        elif query.startswith("SELECT"):
+            seq = self.servers.target_seq
+            self.row = None if seq is None else (seq,)
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+def test_lag_grows_while_heartbeats_wait_and_drops_once_delivered(clock):
+    servers = HeartbeatServers(clock)
+    servers.lagging = True
+    probe = HeartbeatLagProbe(servers.connect, "app")
+
+    probe.poll()
+    assert probe.status()["error"] == "heartbeat row has not reached the target yet"
+    for _ in range(3):
+        clock.now += 1
+        probe.poll()
+    waiting = probe.status()
+    assert waiting["unreplicated_heartbeats"] == 4
+    # The first heartbeat went out at 0.1s and the last poll read the target at 3.4s
+    assert waiting["current_lag_seconds"] == pytest.approx(3.3)
+
+    servers.lagging = False
+    clock.now += 1
+    probe.poll()
+    status = probe.status()
+
+    assert status["error"] is None
+    assert status["unreplicated_heartbeats"] == 0
+    assert status["current_lag_seconds"] == pytest.approx(0.0)
+    assert status["target_seq"] == status["source_seq"]
+    assert (status["samples"], status["max_seconds"]) == (5, pytest.approx(3.3))
+
+
+def test_an_unreachable_target_keeps_measuring_the_wait(clock):
+    servers = HeartbeatServers(clock)
+    probe = HeartbeatLagProbe(servers.connect, "app", max_pending=2)
+    servers.target_down = True
+
+    for _ in range(4):
+        probe.poll()
+        clock.now += 1
+
+    status = probe.status()
+    assert status["error"] == "could not connect to the target database"
+    assert status["polls"] == 0
+    # Only the newest heartbeats are remembered, so the wait is measured from the oldest one kept (2.3s)
+    assert status["unreplicated_heartbeats"] == 2
+    assert status["current_lag_seconds"] == pytest.approx(1.1)
+
+
+READY_LAG = {"samples": 30, "error": None, "current_lag_seconds": 0.4, "p95_seconds": 1.2}
+READY_DELTA = {"error": None, "cycles": 3, "caught_up": True, "mismatched_rows": 0, "settle_seconds": 60,
+               "pending_overflow": 0}
+
+
+def test_ready_when_every_condition_holds():
+    assert cutover_readiness(READY_LAG, READY_DELTA, {"state": "RUNNING", "phase": "CDC"}) == (True, [])
+
+
+@pytest.mark.parametrize("lag, delta, dms, blocker", [
+    ({}, {}, {"state": "FAILED"}, "DMS job is FAILED"),
+    ({}, {}, {"state": "RUNNING", "phase": "FULL_DUMP"}, "DMS job is in phase FULL_DUMP, not CDC"),
+    ({"samples": 3}, {}, None, "only 3 heartbeat lag samples so far (need 10)"),
+    ({"error": "access denied"}, {}, None, "heartbeat: access denied"),
+    ({"current_lag_seconds": None}, {}, None, "current lag Nones exceeds 5.0s"),
+    ({"current_lag_seconds": 9.0}, {}, None, "current lag 9.0s exceeds 5.0s"),
+    ({"p95_seconds": 7.5}, {}, None, "p95 lag 7.5s exceeds 5.0s"),
+    ({}, {"error": "no such table"}, None, "delta validation: no such table"),
+    ({}, {"cycles": 0}, None, "delta validation has not completed a cycle"),
+    ({}, {"caught_up": False}, None, "delta validation has a backlog of changed rows"),
+    ({}, {"mismatched_rows": 4}, None, "4 changed rows still differ after 60s"),
+    ({}, {"pending_overflow": 2}, None, "2 differing rows were not tracked (pending limit reached)"),
+])
+def test_each_unmet_condition_blocks_the_cutover(lag, delta, dms, blocker):
+    ready, blockers = cutover_readiness(dict(READY_LAG, **lag), dict(READY_DELTA, **delta), dms)
+
+    assert not ready
+    assert blockers == [blocker]
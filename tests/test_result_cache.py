@@ -0,0 +1,111 @@
+import pytest
+
+import result_cache
+from result_cache import ResultCache
+from tool_registry import ToolRegistry
+
+TABLE = {"type": "object", "properties": {"table": {"type": "string"}}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_cache, "time", clock)
+    return clock
+
+
+def test_equivalent_arguments_share_a_key():
+    assert ResultCache.key("count", {"a": 1, "b": 2}) == ResultCache.key("count", {"b": 2, "a": 1})
+    assert ResultCache.key("count", {"a": 1}) != ResultCache.key("size", {"a": 1})
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = ResultCache()
+    cache.put(("count", "{}"), 10, ttl=60)
+    cache.put(("size", "{}"), 99, ttl=300)
+
+    clock.now = 59.9
+    assert cache.get(("count", "{}")) == (True, 10)
+    clock.now = 60.0
+    assert cache.get(("count", "{}")) == (False, None)
+    assert cache.get(("size", "{}")) == (True, 99)
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 2, 1, 0.667)
+
+
+def test_the_least_recently_used_entry_is_evicted(clock):
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1, ttl=60)
+    cache.put("b", 2, ttl=60)
+    cache.get("a")
+
+    cache.put("c", 3, ttl=60)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.get("c") == (True, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidates_one_tool_or_everything(clock):
+    cache = ResultCache()
+    for tool in ("count", "size"):
+        cache.put(ResultCache.key(tool, {}), tool, ttl=60)
+
+    cache.invalidate("count")
+    assert cache.get(ResultCache.key("count", {})) == (False, None)
+    assert cache.get(ResultCache.key("size", {})) == (True, "size")
+
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 2
+
+
+def counting_tool(calls):
+    def count(config, table):
+        calls.append(table)
+        return len(calls)
+    return count
+
+
+def test_only_read_only_tools_can_be_cached():
+    registry = ToolRegistry(cache=ResultCache())
+
+    with pytest.raises(ValueError, match="must be read-only"):
+        registry.register("write_rows", counting_tool([]), parameters=TABLE, cache_ttl=60)
+    assert "write_rows" not in registry
+
+
+def test_read_only_tools_without_a_ttl_always_run(clock):
+    calls = []
+    registry = ToolRegistry(cache=ResultCache())
+    registry.register("progress", counting_tool(calls), parameters=TABLE, read_only=True)
+
+    assert [registry.call("progress", {}, ["t"]) for _ in range(2)] == [1, 2]
+    assert registry.cache.stats()["entries"] == 0
+
+
+def test_cached_outputs_expire_and_a_migration_flushes_them(clock):
+    calls = []
+    registry = ToolRegistry(cache=ResultCache())
+    registry.register("count", counting_tool(calls), parameters=TABLE, read_only=True, cache_ttl=60)
+    registry.register("migrate", lambda config: "migrated", invalidates_cache=True)
+
+    assert registry.call("count", {}, ["t"]) == 1
+    assert registry.call("count", {}, kwargs={"table": "t"}) == 1
+    assert registry.call("count", {}, ["other"]) == 2
+
+    clock.now = 61
+    assert registry.call("count", {}, ["t"]) == 3
+    registry.call("migrate", {})
+    assert registry.call("count", {}, ["t"]) == 4
+    assert registry.call("count", {}, ["other"]) == 5
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+import result_store
+from result_store import ResultStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_store, "time", clock)
+    return clock
+
+
+def validation_report(tables, mismatched=()):
+    return json.dumps({
+        "schema": "app",
+        "tables": tables,
+        "mismatched": len(mismatched),
+        "results": [{"table": f"t{i:04d}", "match": i not in mismatched, "row_count": {"source": i, "target": i}}
+                    for i in range(tables)],
+    }, separators=(",", ":"))
+
+
+def test_small_outputs_pass_through():
+    store = ResultStore(max_chars=1000)
+
+    assert store.compact("get_row_count", '{"rows":5}') == '{"rows":5}'
+    assert store.compact("validate_tables", {"not": "a string"}) == {"not": "a string"}
+
+
+def test_the_digest_fits_the_budget_and_surfaces_mismatches():
+    store = ResultStore(max_chars=1000)
+    output = validation_report(500, mismatched={7, 300})
+
+    digest = json.loads(store.compact("validate_tables", output))
+
+    assert len(store.compact("validate_tables", output)) <= 1000
+    assert digest["truncated"] is True
+    assert digest["full_chars"] == len(output)
+    assert digest["digest"]["schema"] == "app"
+    results = digest["digest"]["results"]
+    assert (results["count"], results["mismatched"]) == (500, 2)
+    assert [r["table"] for r in results["first"]] == ["t0007", "t0300"]
+
+
+def test_identical_outputs_share_one_handle():
+    store = ResultStore(max_chars=200)
+    output = "x" * 500
+
+    first = json.loads(store.compact("get_logs", output))
+    second = json.loads(store.compact("get_logs", output))
+    other = json.loads(store.compact("get_logs", output + "y"))
+
+    assert first["handle"] == second["handle"] != other["handle"]
+    assert len(store._entries) == 2
+
+
+def test_pages_through_a_list_field():
+    store = ResultStore(max_chars=1000, page_items=50)
+    handle = json.loads(store.compact("validate_tables", validation_report(120)))["handle"]
+
+    pages = [json.loads(store.fetch(handle, page, key="results")) for page in (1, 2, 3, 4)]
+
+    assert [p["pages"] for p in pages] == [3, 3, 3, 3]
+    assert [len(p["items"]) for p in pages] == [50, 50, 20, 0]
+    assert pages[1]["items"][0]["table"] == "t0050"
+    assert pages[0]["total_items"] == 120
+    with pytest.raises(KeyError, match="no list field 'tables'"):
+        store.fetch(handle, key="tables")
+
+
+def test_pages_through_raw_text():
+    store = ResultStore(max_chars=200)
+    output = "".join(chr(ord("a") + i % 26) for i in range(450))
+    digest = json.loads(store.compact("get_logs", output))
+
+    pages = [json.loads(store.fetch(digest["handle"], page)) for page in (1, 2, 3)]
+
+    assert digest["text_pages"] == 3
+    assert digest["head"] == output[:100]
+    assert "".join(p["text"] for p in pages) == output
+
+
+def test_entries_expire_after_the_ttl(clock):
+    store = ResultStore(max_chars=200, ttl=60)
+    handle = json.loads(store.compact("get_logs", "x" * 500))["handle"]
+
+    clock.now = 59
+    assert json.loads(store.fetch(handle))["page"] == 1
+    clock.now = 60
+    with pytest.raises(KeyError, match="unknown or has expired"):
+        store.fetch(handle)
+    assert handle not in store._entries
+
+
+def test_evicts_the_least_recently_used_entry():
+    store = ResultStore(max_chars=200, max_entries=2)
+    handles = [json.loads(store.compact("get_logs", c * 500))["handle"] for c in "ab"]
+
+    store.fetch(handles[0])
+    newest = json.loads(store.compact("get_logs", "c" * 500))["handle"]
+
+    assert list(store._entries) == [handles[0], newest]
+    with pytest.raises(KeyError):
+        store.fetch(handles[1])
@@ -0,0 +1,89 @@
+import contextlib
+import threading
+import time
+
+import pytest
+
+import sampled_validation
+from conftest import sqlite_row_hash_expression, synthetic_layout
+from sampled_validation import SampledValidator, mismatch_rate_upper_bound, required_sample_size
+
+
+@pytest.fixture
+def layout(synthetic, monkeypatch):
+    """Table descriptions from the synthetic layout, since the stand-in has no information_schema.columns."""
+    tables = synthetic_layout(synthetic)
+
+    def describe_table(conn, schema, table_name):
+        if table_name not in tables:
+            raise LookupError(f"table '{table_name}' does not exist")
+        return tables[table_name]
+    monkeypatch.setattr(sampled_validation, "describe_table", describe_table)
+    monkeypatch.setattr(sampled_validation, "row_hash_expression", sqlite_row_hash_expression)
+    return tables
+
+
+def delete_rows(standin, use_source, table_name, where):
+    conn = standin.connect(use_source)
+    try:
+        conn.raw.execute(f"DELETE FROM `{table_name}` WHERE {where}")
+        conn.raw.commit()
+    finally:
+        conn.close()
+
+
+def test_identical_tables_pass(connect, layout):
+    report = SampledValidator(connect, "bench", sample_rows=500, seed=7).run()
+
+    assert report["tables"] == 3
+    assert report["passed"] == 3
+    assert all(r["sampled_rows"] >= 500 and r["mismatched_rows"] == 0 for r in report["results"])
+    first = report["results"][0]
+    assert first["mismatch_rate_upper_bound"] == pytest.approx(mismatch_rate_upper_bound(0, first["sampled_rows"]),
+                                                               abs=1e-6)
+
+
+def test_rows_missing_on_the_target_fail(standin, connect, layout):
+    delete_rows(standin, False, "bench_0001", "id % 10 = 0")
+
+    report = SampledValidator(connect, "bench", sample_rows=required_sample_size(0.1), seed=7).run()
+    failed = report["results"][0]
+
+    assert report["failed"] == 1
+    assert failed["table"] == "bench_0001"
+    assert failed["mismatched_rows"] > 0
+    assert {e["issue"] for e in failed["examples"]} == {"missing on target"}
+    assert all(e["key"] % 10 == 0 for e in failed["examples"])
+
+
+def test_requested_tables_missing_on_the_source_fail(connect, layout):
+    report = SampledValidator(connect, "bench", sample_rows=50, seed=7).run(tables=["bench_0000", "bench_0099"])
+
+    assert [(r["table"], r["verdict"]) for r in report["results"]] == [("bench_0099", "fail"), ("bench_0000", "pass")]
+    assert report["results"][0]["error"] == "table missing on source"
+    assert report["failed"] == 1
+
+
+def test_source_queries_stay_within_source_concurrency(connect, layout):
+    lock = threading.Lock()
+    open_source = {"now": 0, "peak": 0}
+
+    @contextlib.contextmanager
+    def counting_connect(use_source):
+        with connect(use_source) as conn:
+            if use_source:
+                with lock:
+                    open_source["now"] += 1
+                    open_source["peak"] = max(open_source["peak"], open_source["now"])
+                # A slow source keeps connections open long enough for the pools to overlap
+                time.sleep(0.02)
+            try:
+                yield conn
+            finally:
+                if use_source:
+                    with lock:
+                        open_source["now"] -= 1
+
+    SampledValidator(counting_connect, "bench", sample_rows=200, batch_rows=20, source_concurrency=2).run()
+
+    assert open_source["peak"] <= 2
@@ -0,0 +1,173 @@
+import contextlib
+import copy
+import json
+
+import pytest
+
+import schema_compare
+from schema_compare import SchemaComparer, SchemaSnapshotCache, create_table_ddl, diff_table
+from table_validation import HEARTBEAT_TABLE
+
+
+def column(type_, nullable=False, default=None, extra="", collation=None, generation=None):
+    return {"type": type_, "nullable": nullable, "default": default, "extra": extra,
+            "collation": collation, "generation": generation}
+
+
+ORDERS = {
+    "options": {"engine": "InnoDB", "collation": "utf8mb4_0900_ai_ci"},
+    "columns": {
+        "id": column("bigint", extra="auto_increment"),
+        "customer_id": column("bigint"),
+        "note": column("varchar(200)", nullable=True, default="n/a", collation="utf8mb4_0900_ai_ci"),
+        "created_at": column("datetime", default="CURRENT_TIMESTAMP"),
+    },
+    "indexes": {
+        "PRIMARY": {"unique": True, "type": "BTREE", "columns": [["id", None]]},
+        "idx_note": {"unique": False, "type": "BTREE", "columns": [["note", 20]]},
+    },
+    "foreign_keys": {
+        "fk_customer": {"columns": ["customer_id"], "references": "customers", "referenced_columns": ["id"]},
+    },
+}
+
+
+def orders(**changes):
+    table = copy.deepcopy(ORDERS)
+    for section, members in changes.items():
+        table[section].update(members)
+        table[section] = {k: v for k, v in table[section].items() if v is not None}
+    return table
+
+
+def test_identical_tables_have_no_diff():
+    assert diff_table("orders", ORDERS, copy.deepcopy(ORDERS)) == ({"table": "orders"}, [])
+
+
+def test_column_differences_and_their_ddl():
+    target = orders(columns={"note": None, "customer_id": column("int"), "legacy": column("int", nullable=True)})
+
+    diff, ddl = diff_table("orders", ORDERS, target)
+
+    assert diff["columns"] == {
+        "missing_in_target": ["note"],
+        "extra_in_target": ["legacy"],
+        "changed": [{"column": "customer_id", "source": {"type": "bigint"}, "target": {"type": "int"}}],
+    }
+    assert ddl == [
+        "ALTER TABLE `orders` ADD COLUMN `note` varchar(200) COLLATE utf8mb4_0900_ai_ci NULL DEFAULT 'n/a' "
+        "AFTER `customer_id`, MODIFY COLUMN `customer_id` bigint NOT NULL;",
+        # Dropping target columns loses data, so it is left for a person to run
+        "-- ALTER TABLE `orders` DROP COLUMN `legacy`;",
+    ]
+
+
+def test_index_and_foreign_key_differences_and_their_ddl():
+    target = orders(
+        indexes={"idx_note": {"unique": True, "type": "BTREE", "columns": [["note", 20]]},
+                 "idx_extra": {"unique": False, "type": "BTREE", "columns": [["created_at", None]]}},
+        foreign_keys={"fk_customer": {"columns": ["customer_id"], "references": "clients",
+                                      "referenced_columns": ["id"]}},
+        options={"engine": "MyISAM"},
+    )
+
+    diff, ddl = diff_table("orders", ORDERS, target)
+
+    assert diff["indexes"] == {"missing_in_target": [], "extra_in_target": ["idx_extra"], "changed": ["idx_note"]}
+    assert diff["foreign_keys"] == {"missing_in_target": [], "extra_in_target": [], "changed": ["fk_customer"]}
+    assert diff["options"]["target"]["engine"] == "MyISAM"
+    assert ddl == [
+        # A changed constraint is dropped in its own statement before it is re-added
+        "ALTER TABLE `orders` DROP FOREIGN KEY `fk_customer`;",
+        "ALTER TABLE `orders` DROP INDEX `idx_note`, ADD KEY `idx_note` (`note`(20)), "
+        "ADD CONSTRAINT `fk_customer` FOREIGN KEY (`customer_id`) REFERENCES `customers` (`id`), ENGINE=InnoDB;",
+        "-- ALTER TABLE `orders` DROP INDEX `idx_extra`;",
+    ]
+
+
+def test_create_table_ddl_for_a_missing_table():
+    assert create_table_ddl("orders", ORDERS) == (
+        "CREATE TABLE `orders` (\n"
+        "  `id` bigint NOT NULL auto_increment,\n"
+        "  `customer_id` bigint NOT NULL,\n"
+        "  `note` varchar(200) COLLATE utf8mb4_0900_ai_ci NULL DEFAULT 'n/a',\n"
+        "  `created_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,\n"
+        "  PRIMARY KEY (`id`),\n"
+        "  KEY `idx_note` (`note`(20)),\n"
+        "  CONSTRAINT `fk_customer` FOREIGN KEY (`customer_id`) REFERENCES `customers` (`id`)\n"
+        ") ENGINE=InnoDB DEFAULT COLLATE=utf8mb4_0900_ai_ci;"
+    )
+
+
+class Endpoints:
+    """Source and target schemas as definitions, read through a stubbed information_schema."""
+
+    def __init__(self, source, target):
+        self.tables = {"source": source, "target": target}
+        self.versions = {"source": "v1", "target": "v1"}
+        self.reads = []
+
+    @contextlib.contextmanager
+    def connect(self, use_source):
+        yield "source" if use_source else "target"
+
+    def fetch_schema_snapshot(self, side, schema):
+        self.reads.append(side)
+        return copy.deepcopy(self.tables[side])
+
+
+@pytest.fixture
+def endpoints(monkeypatch):
+    endpoints = Endpoints(
+        {"orders": ORDERS, "customers": orders(), "audit": orders(), HEARTBEAT_TABLE: orders()},
+        {"orders": orders(columns={"customer_id": column("int")}), "customers": orders(), "scratch": orders()},
+    )
+    monkeypatch.setattr(schema_compare, "probe_schema_version", lambda side, schema: endpoints.versions[side])
+    monkeypatch.setattr(schema_compare, "fetch_schema_snapshot", endpoints.fetch_schema_snapshot)
+    return endpoints
+
+
+def test_reports_only_the_differences(endpoints):
+    report = json.loads(SchemaComparer(endpoints.connect, "app").compare_json())
+
+    assert (report["source_tables"], report["target_tables"], report["matching"]) == (4, 3, 1)
+    assert report["missing_in_target"] == ["audit"]
+    assert report["extra_in_target"] == ["scratch"]
+    assert [d["table"] for d in report["differing"]] == ["orders"]
+    assert not report["compatible"]
+    assert report["ddl"][0].startswith("CREATE TABLE `audit` (")
+    assert report["ddl"][1:] == ["ALTER TABLE `orders` MODIFY COLUMN `customer_id` bigint NOT NULL;",
+                                 "-- DROP TABLE `scratch`;"]
+
+
+def test_compares_only_the_requested_tables(endpoints):
+    report = SchemaComparer(endpoints.connect, "app").compare(tables=["customers", "scratch"])
+
+    assert (report["matching"], report["extra_in_target"], report["differing"]) == (1, ["scratch"], [])
+    # Extra target tables do not stop the target from taking the source's data
+    assert report["compatible"]
+
+
+def test_snapshots_are_reused_until_the_schema_version_changes(endpoints):
+    comparer = SchemaComparer(endpoints.connect, "app", cache=SchemaSnapshotCache())
+
+    assert comparer.compare()["snapshots"] == {"source": "fresh", "target": "fresh"}
+    assert comparer.compare()["snapshots"] == {"source": "cached", "target": "cached"}
+
+    endpoints.versions["target"] = "v2"
+    endpoints.tables["target"]["orders"] = orders()
+    report = comparer.compare()
+
+    assert report["snapshots"] == {"source": "cached", "target": "fresh"}
+    assert report["differing"] == []
+    assert comparer.compare(refresh=True)["snapshots"] == {"source": "fresh", "target": "fresh"}
+    assert len(endpoints.reads) == 5
+
+
+def test_an_unreachable_side_raises(endpoints):
+    @contextlib.contextmanager
+    def source_down(use_source):
+        yield None if use_source else "target"
+
+    with pytest.raises(ConnectionError, match="source database"):
+        SchemaComparer(source_down, "app").compare()
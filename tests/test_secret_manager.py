@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("google.cloud.secretmanager")
+
+from tools import secret_manager
+from tools.secret_manager import SecretManager
+
+
+class FakeClient:
+    def secret_version_path(self, project_id, secret_id, version):
+        return f"projects/{project_id}/secrets/{secret_id}/versions/{version}"
+
+
+def no_credentials():
+    raise RuntimeError("default credentials were not found")
+
+
+@pytest.fixture(autouse=True)
+def fresh_singleton(monkeypatch):
+    monkeypatch.setattr(SecretManager, "_instance", None)
+
+
+def test_a_configured_project_surfaces_client_errors(monkeypatch):
+    monkeypatch.setenv("GCP_PROJECT_ID", "my-project")
+    monkeypatch.setattr(secret_manager.secretmanager, "SecretManagerServiceClient", no_credentials)
+
+    with pytest.raises(RuntimeError, match="default credentials"):
+        SecretManager()
+
+    # The failed construction is not cached in the singleton
+    monkeypatch.setattr(secret_manager.secretmanager, "SecretManagerServiceClient", FakeClient)
+    assert SecretManager().project_id == "my-project"
+
+
+def test_without_a_project_missing_credentials_disable_lookups(monkeypatch):
+    monkeypatch.delenv("GCP_PROJECT_ID", raising=False)
+    monkeypatch.setattr(secret_manager.secretmanager, "SecretManagerServiceClient", no_credentials)
+
+    manager = SecretManager()
+
+    assert manager.project_id is None
+    assert manager.get_secret("gemini_api_key") is None
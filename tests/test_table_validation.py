@@ -0,0 +1,103 @@
+import contextlib
+import json
+
+import pytest
+
+from checkpoint_store import CheckpointStore
+from table_validation import HEARTBEAT_TABLE, BulkValidator
+
+
+def execute(standin, use_source, *statements):
+    conn = standin.connect(use_source)
+    try:
+        for statement in statements:
+            conn.raw.execute(statement)
+        conn.raw.commit()
+    finally:
+        conn.close()
+
+
+def drop_table(standin, use_source, table_name):
+    execute(standin, use_source, f"DROP TABLE `{table_name}`",
+            f"DELETE FROM information_schema.tables WHERE table_name = '{table_name}'")
+
+
+def test_identical_schemas_match(connect):
+    report = BulkValidator(connect, "bench").run()
+
+    assert (report["tables"], report["matched"], report["mismatched"], report["errors"]) == (3, 3, 0, 0)
+    first = report["results"][0]
+    assert first["table"] == "bench_0000"
+    assert first["row_count"] == {"source": 2500, "target": 2500, "match": True}
+    assert first["checksum"]["match"]
+
+
+def test_mismatched_and_missing_tables_are_listed_first(standin, synthetic, connect):
+    standin.prepare(synthetic, mismatched_tables=["bench_0002"])
+    drop_table(standin, False, "bench_0001")
+
+    report = BulkValidator(connect, "bench").run()
+
+    assert (report["matched"], report["mismatched"], report["errors"]) == (1, 1, 1)
+    assert [r["table"] for r in report["results"]] == ["bench_0001", "bench_0002", "bench_0000"]
+    assert report["results"][0] == {"table": "bench_0001", "match": False, "error": "table missing on target"}
+    assert report["results"][1]["row_count"] == {"source": 2500, "target": 2499, "match": False}
+
+
+def test_requested_tables_missing_on_the_source_fail(connect):
+    report = BulkValidator(connect, "bench").run(checks=["row_count"], tables=["bench_0000", "bench_0099"])
+
+    assert report["checks"] == ["row_count"]
+    assert [r["table"] for r in report["results"]] == ["bench_0099", "bench_0000"]
+    assert report["results"][0] == {"table": "bench_0099", "match": False, "error": "table missing on source"}
+    assert "checksum" not in report["results"][1]
+
+
+def test_a_table_dropped_after_listing_is_an_error_not_a_mismatch(standin, connect):
+    # Statistics still list the table, but CHECKSUM TABLE and COUNT(*) find nothing
+    execute(standin, False, "DROP TABLE `bench_0000`")
+
+    report = BulkValidator(connect, "bench").run()
+    failed = report["results"][0]
+
+    assert failed["error"] == "checksum: table 'bench_0000' does not exist"
+    assert failed["table"] == "bench_0000"
+    assert failed["error"].startswith("row_count: no such table") or failed["error"].startswith("checksum: ")
+
+
+def test_the_heartbeat_table_is_left_out(standin, connect):
+    for use_source in (True, False):
+        execute(standin, use_source, f"CREATE TABLE `{HEARTBEAT_TABLE}` (seq INTEGER)",
+                f"INSERT INTO information_schema.tables VALUES "
+                f"('bench', '{HEARTBEAT_TABLE}', 'BASE TABLE', 1, 16.0, 0.0, '2026-01-01 00:00:00')")
+
+    report = BulkValidator(connect, "bench").run()
+
+    assert HEARTBEAT_TABLE not in [r["table"] for r in report["results"]]
+
+
+def test_an_unreachable_side_fails_the_run(connect):
+    @contextlib.contextmanager
+    def target_down(use_source):
+        if use_source:
+            with connect(True) as conn:
+                yield conn
+        else:
+            yield None
+
+    # Without the target's table listing nothing can be compared, so the tool reports one error
+    with pytest.raises(ConnectionError, match="target database"):
+        BulkValidator(target_down, "bench").run(tables=["bench_0000"])
+
+
+def test_unchanged_matching_tables_are_skipped_on_rerun(connect, tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+
+    first = BulkValidator(connect, "bench", checkpoints=store).run()
+    second = json.loads(BulkValidator(connect, "bench", checkpoints=store).run_json())
+
+    assert first["skipped_unchanged"] == 0
+    assert second["skipped_unchanged"] == 3
+    assert second["results"][0]["unchanged"] is True
+    assert second["results"][0]["row_count"] == first["results"][0]["row_count"]
+    store.close()
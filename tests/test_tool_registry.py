@@ -0,0 +1,166 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from result_cache import ResultCache
+from tool_registry import ToolError, ToolRegistry, parse_tool_code
+
+CHECKSUM_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "table_names": {"type": "string"},
+        "mode": {"type": "string", "enum": ["checksum", "chunked"], "default": "checksum"},
+        "chunk_rows": {"type": "integer", "minimum": 1},
+        "exact": {"type": "boolean", "default": False},
+        "tables": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["table_names"],
+}
+
+
+@pytest.fixture
+def registry():
+    registry = ToolRegistry()
+    registry.register("checksum_table", lambda config, **arguments: arguments, read_only=True,
+                      parameters=CHECKSUM_PARAMETERS)
+    return registry
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(4) as executor:
+        yield executor
+
+
+def test_binds_positional_and_keyword_arguments_with_defaults(registry):
+    assert registry.call("checksum_table", {}, ["orders"], {"chunk_rows": 500}) == {
+        "table_names": "orders", "mode": "checksum", "chunk_rows": 500, "exact": False,
+    }
+
+
+def test_coerces_quoted_values(registry):
+    arguments = registry.call("checksum_table", {}, kwargs={
+        "table_names": "orders", "chunk_rows": " 500 ", "exact": "yes", "tables": "a; b;",
+    })
+
+    assert (arguments["chunk_rows"], arguments["exact"], arguments["tables"]) == (500, True, ["a", "b"])
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({}, "missing required argument 'table_names'"),
+    ({"table_names": "t", "mode": "fast"}, "must be one of"),
+    ({"table_names": "t", "chunk_rows": 0}, "must be at least 1"),
+    ({"table_names": "t", "chunk_rows": True}, "'chunk_rows' must be of type integer"),
+    ({"table_names": "t", "chunk_rows": "many"}, "'chunk_rows' must be of type integer"),
+    ({"table_names": "t", "exact": "maybe"}, "'exact' must be of type boolean"),
+    ({"table_names": "t", "tables": [1]}, "'tables' must be of type string"),
+    ({"table_names": "t", "verbose": True}, "unexpected argument"),
+])
+def test_rejects_arguments_that_do_not_match_the_schema(registry, kwargs, message):
+    with pytest.raises(ToolError, match=message):
+        registry.call("checksum_table", {}, kwargs=kwargs)
+
+
+def test_rejects_unknown_tools_and_extra_positionals(registry):
+    with pytest.raises(ToolError, match="'drop_everything' is not recognized"):
+        registry.call("drop_everything", {})
+    with pytest.raises(ToolError, match="too many positional"):
+        registry.call("checksum_table", {}, ["t", "chunked", 5, True, ["a"], "extra"])
+
+
+@pytest.mark.parametrize("tool_code, parsed", [
+    ("get_row_count(users)", ("get_row_count", ["users"], {})),
+    ("checksum_table(orders, mode=chunked)", ("checksum_table", ["orders"], {"mode": "chunked"})),
+    ('checksum_table("a,b", mode="chunked")', ("checksum_table", ["a,b"], {"mode": "chunked"})),
+    ("print(get_row_count('a,b'))", ("get_row_count", ["a,b"], {})),
+    ("get_db_size", ("get_db_size", [], {})),
+])
+def test_parses_legacy_tool_code(tool_code, parsed):
+    assert parse_tool_code(tool_code) == parsed
+
+
+@pytest.mark.parametrize("tool_code", ["get_row_count(", "os.system('ls')", "get_row_count(open('x'))", "1 + 1"])
+def test_rejects_tool_code_that_is_not_a_literal_call(tool_code):
+    with pytest.raises(ToolError, match="Invalid tool_code format"):
+        parse_tool_code(tool_code)
+
+
+def test_legacy_key_value_strings_bind_by_name(registry):
+    name, args, kwargs = parse_tool_code("checksum_table('orders', 'mode=chunked', 'chunk_rows=1000')")
+
+    arguments = registry.call(name, {}, args, kwargs)
+
+    assert (arguments["table_names"], arguments["mode"], arguments["chunk_rows"]) == ("orders", "chunked", 1000)
+
+
+def test_batches_run_read_only_calls_concurrently_and_writes_alone(executor):
+    registry = ToolRegistry()
+    events, lock = [], threading.Lock()
+    both_reads_started = threading.Barrier(2, timeout=5)
+
+    def read(config, name):
+        both_reads_started.wait()
+        with lock:
+            events.append(name)
+        return name
+
+    def write(config, name):
+        with lock:
+            events.append(name)
+        return name
+    parameters = {"type": "object", "properties": {"name": {"type": "string"}}}
+    registry.register("read", read, read_only=True, parameters=parameters)
+    registry.register("write", write, parameters=parameters)
+
+    outputs = registry.call_batch([("read", ["r1"], {}), ("read", ["r2"], {}), ("write", ["w"], {}),
+                                   ("read", ["r3"], {}), ("read", ["r4"], {})], {}, executor)
+
+    assert outputs == ["r1", "r2", "w", "r3", "r4"]
+    # The write waited for the first two reads and ran before the next two started
+    assert sorted(events[:2]) == ["r1", "r2"] and events[2] == "w" and sorted(events[3:]) == ["r3", "r4"]
+
+
+def test_a_failing_call_becomes_an_error_envelope_without_losing_the_batch(registry, executor):
+    def broken(config):
+        raise ConnectionError("could not connect to the source database")
+    registry.register("broken", broken, read_only=True)
+
+    outputs = registry.call_batch([("checksum_table", ["t"], {}), ("broken", [], {}), ("missing", [], {}),
+                                   ("checksum_table", [], {})], {}, executor)
+
+    assert outputs[0]["table_names"] == "t"
+    assert outputs[1:] == [
+        "Error: could not connect to the source database",
+        "Error: Tool 'missing' is not recognized.",
+        "Error: checksum_table() missing required argument 'table_names'",
+    ]
+
+
+def test_caches_read_only_outputs_but_not_errors():
+    calls = []
+
+    def count(config, table):
+        calls.append(table)
+        return "Error: table is locked" if len(calls) == 1 else len(calls)
+    registry = ToolRegistry(cache=ResultCache())
+    registry.register("count", count, read_only=True, cache_ttl=60,
+                      parameters={"type": "object", "properties": {"table": {"type": "string"}}})
+
+    assert registry.call("count", {}, ["t"]) == "Error: table is locked"
+    assert registry.call("count", {}, kwargs={"table": "t"}) == 2
+    assert registry.call("count", {}, ["t"]) == 2
+    assert registry.call("count", {}, ["t"], use_cache=False) == 3
+
+
+def test_observer_sees_calls_and_error_outputs(registry):
+    seen = []
+    registry.observer = lambda name, seconds, failed: seen.append((name, failed))
+    registry.register("fails", lambda config: "Error: no connection")
+
+    registry.call("checksum_table", {}, ["t"])
+    registry.call("fails", {})
+    with pytest.raises(ToolError):
+        registry.call("checksum_table", {})
+
+    assert seen == [("checksum_table", False), ("fails", True), ("checksum_table", True)]
@@ -1,15 +1,213 @@
 import google.generativeai as genai
 from .secret_manager import SecretManager
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by every thread that calls the client.
+    Allows bursts of up to `capacity` requests, refilled at `rate` per second.
+    """
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Takes a token, returning how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+
+class ResponseCache:
+    """
+    LRU cache of model responses keyed by a hash of the prompt, with an optional
+    on-disk layer so repeated runs reuse responses. The disk layer keeps at most
+    `max_disk_entries` files, dropping the least recently written.
+    """
+    def __init__(self, max_entries: int = 256, directory: str | None = None, max_disk_entries: int = 2048):
+        self.max_entries = max(1, max_entries)
+        self.directory = directory
+        self.max_disk_entries = max(1, max_disk_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(model_name: str, system_instruction: str | None, contents: list[dict]) -> str:
+        raw = json.dumps([model_name, system_instruction, contents], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if not self.directory:
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{key}.json"), "r") as f:
+                value = json.load(f)["response"]
+        except (OSError, ValueError, KeyError):
+            return None
+        self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: str):
+        self._remember(key, value)
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f"{key}.json")
+        try:
+            # Write-then-rename so a concurrent reader never sees a partial file
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"response": value}, f)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except OSError as e:
+            print(f"Could not write LLM response cache entry: {e}")
+
+    def _remember(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _evict_disk(self):
+        files = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=lambda e: e.stat().st_mtime)
+        for entry in files[:len(files) - self.max_disk_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+class RateLimitedError(Exception):
+    """Raised by backends when the API answers 429 / resource exhausted."""
+
+
+class GenAIBackend:
+    """Calls the Gemini API, keeping one GenerativeModel per system instruction."""
+    def __init__(self, model_name: str, timeout: float = 60.0):
+        self.model_name = model_name
+        self.timeout = timeout
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, system_instruction: str | None):
+        with self._lock:
+            model = self._models.get(system_instruction)
+            if model is None:
+                model = genai.GenerativeModel(self.model_name, system_instruction=system_instruction)
+                self._models[system_instruction] = model
+            return model
+
+    def generate(self, contents: list[dict], system_instruction: str | None = None) -> str:
+        try:
+            response = self._model(system_instruction).generate_content(
+                contents, request_options={"timeout": self.timeout})
+        except Exception as e:
+            if _is_rate_limited(e):
+                raise RateLimitedError(str(e)) from e
+            raise
+        return response.text
+
+
+class FakeBackend:
+    """
+    Offline stand-in for GenAIBackend. `responder(contents, system_instruction)`
+    returns the response text; by default it echoes the last user message.
+    Every call is recorded in `calls`.
+    """
+    def __init__(self, responder=None, model_name: str = "fake"):
+        self.model_name = model_name
+        self.responder = responder or (lambda contents, system: f"echo: {contents[-1]['parts'][0]}")
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def generate(self, contents: list[dict], system_instruction: str | None = None) -> str:
+        with self._lock:
+            self.calls.append((contents, system_instruction))
+        return self.responder(contents, system_instruction)
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    if getattr(error, "code", None) == 429:
+        return True
+    return type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+
+
+def to_gemini_contents(messages: list[dict]) -> tuple[list[dict], str | None]:
+    """
+    Converts AutoGen messages to Gemini contents plus a system instruction.
+    Assistant turns become 'model' turns; system messages are joined into the instruction.
+    """
+    system = [m["content"] for m in messages if m.get("role") == "system" and m.get("content")]
+    contents = []
+    for m in messages:
+        role = m.get("role")
+        if role == "system" or not m.get("content"):
+            continue
+        gemini_role = "model" if role == "assistant" else "user"
+        # Gemini expects alternating turns; merge consecutive messages from the same side
+        if contents and contents[-1]["role"] == gemini_role:
+            contents[-1]["parts"].append(m["content"])
+        else:
+            contents.append({"role": gemini_role, "parts": [m["content"]]})
+    return contents, "\n\n".join(system) or None
+
 
 class GeminiClient:
     """
     A client for interacting with the Google Gemini API.
     It fetches the API key securely from Secret Manager.
+
+    Identical conversations are answered from a response cache (in memory, and on
+    disk when GEMINI_CACHE_DIR is set). Requests are paced by a token bucket
+    (GEMINI_REQUESTS_PER_MINUTE, default 60) and retried with exponential backoff
+    when the API reports rate limiting. The limiter, cache and concurrency cap
+    are thread-safe, so parallel graph branches, whose agents call the client
+    from executor threads, share them.
+    Pass `backend=FakeBackend(...)` to run without the API.
     """
-    def __init__(self, secret_manager: SecretManager, model_name: str = "gemini-1.5-flash-latest"):
+    def __init__(self, secret_manager: SecretManager | None = None, model_name: str = "gemini-1.5-flash-latest",
+                 backend=None, cache: ResponseCache | None = None, requests_per_minute: float | None = None,
+                 max_retries: int = 5, max_concurrency: int = 8, timeout: float = 60.0):
         self.secret_manager = secret_manager
         self.model_name = model_name
-        self._configure()
+        if backend is None:
+            self._configure()
+            backend = GenAIBackend(model_name, timeout=timeout)
+        self.backend = backend
+        self.cache = cache if cache is not None else ResponseCache(directory=os.environ.get("GEMINI_CACHE_DIR"))
+        if requests_per_minute is None:
+            requests_per_minute = float(os.environ.get("GEMINI_REQUESTS_PER_MINUTE", "60"))
+        self.limiter = TokenBucket(requests_per_minute / 60.0, capacity=max(1.0, requests_per_minute / 6))
+        self.max_retries = max_retries
+        self._concurrency = threading.BoundedSemaphore(max(1, max_concurrency))
 
     def _configure(self):
         """Fetches the API key and configures the genai module."""
@@ -23,15 +221,40 @@ class GeminiClient:
         Makes a call to the Gemini API.
         This adapts the AutoGen message format to what Gemini expects.
         """
-        # Find the last message from the 'user' to use as the prompt
-        prompt = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), None)
+        request = self._prepare(messages)
+        if isinstance(request, str):
+            return request
+        key, contents, system = request
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                return self._generate(key, contents, system)
+            except RateLimitedError as e:
+                if attempt == self.max_retries:
+                    return f"Error calling Gemini API: {e}"
+                time.sleep(_backoff(attempt))
+            except Exception as e:
+                return f"Error calling Gemini API: {e}"
 
-        if not prompt:
+    def _prepare(self, messages: list[dict]):
+        """Returns (cache key, contents, system instruction), or the final answer as a string."""
+        contents, system = to_gemini_contents(messages)
+        # The prompt is the conversation up to the last user turn
+        while contents and contents[-1]["role"] != "user":
+            contents.pop()
+        if not contents:
             return "No user prompt found in messages."
+        key = self.cache.key(self.model_name, system, contents)
+        cached = self.cache.get(key)
+        return cached if cached is not None else (key, contents, system)
 
-        model = genai.GenerativeModel(self.model_name)
-        try:
-            response = model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            return f"Error calling Gemini API: {e}"
\ No newline at end of file
+    def _generate(self, key: str, contents: list[dict], system: str | None) -> str:
+        with self._concurrency:
+            text = self.backend.generate(contents, system)
+        self.cache.put(key, text)
+        return text
+
+
+def _backoff(attempt: int) -> float:
+    # 1s, 2s, 4s, ... capped at 32s, with jitter so parallel callers do not retry in lockstep
+    return min(32.0, 2.0 ** attempt) * random.uniform(0.5, 1.0)
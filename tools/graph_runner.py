@@ -0,0 +1,168 @@
+import asyncio
+import json
+import time
+
+
+class GraphNode:
+    """One step of a workflow graph: `run(messages)` returns the step's output text."""
+    def __init__(self, name: str, run, depends_on: list[str] | None = None, timeout: float | None = None,
+                 fan_out: list | None = None):
+        self.name = name
+        self.run = run
+        self.depends_on = list(depends_on or [])
+        self.timeout = timeout
+        # With fan_out, run(messages, item) is called once per item, concurrently, and joined
+        self.fan_out = fan_out
+
+
+class ParallelGraphRunner:
+    """
+    Runs a workflow DAG with every node starting as soon as all of its
+    dependencies have finished, so independent branches run concurrently.
+
+    A node with several dependencies is a barrier: it waits for all of them and
+    receives their outputs. Each node gets the initial prompt plus the outputs of
+    all its ancestors, in completion order. A node that fails or exceeds its
+    timeout marks every node downstream of it as skipped; unrelated branches keep
+    running. A timeout abandons the node rather than stopping it: its coroutine
+    is cancelled, but work it handed to a worker thread (every blocking callable,
+    and blocking calls inside coroutines) runs on until it returns. Timings are
+    recorded for every node and the critical path (the chain of dependencies
+    that determined the finish time) is reported.
+    """
+    def __init__(self, default_timeout: float | None = None):
+        self.default_timeout = default_timeout
+        self.nodes: dict[str, GraphNode] = {}
+
+    def add_node(self, name: str, run, depends_on: list[str] | None = None, timeout: float | None = None,
+                 fan_out: list | None = None) -> GraphNode:
+        if name in self.nodes:
+            raise ValueError(f"Node '{name}' is already defined")
+        node = GraphNode(name, run, depends_on, timeout if timeout is not None else self.default_timeout, fan_out)
+        self.nodes[name] = node
+        return node
+
+    def topological_order(self) -> list[str]:
+        """Returns node names in dependency order; raises ValueError on unknown dependencies or cycles."""
+        for node in self.nodes.values():
+            unknown = [d for d in node.depends_on if d not in self.nodes]
+            if unknown:
+                raise ValueError(f"Node '{node.name}' depends on unknown node(s): {', '.join(unknown)}")
+        remaining = {name: set(node.depends_on) for name, node in self.nodes.items()}
+        order = []
+        while remaining:
+            ready = sorted(name for name, deps in remaining.items() if not deps)
+            if not ready:
+                raise ValueError(f"Workflow graph has a cycle among: {', '.join(sorted(remaining))}")
+            for name in ready:
+                del remaining[name]
+                order.append(name)
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def run(self, initial_prompt: str) -> dict:
+        # Not asyncio.run(): it joins the loop's worker threads on exit, so an abandoned
+        # node would hold back the report until its blocking call returned
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(self.arun(initial_prompt))
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    async def arun(self, initial_prompt: str) -> dict:
+        order = self.topological_order()
+        started = time.monotonic()
+        results = {name: {"status": "pending"} for name in order}
+        finished_order = []
+        tasks = {}
+
+        async def run_node(name):
+            node = self.nodes[name]
+            await asyncio.gather(*(tasks[d] for d in node.depends_on))
+            failed = [d for d in node.depends_on if results[d]["status"] != "succeeded"]
+            if failed:
+                results[name] = {"status": "skipped", "reason": f"dependency {failed[0]} did not succeed"}
+                return
+            ancestors = self._ancestors(name)
+            messages = [{"role": "user", "content": initial_prompt}] + [
+                {"role": "user", "name": done, "content": results[done]["output"]}
+                for done in finished_order if done in ancestors
+            ]
+            record = {"status": "running", "start": round(time.monotonic() - started, 3)}
+            results[name] = record
+            print(f"[orchestrator] starting {name}")
+            try:
+                if node.fan_out is not None:
+                    outputs = await asyncio.wait_for(asyncio.gather(
+                        *(_invoke(node.run, messages, item) for item in node.fan_out)), node.timeout)
+                    record["output"] = "\n\n".join(str(o) for o in outputs)
+                    record["branches"] = len(node.fan_out)
+                else:
+                    record["output"] = await asyncio.wait_for(_invoke(node.run, messages), node.timeout)
+                record["status"] = "succeeded"
+            except asyncio.TimeoutError:
+                record["status"] = "timed_out"
+                record["reason"] = f"exceeded {node.timeout}s"
+            except Exception as e:
+                record["status"] = "failed"
+                record["reason"] = str(e)
+            record["end"] = round(time.monotonic() - started, 3)
+            record["seconds"] = round(record["end"] - record["start"], 3)
+            finished_order.append(name)
+            print(f"[orchestrator] {name} {record['status']} after {record['seconds']}s")
+
+        for name in order:
+            tasks[name] = asyncio.ensure_future(run_node(name))
+        await asyncio.gather(*tasks.values())
+        return {
+            "nodes": results,
+            "wall_seconds": round(time.monotonic() - started, 3),
+            "critical_path": self._critical_path(results),
+        }
+
+    def _ancestors(self, name: str) -> set[str]:
+        seen, stack = set(), list(self.nodes[name].depends_on)
+        while stack:
+            current = stack.pop()
+            if current not in seen:
+                seen.add(current)
+                stack.extend(self.nodes[current].depends_on)
+        return seen
+
+    def _critical_path(self, results: dict) -> list[str]:
+        """Walks back from the last node to finish through the dependency that finished last."""
+        timed = {name: r for name, r in results.items() if "end" in r}
+        if not timed:
+            return []
+        # Results are in dependency order; on a tie the later node is the one that finished last
+        current = max(reversed(timed), key=lambda n: timed[n]["end"])
+        path = [current]
+        while True:
+            deps = [d for d in self.nodes[current].depends_on if d in timed]
+            if not deps:
+                break
+            current = max(deps, key=lambda n: timed[n]["end"])
+            path.append(current)
+        return list(reversed(path))
+
+
+async def _invoke(run, messages, *item):
+    # Coroutine functions run on the event loop; blocking callables get a worker thread
+    if asyncio.iscoroutinefunction(run):
+        return await run(messages, *item)
+    return await asyncio.to_thread(run, messages, *item)
+
+
+def format_timings(report: dict) -> str:
+    lines = [f"{'node':<28}{'status':<11}{'start':>8}{'end':>8}{'seconds':>9}"]
+    for name, r in sorted(report["nodes"].items(), key=lambda item: item[1].get("start", float("inf"))):
+        lines.append(f"{name:<28}{r['status']:<11}{r.get('start', ''):>8}{r.get('end', ''):>8}{r.get('seconds', ''):>9}")
+    lines.append(f"wall time {report['wall_seconds']}s; critical path: {' -> '.join(report['critical_path'])}")
+    return "\n".join(lines)
+
+
+def timings_json(report: dict) -> str:
+    nodes = {name: {k: v for k, v in r.items() if k != "output"} for name, r in report["nodes"].items()}
+    return json.dumps(dict(report, nodes=nodes), indent=2)
@@ -1,37 +1,52 @@
 from google.cloud import secretmanager
+from concurrent.futures import ThreadPoolExecutor
 import os
+import threading
+import time
 
 class SecretManager:
     """
     A client for securely accessing secrets from Google Cloud Secret Manager.
-    Caches secrets to avoid repeated API calls.
+    Caches secrets for `ttl_seconds` (env SECRET_CACHE_TTL_SECONDS, default 300)
+    so rotated secrets are picked up without a restart. An expired secret is
+    served from the cache while it is refreshed in the background.
     """
     _instance = None
-    _secrets_cache = {}
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
             cls._instance = super(SecretManager, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self):
+    def __init__(self, ttl_seconds: float | None = None):
+        # The singleton is only set up once; later SecretManager() calls share its cache
+        if getattr(self, "_initialized", False):
+            return
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.environ.get("SECRET_CACHE_TTL_SECONDS", "300"))
+        # (secret_id, version) -> (expires_at, value)
+        self._secrets_cache = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
         # The project ID for Secret Manager is itself a secret, fetched once.
         self.project_id = os.environ.get("GCP_PROJECT_ID")
-        if not self.project_id:
+        self.client = None
+        if self.project_id:
+            # One client is shared by every lookup; building it is the slow part of a cold start.
+            # With the project configured, a client that cannot be built is an error, not a fallback.
+            self.client = secretmanager.SecretManagerServiceClient()
+        else:
             # Fallback for local testing if env var not set
             try:
-                client = secretmanager.SecretManagerServiceClient()
-                # A common convention could be to store the project_id in a known project
-                # but for simplicity, we assume it's set in the environment on the VM.
-                # Here we will hardcode a fallback for local simulation.
+                self.client = secretmanager.SecretManagerServiceClient()
                 # On the VM, the gcloud command will set this env var.
-                self.project_id = "your-gcp-project-id" 
+                self.project_id = "your-gcp-project-id"
             except Exception:
                 # If credentials aren't configured, we can't proceed.
                 self.project_id = None
-        
-        if self.project_id:
-            self.client = secretmanager.SecretManagerServiceClient()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="secret-fetch")
+        # Set last, so a failed construction is retried by the next SecretManager() call
+        self._initialized = True
 
     def get_secret(self, secret_id: str, version: str = "latest") -> str | None:
         """
@@ -46,16 +61,46 @@ class SecretManager:
         """
         if not self.project_id:
             return None
-            
-        if secret_id in self._secrets_cache:
-            return self._secrets_cache[secret_id]
 
+        with self._lock:
+            entry = self._secrets_cache.get((secret_id, version))
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at <= time.monotonic() and (secret_id, version) not in self._refreshing:
+                    self._refreshing.add((secret_id, version))
+                    self._executor.submit(self._refresh, secret_id, version)
+                return value
+
+        return self._fetch(secret_id, version)
+
+    def prefetch(self, secret_ids: list[str], version: str = "latest") -> dict[str, str | None]:
+        """
+        Fetches several secrets concurrently and caches them.
+
+        Returns:
+            A mapping of secret ID to value (None for secrets that could not be read).
+        """
+        if not self.project_id:
+            return {secret_id: None for secret_id in secret_ids}
+        values = self._executor.map(lambda secret_id: self._fetch(secret_id, version), secret_ids)
+        return dict(zip(secret_ids, values))
+
+    def _fetch(self, secret_id: str, version: str) -> str | None:
         try:
             name = self.client.secret_version_path(self.project_id, secret_id, version)
             response = self.client.access_secret_version(request={"name": name})
             payload = response.payload.data.decode("UTF-8")
-            self._secrets_cache[secret_id] = payload
-            return payload
         except Exception as e:
             print(f"Could not access secret '{secret_id}': {e}")
-            return None
\ No newline at end of file
+            return None
+        with self._lock:
+            self._secrets_cache[(secret_id, version)] = (time.monotonic() + self.ttl_seconds, payload)
+        return payload
+
+    def _refresh(self, secret_id: str, version: str):
+        # On failure the stale value stays cached and the next read retries the refresh
+        try:
+            self._fetch(secret_id, version)
+        finally:
+            with self._lock:
+                self._refreshing.discard((secret_id, version))
\ No newline at end of file